@@ -44,37 +44,574 @@ Req 8. Be compliant with PEP8.
 import os
 import sys
 import json
+import math
 import time
+import argparse
+import threading
+from bisect import bisect_right
+from collections import Counter, defaultdict, deque
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
+ARCHIVO_CUARENTENA = "SalesQuarantine.json"
+ARCHIVO_ACUMULADOS = "SalesRollups.json"
+FORMATO_FECHA = "%d/%m/%y"
+PUERTO_SERVICIO = 8765
+MUESTRAS_LATENCIA = 10000
+# Límite de entradas de las tablas de memorización del servicio
+MAXIMO_MEMO = 10000
+UMBRAL_DIFUSO = 0.6
+# Rutas del servicio; las demás se agrupan en una sola métrica
+RUTAS_SERVICIO = ("/totals", "/metrics", "/health")
 
-def procesar_archivos(catalogue_file, sales_record_file):
+
+def _es_numero(valor):
+    """
+    Indica si el valor es un número finito (int o float, pero no bool
+    ni NaN o infinito, que volverían inválido el total)
+    """
+    return (isinstance(valor, (int, float)) and not isinstance(valor, bool)
+            and math.isfinite(valor))
+
+
+def _es_texto(valor):
+    """
+    Indica si el valor es un texto no vacío
+    """
+    return isinstance(valor, str) and valor != ""
+
+
+# Reglas por campo: (campo, validacion, motivo del rechazo)
+ESQUEMA_CATALOGO = (
+    ("title", _es_texto, "Titulo faltante o invalido"),
+    ("price", _es_numero, "Precio faltante o no numerico"),
+)
+ESQUEMA_VENTAS = (
+    ("Product", _es_texto, "Producto faltante o invalido"),
+    ("Quantity", _es_numero, "Cantidad faltante o no numerica"),
+)
+
+
+def compilar_validador(esquema):
+    """
+    Construye una sola vez la función que valida un registro con las
+    reglas del esquema. Devuelve None si el registro es válido o el
+    motivo del rechazo en caso contrario.
+    """
+    reglas = tuple(esquema)
+
+    def validar(registro):
+        if not isinstance(registro, dict):
+            return "Registro con formato invalido"
+        for campo, es_valido, motivo in reglas:
+            if not es_valido(registro.get(campo)):
+                return motivo
+        return None
+    return validar
+
+
+validar_producto = compilar_validador(ESQUEMA_CATALOGO)
+validar_venta = compilar_validador(ESQUEMA_VENTAS)
+
+
+class Cuarentena:
+    """
+    Acumula los registros descartados junto con su motivo y cuenta
+    cuántas veces se repite cada advertencia.
+    """
+
+    def __init__(self):
+        self.registros = []
+        self.advertencias = Counter()
+
+    def agregar(self, origen, registro, motivo):
+        """
+        Registra un elemento descartado
+        """
+        self.registros.append({"origen": origen,
+                               "motivo": motivo,
+                               "registro": registro})
+        self.advertencias[motivo] += 1
+
+    def resumen(self):
+        """
+        Devuelve una línea por advertencia distinta con su conteo
+        """
+        return [motivo if veces == 1 else f"{motivo} ({veces} veces)"
+                for motivo, veces in self.advertencias.items()]
+
+    def guardar(self, ruta):
+        """
+        Escribe los registros descartados en un archivo JSON
+        """
+        with open(ruta, "w", encoding="utf-8") as f:
+            json.dump(self.registros, f, indent=2, ensure_ascii=False)
+
+
+def _memorizar(tabla, clave, valor, maximo):
+    """
+    Guarda un valor en una tabla de memorización; si la tabla ya tiene
+    maximo entradas, descarta la más antigua
+    """
+    if len(tabla) >= maximo:
+        del tabla[next(iter(tabla))]
+    tabla[clave] = valor
+
+
+def _ngramas(texto, n):
+    """
+    Devuelve el conjunto de n-gramas de un texto, con relleno para que
+    el inicio y el final de cada palabra también cuenten
+    """
+    texto = f"  {' '.join(texto.lower().split())} "
+    return {texto[i:i + n] for i in range(len(texto) - n + 1)}
+
+
+class IndiceDifuso:
+    """
+    Índice de n-gramas sobre los títulos del catálogo. Se construye una
+    sola vez y permite resolver nombres mal escritos al título más
+    parecido (coeficiente de Dice) por encima de un umbral. Cada nombre
+    distinto se resuelve una sola vez y se guarda como alias; al
+    llegar a maximo alias se descarta el más antiguo.
+    """
+
+    def __init__(self, titulos, umbral=UMBRAL_DIFUSO, n=3,
+                 maximo=MAXIMO_MEMO):
+        self.umbral = umbral
+        self.n = n
+        self.maximo = maximo
+        self.alias = {}
+        self._titulos = []
+        self._tamanos = []
+        self._indice = defaultdict(list)
+        for titulo in titulos:
+            gramas = _ngramas(titulo, n)
+            posicion = len(self._titulos)
+            self._titulos.append(titulo)
+            self._tamanos.append(len(gramas))
+            for grama in gramas:
+                self._indice[grama].append(posicion)
+
+    def resolver(self, nombre):
+        """
+        Devuelve el título del catálogo más parecido a nombre,
+        o None si ninguno supera el umbral
+        """
+        if nombre in self.alias:
+            return self.alias[nombre]
+        gramas = _ngramas(nombre, self.n)
+        comunes = Counter()
+        for grama in gramas:
+            comunes.update(self._indice.get(grama, ()))
+
+        mejor, mejor_similitud = None, self.umbral
+        for posicion, compartidos in comunes.items():
+            similitud = (2 * compartidos
+                         / (len(gramas) + self._tamanos[posicion]))
+            if similitud >= mejor_similitud:
+                mejor, mejor_similitud = self._titulos[posicion], similitud
+        _memorizar(self.alias, nombre, mejor, self.maximo)
+        return mejor
+
+    def resueltos(self):
+        """
+        Devuelve los alias que sí encontraron un título en el catálogo
+        """
+        return {nombre: titulo for nombre, titulo in self.alias.items()
+                if titulo is not None}
+
+
+def _como_lista(datos, origen, cuarentena):
+    """
+    Verifica que el contenido de un archivo sea una lista de registros
+    """
+    if isinstance(datos, list):
+        return datos
+    cuarentena.agregar(origen, None, "El archivo no contiene una lista")
+    return []
+
+
+def leer_registros(ruta, cuarentena):
+    """
+    Abre un archivo JSON y devuelve su lista de registros
+    """
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return _como_lista(json.load(f), ruta, cuarentena)
+
+
+def cargar_catalogo(catalogue_file, cuarentena):
+    """
+    Extrae los nombres y precios de cada producto válido del catálogo
+    """
+    precios = {}
+    for item in leer_registros(catalogue_file, cuarentena):
+        motivo = validar_producto(item)
+        if motivo is not None:
+            cuarentena.agregar(catalogue_file, item, motivo)
+            continue
+        precios[item['title']] = item['price']
+    return precios
+
+
+def resolver_producto(sale, origen, precios, cuarentena, indice=None):
+    """
+    Valida una venta y devuelve el título del catálogo al que
+    corresponde, o None si el registro terminó en la cuarentena
     """
-    Abre los archivos json y extrae la información deseada
+    motivo = validar_venta(sale)
+    if motivo is not None:
+        cuarentena.agregar(origen, sale, motivo)
+        return None
+    product_title = sale['Product']
+    if product_title in precios:
+        return product_title
+    if indice is not None:
+        titulo = indice.resolver(product_title)
+        if titulo is not None:
+            return titulo
+    cuarentena.agregar(
+        origen, sale, f"Producto no detectado en el catalogo: {product_title}")
+    return None
+
+
+def _mostrar_alias(indice):
+    """
+    Muestra los nombres de producto que se corrigieron con el índice
     """
-    with open(catalogue_file, 'r', encoding='utf-8') as f:
-        catalogue = json.load(f)
-    with open(sales_record_file, 'r', encoding='utf-8') as f:
-        sales_record = json.load(f)
+    if indice is not None:
+        for nombre, titulo in indice.resueltos().items():
+            print(f"Producto corregido: {nombre} -> {titulo}")
 
-    sales = {}
-    # Extrae los nombres y precios de cada producto
-    for item in catalogue:
-        title = item.get('title')
-        price = item.get('price')
-        sales[title] = [price, 0]
+
+def procesar_archivos(catalogue_file, sales_record_file, cuarentena=None,
+                      umbral_difuso=None):
+    """
+    Abre los archivos json y extrae la información deseada.
+    sales_record_file puede ser una ruta o una lista de rutas.
+    Los registros inválidos o de productos desconocidos se envían a la
+    cuarentena; si no se proporciona una, las advertencias se muestran
+    al final agrupadas. Con umbral_difuso, los productos que no
+    aparecen tal cual en el catálogo se buscan en un IndiceDifuso.
+    """
+    mostrar_resumen = cuarentena is None
+    if cuarentena is None:
+        cuarentena = Cuarentena()
+    if isinstance(sales_record_file, str):
+        sales_record_file = [sales_record_file]
+
+    precios = cargar_catalogo(catalogue_file, cuarentena)
+    sales = {title: [price, 0] for title, price in precios.items()}
+    indice = None
+    if umbral_difuso is not None:
+        indice = IndiceDifuso(precios, umbral_difuso)
 
     # Extrae la cantidad de veces que se vendio un producto
-    for sale in sales_record:
-        product_title = sale.get('Product')
-        quantity = sale.get('Quantity', 0)
-        if product_title in sales:
-            # Suma la cantidad de ventas
-            sales[product_title][1] += quantity
-        else:
-            print(f"Producto no detectado en el catalogo: {product_title}")
+    for ruta in sales_record_file:
+        for sale in leer_registros(ruta, cuarentena):
+            product_title = resolver_producto(sale, ruta, precios,
+                                              cuarentena, indice)
+            if product_title is not None:
+                # Suma la cantidad de ventas
+                sales[product_title][1] += sale['Quantity']
+    _mostrar_alias(indice)
+    if mostrar_resumen:
+        for linea in cuarentena.resumen():
+            print(linea)
     return sales
 
 
+class HistorialPrecios:
+    """
+    Historial de precios armado a partir de varios catálogos con fecha
+    de vigencia. Para cada producto guarda sus fechas de cambio
+    ordenadas y el precio de cada una, de modo que el precio vigente en
+    un día se obtiene con una búsqueda binaria (unión "as-of").
+    """
+
+    def __init__(self):
+        self._fechas = {}
+        self._precios = {}
+
+    def agregar_catalogo(self, vigencia, precios):
+        """
+        Registra los precios de un catálogo vigente desde la fecha dada
+        (un ordinal de fecha; 0 para el catálogo base)
+        """
+        for titulo, precio in precios.items():
+            fechas = self._fechas.setdefault(titulo, [])
+            valores = self._precios.setdefault(titulo, [])
+            posicion = bisect_right(fechas, vigencia)
+            if posicion and fechas[posicion - 1] == vigencia:
+                valores[posicion - 1] = precio
+            else:
+                fechas.insert(posicion, vigencia)
+                valores.insert(posicion, precio)
+
+    def precio(self, titulo, dia):
+        """
+        Devuelve el precio de un producto vigente en la fecha dada,
+        o None si todavía no tenía precio
+        """
+        fechas = self._fechas.get(titulo)
+        if fechas is None:
+            return None
+        posicion = bisect_right(fechas, dia.toordinal())
+        if posicion == 0:
+            return None
+        return self._precios[titulo][posicion - 1]
+
+    def __contains__(self, titulo):
+        return titulo in self._fechas
+
+    def __iter__(self):
+        return iter(self._fechas)
+
+
+def fecha_catalogo(texto):
+    """
+    Interpreta un argumento FECHA=ARCHIVO de la línea de comandos
+    """
+    fecha, separador, ruta = texto.partition("=")
+    try:
+        vigencia = date.fromisoformat(fecha)
+    except ValueError:
+        vigencia = None
+    if not separador or not ruta or vigencia is None:
+        raise argparse.ArgumentTypeError(
+            f"Se esperaba AAAA-MM-DD=catalogo.json: {texto}")
+    return vigencia, ruta
+
+
+def cargar_precios(catalogue_file, versiones, cuarentena):
+    """
+    Devuelve los precios del catálogo, o un HistorialPrecios si se
+    proporcionaron catálogos con fecha (pares (fecha, ruta)). El
+    catálogo base aplica a las ventas anteriores al primer catálogo
+    con fecha.
+    """
+    precios = cargar_catalogo(catalogue_file, cuarentena)
+    if not versiones:
+        return precios
+    historial = HistorialPrecios()
+    historial.agregar_catalogo(0, precios)
+    for vigencia, ruta in sorted(versiones):
+        historial.agregar_catalogo(vigencia.toordinal(),
+                                   cargar_catalogo(ruta, cuarentena))
+    return historial
+
+
+# Se usa como función (__call__) que conserva su tabla entre llamadas
+class MemoFechas:  # pylint: disable=too-few-public-methods
+    """
+    Tabla de memorización de fechas: cada texto distinto de SALE_Date
+    se interpreta una sola vez. Las fechas inválidas se memorizan
+    como None; los valores que no son texto (por ejemplo listas) se
+    rechazan sin memorizarse. Guarda a lo más maximo fechas.
+    """
+
+    def __init__(self, formato=FORMATO_FECHA, maximo=MAXIMO_MEMO):
+        self.formato = formato
+        self.maximo = maximo
+        self._fechas = {}
+
+    def __call__(self, texto):
+        if not isinstance(texto, str):
+            return None
+        try:
+            return self._fechas[texto]
+        except KeyError:
+            pass
+        try:
+            fecha = datetime.strptime(texto, self.formato).date()
+        except ValueError:
+            fecha = None
+        _memorizar(self._fechas, texto, fecha, self.maximo)
+        return fecha
+
+
+def clave_ventana(dia, ventana):
+    """
+    Devuelve la clave de la ventana (día, semana ISO o mes) de una fecha
+    """
+    if ventana == "week":
+        anio, semana, _ = dia.isocalendar()
+        return f"{anio}-W{semana:02d}"
+    if ventana == "month":
+        return f"{dia.year}-{dia.month:02d}"
+    return dia.isoformat()
+
+
+def acumular_por_dia(ruta, precios, cuarentena, memo, indice=None):
+    """
+    Lee un archivo de ventas y suma el ingreso de cada día
+    """
+    return acumular_registros(leer_registros(ruta, cuarentena), ruta,
+                              precios, cuarentena, memo, indice)
+
+
+# Recibe las tablas compartidas (precios, memo, índice) del proceso o
+# del servicio residente en lugar de construirlas en cada llamada
+def acumular_registros(  # pylint: disable=R0913,R0917
+        registros, ruta, precios, cuarentena, memo, indice=None):
+    """
+    Suma el ingreso de cada día de una lista de ventas.
+    precios puede ser un diccionario de precios fijos o un
+    HistorialPrecios, en cuyo caso cada venta usa el precio vigente
+    en su SALE_Date.
+    """
+    historial = isinstance(precios, HistorialPrecios)
+    dias = defaultdict(float)
+    for sale in registros:
+        product_title = resolver_producto(sale, ruta, precios,
+                                          cuarentena, indice)
+        if product_title is None:
+            continue
+        dia = memo(sale.get('SALE_Date'))
+        if dia is None:
+            cuarentena.agregar(ruta, sale, "Fecha de venta invalida")
+            continue
+        if historial:
+            precio = precios.precio(product_title, dia)
+            if precio is None:
+                cuarentena.agregar(ruta, sale,
+                                   "Producto sin precio vigente en la fecha")
+                continue
+        else:
+            precio = precios[product_title]
+        dias[dia.isoformat()] += precio * sale['Quantity']
+    return dict(dias)
+
+
+def _firma(ruta):
+    """
+    Identifica la versión de un archivo por su tamaño y fecha de
+    modificación
+    """
+    estado = os.stat(ruta)
+    return f"{estado.st_mtime_ns}:{estado.st_size}"
+
+
+class AcumuladoDiario:
+    """
+    Acumulados de ingreso por día guardados en disco. Cada archivo de
+    ventas se procesa solo si es nuevo o cambió desde la última vez;
+    las semanas y los meses se calculan a partir de los días, sin
+    volver a leer las ventas. Si el catálogo cambia, los acumulados
+    se descartan porque los precios ya no corresponden.
+    """
+
+    def __init__(self, ruta=ARCHIVO_ACUMULADOS):
+        self.ruta = ruta
+        self.catalogo = None
+        self.archivos = {}
+        if os.path.isfile(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                datos = json.load(f)
+            self.catalogo = datos.get("catalogo")
+            self.archivos = datos.get("archivos", {})
+
+    def usar_catalogo(self, *catalogue_files):
+        """
+        Descarta los acumulados si los catálogos no son los mismos que se
+        usaron para calcularlos
+        """
+        firma = "|".join(f"{os.path.abspath(ruta)}@{_firma(ruta)}"
+                         for ruta in catalogue_files)
+        if firma != self.catalogo:
+            self.catalogo = firma
+            self.archivos = {}
+
+    def pendiente(self, ruta):
+        """
+        Indica si un archivo de ventas aún no está en los acumulados
+        """
+        guardado = self.archivos.get(os.path.abspath(ruta))
+        return guardado is None or guardado["firma"] != _firma(ruta)
+
+    def registrar(self, ruta, dias):
+        """
+        Guarda (o reemplaza) los acumulados diarios de un archivo
+        """
+        self.archivos[os.path.abspath(ruta)] = {"firma": _firma(ruta),
+                                                "dias": dias}
+
+    def por_ventana(self, ventana="day", rutas=None):
+        """
+        Suma por ventana los acumulados diarios de los archivos de
+        ventas dados (por defecto, de todos los guardados)
+        """
+        if rutas is None:
+            guardados = list(self.archivos.values())
+        else:
+            guardados = [self.archivos[os.path.abspath(ruta)]
+                         for ruta in dict.fromkeys(rutas)
+                         if os.path.abspath(ruta) in self.archivos]
+        totales = defaultdict(float)
+        for guardado in guardados:
+            for dia, total in guardado["dias"].items():
+                clave = clave_ventana(date.fromisoformat(dia), ventana)
+                totales[clave] += total
+        return dict(sorted(totales.items()))
+
+    def guardar(self):
+        """
+        Escribe los acumulados en disco
+        """
+        with open(self.ruta, 'w', encoding='utf-8') as f:
+            json.dump({"catalogo": self.catalogo,
+                       "archivos": self.archivos}, f, indent=2)
+
+
+def procesar_historial(catalogue_file, versiones, sales_record_files,
+                       cuarentena, umbral_difuso=None):
+    """
+    Calcula el total de ventas valuando cada venta con el precio
+    vigente en su fecha
+    """
+    historial = cargar_precios(catalogue_file, versiones, cuarentena)
+    indice = None
+    if umbral_difuso is not None:
+        indice = IndiceDifuso(historial, umbral_difuso)
+    memo = MemoFechas()
+    total = 0
+    for ruta in sales_record_files:
+        total += sum(acumular_por_dia(ruta, historial, cuarentena,
+                                      memo, indice).values())
+    _mostrar_alias(indice)
+    return total
+
+
+# Cada opción de la línea de comandos llega como argumento con nombre
+def procesar_ventanas(  # pylint: disable=R0913,R0917
+        catalogue_file, sales_record_files, ventana, cuarentena,
+        umbral_difuso=None, ruta_acumulados=ARCHIVO_ACUMULADOS,
+        versiones=()):
+    """
+    Actualiza los acumulados diarios solo con los archivos de ventas
+    nuevos o modificados y devuelve el ingreso por ventana
+    """
+    acumulado = AcumuladoDiario(ruta_acumulados)
+    acumulado.usar_catalogo(catalogue_file,
+                            *[ruta for _, ruta in sorted(versiones)])
+    pendientes = [ruta for ruta in sales_record_files
+                  if acumulado.pendiente(ruta)]
+    if pendientes:
+        precios = cargar_precios(catalogue_file, versiones, cuarentena)
+        indice = None
+        if umbral_difuso is not None:
+            indice = IndiceDifuso(precios, umbral_difuso)
+        memo = MemoFechas()
+        for ruta in pendientes:
+            acumulado.registrar(ruta, acumular_por_dia(
+                ruta, precios, cuarentena, memo, indice))
+        _mostrar_alias(indice)
+        acumulado.guardar()
+    print(f"Archivos procesados: {len(pendientes)} de "
+          f"{len(sales_record_files)}")
+    return acumulado.por_ventana(ventana, sales_record_files)
+
+
 def calcular_total(sales):
     """
     Calcula las ventas totales
@@ -88,34 +625,336 @@ def calcular_total(sales):
     return total
 
 
-def main():
+# Expone un solo método (actual) para que cada lote vea un estado
+# completo del catálogo
+class CatalogoResidente:  # pylint: disable=too-few-public-methods
+    """
+    Catálogo compilado que permanece en memoria mientras el servicio
+    está activo. Antes de atender cada lote revisa la firma de los
+    archivos y, si cambió alguno, construye un estado nuevo y lo
+    reemplaza de una sola vez, de modo que ningún lote ve una mezcla
+    de precios viejos y nuevos.
+    """
+
+    def __init__(self, catalogue_file, versiones=(), umbral_difuso=None):
+        self.rutas = [catalogue_file] + [ruta for _, ruta in
+                                         sorted(versiones)]
+        self.catalogue_file = catalogue_file
+        self.versiones = list(versiones)
+        self.umbral_difuso = umbral_difuso
+        self.recargas = 0
+        self._candado = threading.Lock()
+        self._estado = self._compilar()
+
+    def _firmas(self):
+        return tuple(_firma(ruta) for ruta in self.rutas)
+
+    def _compilar(self):
+        firmas = self._firmas()
+        cuarentena = Cuarentena()
+        precios = cargar_precios(self.catalogue_file, self.versiones,
+                                 cuarentena)
+        indice = None
+        if self.umbral_difuso is not None:
+            indice = IndiceDifuso(precios, self.umbral_difuso)
+        return firmas, precios, indice, MemoFechas()
+
+    def actual(self):
+        """
+        Devuelve (precios, indice, memo) vigentes, recargando el
+        catálogo si sus archivos cambiaron
+        """
+        estado = self._estado
+        if estado[0] != self._firmas():
+            with self._candado:
+                if self._estado[0] != self._firmas():
+                    self._estado = self._compilar()
+                    self.recargas += 1
+                estado = self._estado
+        return estado[1:]
+
+
+class MetricasLatencia:
+    """
+    Guarda las latencias más recientes de cada ruta del servicio (a lo
+    más muestras por ruta, en un búfer circular) y calcula sus
+    percentiles bajo demanda
+    """
+
+    def __init__(self, muestras=MUESTRAS_LATENCIA):
+        self.muestras = muestras
+        self._latencias = defaultdict(lambda: deque(maxlen=self.muestras))
+        self._conteo = Counter()
+        self._candado = threading.Lock()
+
+    def registrar(self, ruta, milisegundos):
+        """
+        Agrega la latencia de una solicitud
+        """
+        with self._candado:
+            self._latencias[ruta].append(milisegundos)
+            self._conteo[ruta] += 1
+
+    def resumen(self):
+        """
+        Devuelve solicitudes, p50, p99 y máximo (ms) por ruta
+        """
+        with self._candado:
+            copias = {ruta: sorted(valores)
+                      for ruta, valores in self._latencias.items()}
+            conteo = dict(self._conteo)
+        resultado = {}
+        for ruta, valores in copias.items():
+            ultimo = len(valores) - 1
+            resultado[ruta] = {
+                "solicitudes": conteo[ruta],
+                "p50_ms": round(valores[round(ultimo * 0.50)], 3),
+                "p99_ms": round(valores[round(ultimo * 0.99)], 3),
+                "max_ms": round(valores[ultimo], 3),
+            }
+        return resultado
+
+
+def totalizar_lote(registros, catalogo):
+    """
+    Calcula el total de un lote de ventas con el catálogo residente
+    """
+    cuarentena = Cuarentena()
+    precios, indice, memo = catalogo.actual()
+    if not isinstance(registros, list):
+        registros = _como_lista(registros, "solicitud", cuarentena)
+    if isinstance(precios, HistorialPrecios):
+        total = sum(acumular_registros(registros, "solicitud", precios,
+                                       cuarentena, memo, indice).values())
+    else:
+        total = 0
+        for sale in registros:
+            product_title = resolver_producto(sale, "solicitud", precios,
+                                              cuarentena, indice)
+            if product_title is not None:
+                total += precios[product_title] * sale['Quantity']
+    return {"total": round(total, 2),
+            "descartados": len(cuarentena.registros),
+            "advertencias": dict(cuarentena.advertencias)}
+
+
+class ManejadorVentas(BaseHTTPRequestHandler):
+    """
+    Atiende las solicitudes del servicio:
+        POST /totals   lista de ventas en JSON -> total del lote
+        GET /metrics   latencias por ruta
+        GET /health    estado del servicio
+    """
+    protocol_version = "HTTP/1.1"
+
+    def _responder(self, codigo, cuerpo):
+        datos = json.dumps(cuerpo).encode("utf-8")
+        self.send_response(codigo)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _medir(self, atender):
+        inicio = time.perf_counter()
+        try:
+            codigo, cuerpo = atender()
+        except Exception as error:  # pylint: disable=broad-except
+            # Un error inesperado responde 500 en lugar de cortar la
+            # conexión sin respuesta, y también se mide
+            codigo, cuerpo = 500, {"error": f"Error interno: {error}"}
+        self._responder(codigo, cuerpo)
+        ruta = self.path if self.path in RUTAS_SERVICIO else "(otras)"
+        self.server.metricas.registrar(
+            f"{self.command} {ruta}", (time.perf_counter() - inicio) * 1000)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Atiende /metrics y /health
+        """
+        def atender():
+            if self.path == "/metrics":
+                return 200, self.server.metricas.resumen()
+            if self.path == "/health":
+                return 200, {"estado": "ok",
+                             "recargas": self.server.catalogo.recargas}
+            return 404, {"error": "Ruta no encontrada"}
+        self._medir(atender)
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """
+        Atiende /totals
+        """
+        def atender():
+            if self.path != "/totals":
+                return 404, {"error": "Ruta no encontrada"}
+            try:
+                longitud = int(self.headers.get("Content-Length", 0))
+            except ValueError:
+                longitud = -1
+            if longitud < 0:
+                # El cuerpo no se puede leer: se cierra la conexión
+                self.close_connection = True
+                return 400, {"error": "Content-Length invalido"}
+            try:
+                registros = json.loads(self.rfile.read(longitud))
+            except (json.JSONDecodeError, UnicodeDecodeError) as error:
+                return 400, {"error": f"Formato JSON invalido: {error}"}
+            try:
+                return 200, totalizar_lote(registros, self.server.catalogo)
+            except (OSError, json.JSONDecodeError) as error:
+                return 503, {"error": f"Catalogo no disponible: {error}"}
+        self._medir(atender)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """
+        No escribe una línea por solicitud en la consola
+        """
+
+
+def crear_servidor(catalogue_file, versiones=(), umbral_difuso=None,
+                   puerto=PUERTO_SERVICIO):
+    """
+    Crea el servidor HTTP local con el catálogo residente, sin
+    empezar a atender
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), ManejadorVentas)
+    servidor.daemon_threads = True
+    servidor.catalogo = CatalogoResidente(catalogue_file, versiones,
+                                          umbral_difuso)
+    servidor.metricas = MetricasLatencia()
+    return servidor
+
+
+def servir(catalogue_file, versiones=(), umbral_difuso=None,
+           puerto=PUERTO_SERVICIO):
+    """
+    Inicia el servicio HTTP local con el catálogo residente
+    """
+    servidor = crear_servidor(catalogue_file, versiones, umbral_difuso,
+                              puerto)
+    print(f"Servicio de ventas en http://127.0.0.1:{puerto} "
+          "(POST /totals, GET /metrics)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.server_close()
+
+
+def crear_parser():
+    """
+    Define los argumentos de la línea de comandos
+    """
+    parser = argparse.ArgumentParser(
+        description="Calcula el costo total de las ventas registradas")
+    parser.add_argument("catalogo", help="Catalogo de precios (JSON)")
+    parser.add_argument("ventas", nargs="*",
+                        help="Registro(s) de ventas (JSON)")
+    parser.add_argument(
+        "--fuzzy", action="store_true",
+        help="Corrige nombres de producto mal escritos usando el titulo "
+             "mas parecido del catalogo")
+    parser.add_argument(
+        "--fuzzy-threshold", type=float, default=UMBRAL_DIFUSO,
+        metavar="UMBRAL",
+        help="Similitud minima (0 a 1) para aceptar una correccion con "
+             f"--fuzzy (por defecto {UMBRAL_DIFUSO})")
+    parser.add_argument(
+        "--rollup", choices=("day", "week", "month"),
+        help="Agrupa el ingreso por dia, semana o mes usando SALE_Date; "
+             "solo se procesan los archivos nuevos o modificados")
+    parser.add_argument(
+        "--rollup-store", default=ARCHIVO_ACUMULADOS, metavar="ARCHIVO",
+        help="Archivo donde se guardan los acumulados diarios")
+    parser.add_argument(
+        "--historial", type=fecha_catalogo, action="append", default=[],
+        metavar="FECHA=ARCHIVO",
+        help="Catalogo vigente a partir de FECHA (AAAA-MM-DD); se puede "
+             "repetir. Cada venta se valua con el precio vigente en su "
+             "SALE_Date y el catalogo principal aplica antes del primero")
+    parser.add_argument(
+        "--serve", type=int, nargs="?", const=PUERTO_SERVICIO,
+        metavar="PUERTO",
+        help="Mantiene el catalogo en memoria y atiende lotes de ventas "
+             "por HTTP en 127.0.0.1 (POST /totals, GET /metrics)")
+    return parser
+
+
+def _calcular(args, umbral_difuso, cuarentena):
+    """
+    Calcula el total de las ventas según las opciones (acumulados por
+    ventana, catálogos con vigencia o catálogo único) y devuelve
+    (total, ingreso por ventana)
+    """
+    if args.rollup:
+        ventanas = procesar_ventanas(args.catalogo, args.ventas,
+                                     args.rollup, cuarentena, umbral_difuso,
+                                     args.rollup_store, args.historial)
+        return sum(ventanas.values()), ventanas
+    if args.historial:
+        return procesar_historial(args.catalogo, args.historial,
+                                  args.ventas, cuarentena,
+                                  umbral_difuso), {}
+    ventas = procesar_archivos(args.catalogo, args.ventas, cuarentena,
+                               umbral_difuso)
+    return calcular_total(ventas), {}
+
+
+def _reportar(cuarentena, ventanas, total, end_time):
+    """
+    Muestra y guarda los resultados, las advertencias agrupadas y los
+    registros descartados
+    """
+    for linea in cuarentena.resumen():
+        print(linea)
+    # El archivo se reescribe en cada ejecución para que no queden
+    # registros descartados de una ejecución anterior
+    cuarentena.guardar(ARCHIVO_CUARENTENA)
+    if cuarentena.registros:
+        print(f"Registros descartados: {len(cuarentena.registros)} "
+              f"(ver {ARCHIVO_CUARENTENA})")
+
+    # Resultados
+    output = "".join(f"{clave}: {valor:.2f}\n"
+                     for clave, valor in ventanas.items())
+    output += (f"Resultado:{total:.2f}\n"
+               f"Tiempo de procesamiento: {end_time:.6f} milisegundos\n")
+    print(output)
+    with open("SalesResults.txt", "w", encoding="utf-8") as f:
+        f.write(output)
+
+
+def main(argv=None):
     """
     Función principal
     """
-    if len(sys.argv) > 2:
-        catalogue_file, sales_record_file = sys.argv[1], sys.argv[2]
-        if not os.path.isfile(catalogue_file):
-            print(f"El archivo no existe: {catalogue_file}")
+    parser = crear_parser()
+    # Las opciones pueden ir antes, entre o después de los archivos
+    args = parser.parse_intermixed_args(argv)
+    umbral_difuso = args.fuzzy_threshold if args.fuzzy else None
+    if not args.ventas and args.serve is None:
+        parser.error("se requiere al menos un archivo de ventas")
+    for ruta in ([args.catalogo] + [ruta for _, ruta in args.historial]
+                 + args.ventas):
+        if not os.path.isfile(ruta):
+            print(f"El archivo no existe: {ruta}")
             sys.exit(1)
-        elif not os.path.isfile(sales_record_file):
-            print(f"El archivo no existe: {sales_record_file}")
-            sys.exit(1)
-        # Empieza la ejecucion
-        start_time = time.time()
-        ventas = procesar_archivos(catalogue_file, sales_record_file)
-        total = calcular_total(ventas)
-        # Fin de la ejecucion
-        end_time = (time.time() - start_time)*1000
-
-        # Resultados
-        output = (f"Resultado:{total:.2f}\n"
-                  f"Tiempo de procesamiento: {end_time:.6f} milisegundos\n")
-        print(output)
-        with open("SalesResults.txt", "w", encoding="utf-8") as f:
-            f.write(output)
-    else:
-        print("No se incluyeron todos los nombres de archivo necesarios")
-        print("Uso: python computeSales.py catalogo.json ventas.json")
+    if args.serve is not None:
+        servir(args.catalogo, args.historial, umbral_difuso, args.serve)
+        return
+    # Empieza la ejecucion
+    start_time = time.time()
+    cuarentena = Cuarentena()
+    try:
+        total, ventanas = _calcular(args, umbral_difuso, cuarentena)
+    except (json.JSONDecodeError, UnicodeDecodeError) as error:
+        print(f"Formato JSON invalido: {error}")
+        sys.exit(1)
+    # Fin de la ejecucion
+    end_time = (time.time() - start_time)*1000
+    _reportar(cuarentena, ventanas, total, end_time)
 
 
 if __name__ == "__main__":
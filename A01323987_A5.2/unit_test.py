@@ -0,0 +1,391 @@
+"""
+Este módulo contiene las pruebas unitarias de computeSales: cuarentena,
+corrección de nombres, acumulados por ventana, precios con vigencia y
+el servicio residente.
+Cada prueba trabaja en un directorio temporal con catálogos y ventas
+pequeños para no tocar los archivos de los casos de prueba.
+"""
+
+import io
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+import unittest
+import http.client
+from unittest import mock
+from contextlib import redirect_stdout
+from datetime import date
+
+import computeSales
+from computeSales import (
+    ARCHIVO_CUARENTENA, Cuarentena, HistorialPrecios, IndiceDifuso,
+    MemoFechas, MetricasLatencia, crear_servidor, procesar_archivos,
+    procesar_historial, procesar_ventanas)
+
+
+def escribir_json(ruta, datos):
+    """
+    Escribe datos en un archivo JSON
+    """
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(datos, f)
+
+
+def venta(fecha, producto, cantidad):
+    """
+    Registro de venta con el formato de los casos de prueba
+    """
+    return {"SALE_ID": 1, "SALE_Date": fecha, "Product": producto,
+            "Quantity": cantidad}
+
+
+class PruebaEnDirectorio(unittest.TestCase):
+    """
+    Base de las pruebas: cambia a un directorio temporal con un
+    catálogo de dos productos.
+    """
+
+    def setUp(self):
+        """
+        Crea el directorio temporal y el catálogo, y cambia a él
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_cwd = os.getcwd()
+        os.chdir(self.temp_dir.name)
+        self.catalogo = "catalogo.json"
+        escribir_json(self.catalogo, [{"title": "Cafe", "price": 10.0},
+                                      {"title": "Pan", "price": 2.5}])
+
+    def tearDown(self):
+        """
+        Regresa al directorio original y elimina el temporal
+        """
+        os.chdir(self.old_cwd)
+        self.temp_dir.cleanup()
+
+    def ejecutar(self, *argv):
+        """
+        Ejecuta main() con los argumentos dados sin mostrar la salida
+        """
+        with redirect_stdout(io.StringIO()) as salida:
+            computeSales.main(list(argv))
+        return salida.getvalue()
+
+
+class TestCuarentena(PruebaEnDirectorio):
+    """
+    Pruebas de los registros descartados.
+    """
+
+    def test_contenido_de_la_cuarentena(self):
+        """
+        Las ventas inválidas o de productos desconocidos se guardan con
+        su origen y motivo, y una ejecución limpia vacía el archivo.
+        """
+        escribir_json("ventas.json", [
+            venta("01/12/23", "Cafe", 2),
+            venta("01/12/23", "Te", 1),
+            {"SALE_Date": "01/12/23", "Product": "Pan", "Quantity": "x"}])
+        salida = self.ejecutar(self.catalogo, "ventas.json")
+        self.assertIn("Resultado:20.00", salida)
+        with open(ARCHIVO_CUARENTENA, encoding="utf-8") as f:
+            descartados = json.load(f)
+        self.assertEqual(len(descartados), 2)
+        self.assertEqual({registro["origen"] for registro in descartados},
+                         {"ventas.json"})
+        self.assertIn("Producto no detectado en el catalogo: Te",
+                      [registro["motivo"] for registro in descartados])
+        self.assertEqual(descartados[0]["registro"]["Product"], "Te")
+
+        escribir_json("limpias.json", [venta("01/12/23", "Pan", 4)])
+        self.ejecutar(self.catalogo, "limpias.json")
+        with open(ARCHIVO_CUARENTENA, encoding="utf-8") as f:
+            self.assertEqual(json.load(f), [])
+
+    def test_cantidades_no_finitas(self):
+        """
+        Una cantidad o un precio NaN o infinito se descarta en lugar de
+        volver inválido el total.
+        """
+        escribir_json(self.catalogo, [{"title": "Cafe", "price": 10.0},
+                                      {"title": "Te", "price": math.inf}])
+        escribir_json("ventas.json", [venta("01/12/23", "Cafe", 1),
+                                      venta("01/12/23", "Cafe", math.nan),
+                                      venta("01/12/23", "Cafe", -math.inf)])
+        salida = self.ejecutar(self.catalogo, "ventas.json")
+        self.assertIn("Resultado:10.00", salida)
+        with open(ARCHIVO_CUARENTENA, encoding="utf-8") as f:
+            motivos = [registro["motivo"] for registro in json.load(f)]
+        self.assertEqual(motivos, ["Precio faltante o no numerico"]
+                         + ["Cantidad faltante o no numerica"] * 2)
+
+    def test_resumen_agrupa_advertencias(self):
+        """
+        Las advertencias repetidas se muestran una vez con su conteo.
+        """
+        cuarentena = Cuarentena()
+        for _ in range(3):
+            cuarentena.agregar("ventas.json", {}, "Cantidad invalida")
+        cuarentena.agregar("ventas.json", {}, "Fecha invalida")
+        self.assertEqual(cuarentena.resumen(),
+                         ["Cantidad invalida (3 veces)", "Fecha invalida"])
+
+
+class TestDifuso(PruebaEnDirectorio):
+    """
+    Pruebas de la corrección de nombres de producto mal escritos.
+    """
+
+    def test_correccion_en_procesar_archivos(self):
+        """
+        Con umbral, un nombre mal escrito se suma al título más parecido
+        y uno sin parecido suficiente va a la cuarentena.
+        """
+        escribir_json("ventas.json", [venta("01/12/23", "Cafee", 2),
+                                      venta("01/12/23", "Zzz", 1)])
+        cuarentena = Cuarentena()
+        with redirect_stdout(io.StringIO()):
+            ventas = procesar_archivos(self.catalogo, "ventas.json",
+                                       cuarentena, 0.5)
+        self.assertEqual(ventas["Cafe"], [10.0, 2])
+        self.assertEqual([registro["registro"]["Product"]
+                          for registro in cuarentena.registros], ["Zzz"])
+
+    def test_opciones_en_cualquier_orden(self):
+        """
+        --fuzzy no consume el archivo que le sigue y las opciones pueden
+        ir antes de los archivos de ventas.
+        """
+        escribir_json("ventas.json", [venta("01/12/23", "Cafee", 2)])
+        salida = self.ejecutar(self.catalogo, "--fuzzy", "ventas.json")
+        self.assertIn("Producto corregido: Cafee -> Cafe", salida)
+        self.assertIn("Resultado:20.00", salida)
+        salida = self.ejecutar(self.catalogo, "--fuzzy-threshold", "0.99",
+                               "--fuzzy", "ventas.json")
+        self.assertIn("Resultado:0.00", salida)
+
+        escribir_json("junio.json", [{"title": "Cafe", "price": 12.0}])
+        escribir_json("julio.json", [venta("01/07/23", "Cafe", 2)])
+        salida = self.ejecutar(self.catalogo, "--historial",
+                               "2023-06-01=junio.json", "julio.json")
+        self.assertIn("Resultado:24.00", salida)
+
+
+class TestAcumulados(PruebaEnDirectorio):
+    """
+    Pruebas de los acumulados por día, semana y mes.
+    """
+
+    def test_totales_por_ventana(self):
+        """
+        Los totales por ventana solo suman los archivos de la ejecución,
+        aunque el almacén de acumulados guarde otros.
+        """
+        escribir_json("enero.json", [venta("30/01/23", "Cafe", 1),
+                                     venta("31/01/23", "Pan", 2)])
+        escribir_json("febrero.json", [venta("01/02/23", "Cafe", 3)])
+        with redirect_stdout(io.StringIO()):
+            dias = procesar_ventanas(self.catalogo,
+                                     ["enero.json", "febrero.json"],
+                                     "day", Cuarentena(),
+                                     ruta_acumulados="acumulados.json")
+            meses = procesar_ventanas(self.catalogo,
+                                      ["enero.json", "febrero.json"],
+                                      "month", Cuarentena(),
+                                      ruta_acumulados="acumulados.json")
+            semanas = procesar_ventanas(self.catalogo, ["febrero.json"],
+                                        "week", Cuarentena(),
+                                        ruta_acumulados="acumulados.json")
+        self.assertEqual(dias, {"2023-01-30": 10.0, "2023-01-31": 5.0,
+                                "2023-02-01": 30.0})
+        self.assertEqual(meses, {"2023-01": 15.0, "2023-02": 30.0})
+        self.assertEqual(semanas, {"2023-W05": 30.0})
+
+    def test_fechas_invalidas(self):
+        """
+        Una SALE_Date que no es texto (por ejemplo, una lista) va a la
+        cuarentena en lugar de detener el proceso.
+        """
+        escribir_json("ventas.json", [venta("01/12/23", "Cafe", 1),
+                                      venta(["01/12/23"], "Cafe", 1),
+                                      venta({"dia": 1}, "Pan", 1),
+                                      venta("32/12/23", "Pan", 1)])
+        cuarentena = Cuarentena()
+        with redirect_stdout(io.StringIO()):
+            dias = procesar_ventanas(self.catalogo, ["ventas.json"], "day",
+                                     cuarentena,
+                                     ruta_acumulados="acumulados.json")
+        self.assertEqual(dias, {"2023-12-01": 10.0})
+        self.assertEqual(cuarentena.advertencias,
+                         {"Fecha de venta invalida": 3})
+
+    def test_solo_procesa_archivos_nuevos(self):
+        """
+        Un archivo ya acumulado no se vuelve a leer hasta que cambia.
+        """
+        escribir_json("ventas.json", [venta("01/12/23", "Cafe", 1)])
+        args = (self.catalogo, "ventas.json", "--rollup", "day")
+        self.assertIn("Archivos procesados: 1 de 1", self.ejecutar(*args))
+        self.assertIn("Archivos procesados: 0 de 1", self.ejecutar(*args))
+        escribir_json("ventas.json", [venta("01/12/23", "Cafe", 12)])
+        salida = self.ejecutar(*args)
+        self.assertIn("Archivos procesados: 1 de 1", salida)
+        self.assertIn("Resultado:120.00", salida)
+
+
+class TestHistorialPrecios(PruebaEnDirectorio):
+    """
+    Pruebas de los precios con fecha de vigencia.
+    """
+
+    def test_precio_vigente(self):
+        """
+        El precio de un día es el del último catálogo vigente hasta ese
+        día; antes del primero no hay precio.
+        """
+        historial = HistorialPrecios()
+        historial.agregar_catalogo(date(2023, 6, 1).toordinal(),
+                                   {"Cafe": 12.0})
+        historial.agregar_catalogo(date(2023, 1, 1).toordinal(),
+                                   {"Cafe": 10.0})
+        self.assertIsNone(historial.precio("Cafe", date(2022, 12, 31)))
+        self.assertEqual(historial.precio("Cafe", date(2023, 5, 31)), 10.0)
+        self.assertEqual(historial.precio("Cafe", date(2023, 6, 1)), 12.0)
+        self.assertIsNone(historial.precio("Te", date(2023, 6, 1)))
+
+    def test_total_con_catalogos_fechados(self):
+        """
+        Cada venta se valúa con el catálogo vigente en su SALE_Date; el
+        catálogo principal aplica antes del primero con fecha.
+        """
+        escribir_json("junio.json", [{"title": "Cafe", "price": 12.0}])
+        escribir_json("ventas.json", [venta("31/05/23", "Cafe", 1),
+                                      venta("01/06/23", "Cafe", 1),
+                                      venta("02/06/23", "Pan", 2)])
+        cuarentena = Cuarentena()
+        total = procesar_historial(
+            self.catalogo, [(date(2023, 6, 1), "junio.json")],
+            ["ventas.json"], cuarentena)
+        self.assertEqual(total, 27.0)
+        self.assertEqual(cuarentena.registros, [])
+
+
+class TestMemorizacion(unittest.TestCase):
+    """
+    Pruebas de los límites de las tablas del proceso residente.
+    """
+
+    def test_tablas_acotadas(self):
+        """
+        Los alias, las fechas y las latencias guardan a lo más su
+        límite de entradas.
+        """
+        indice = IndiceDifuso(["Cafe americano", "Pan dulce"], maximo=2)
+        self.assertEqual(indice.resolver("Cafe amerciano"),
+                         "Cafe americano")
+        indice.resolver("Pan dulse")
+        indice.resolver("Zzz")
+        self.assertEqual(list(indice.alias), ["Pan dulse", "Zzz"])
+
+        memo = MemoFechas(maximo=2)
+        for texto in ("01/01/23", "02/01/23", "03/01/23"):
+            memo(texto)
+        self.assertEqual(len(memo._fechas), 2)  # pylint: disable=W0212
+        self.assertEqual(memo("03/01/23"), date(2023, 1, 3))
+
+        metricas = MetricasLatencia(muestras=3)
+        for milisegundos in range(10):
+            metricas.registrar("POST /totals", milisegundos)
+        resumen = metricas.resumen()["POST /totals"]
+        self.assertEqual(resumen["solicitudes"], 10)
+        self.assertEqual(resumen["p50_ms"], 8)
+
+
+class TestServicio(PruebaEnDirectorio):
+    """
+    Pruebas del servicio HTTP con el catálogo residente.
+    """
+
+    def setUp(self):
+        """
+        Inicia el servicio en un puerto libre en un hilo aparte
+        """
+        super().setUp()
+        self.servidor = crear_servidor(self.catalogo, puerto=0)
+        self.hilo = threading.Thread(target=self.servidor.serve_forever,
+                                     daemon=True)
+        self.hilo.start()
+
+    def tearDown(self):
+        """
+        Detiene el servicio
+        """
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.hilo.join()
+        super().tearDown()
+
+    def solicitar(self, metodo, ruta, cuerpo=None, encabezados=None):
+        """
+        Envía una solicitud y devuelve (código, cuerpo decodificado)
+        """
+        conexion = http.client.HTTPConnection(
+            "127.0.0.1", self.servidor.server_address[1], timeout=10)
+        try:
+            conexion.request(metodo, ruta, body=cuerpo,
+                             headers=encabezados or {})
+            respuesta = conexion.getresponse()
+            return respuesta.status, json.loads(respuesta.read())
+        finally:
+            conexion.close()
+
+    def test_recarga_del_catalogo(self):
+        """
+        Un cambio en el catálogo se aplica al siguiente lote sin
+        reiniciar el servicio.
+        """
+        lote = json.dumps([venta("01/12/23", "Cafe", 2)])
+        self.assertEqual(self.solicitar("POST", "/totals", lote),
+                         (200, {"total": 20.0, "descartados": 0,
+                                "advertencias": {}}))
+        # Otro tamaño de archivo asegura que la firma cambie
+        escribir_json(self.catalogo, [{"title": "Cafe", "price": 11.25}])
+        time.sleep(0.01)
+        codigo, cuerpo = self.solicitar("POST", "/totals", lote)
+        self.assertEqual((codigo, cuerpo["total"]), (200, 22.5))
+        self.assertEqual(self.solicitar("GET", "/health"),
+                         (200, {"estado": "ok", "recargas": 1}))
+
+    def test_respuestas_de_error(self):
+        """
+        Las solicitudes inválidas reciben un código de error y el
+        servicio sigue atendiendo.
+        """
+        codigo, _ = self.solicitar("POST", "/totals", b"{no es json")
+        self.assertEqual(codigo, 400)
+        codigo, cuerpo = self.solicitar("POST", "/totals", b"[]",
+                                        {"Content-Length": "abc"})
+        self.assertEqual((codigo, cuerpo),
+                         (400, {"error": "Content-Length invalido"}))
+        self.assertEqual(self.solicitar("GET", "/nada")[0], 404)
+        codigo, cuerpo = self.solicitar("POST", "/totals", b'{"a": 1}')
+        self.assertEqual((codigo, cuerpo["descartados"]), (200, 1))
+
+        with mock.patch.object(computeSales, "totalizar_lote",
+                               side_effect=RuntimeError("falla")):
+            self.assertEqual(self.solicitar("POST", "/totals", b"[]"),
+                             (500, {"error": "Error interno: falla"}))
+
+        os.remove(self.catalogo)
+        self.assertEqual(self.solicitar("POST", "/totals", b"[]")[0], 503)
+        metricas = self.solicitar("GET", "/metrics")[1]
+        self.assertEqual(metricas["POST /totals"]["solicitudes"], 5)
+        self.assertEqual(metricas["GET (otras)"]["solicitudes"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -48,10 +48,44 @@ using Fleak and PyLint.
 # El nombre del entregable no es aceptado por pylint
 # Por eso se desactiva el mensaje C0103
 # pylint: disable=C0103
+# Las clases del entregable (Hotel, Customer, Reservation y Waitlist)
+# dependen entre sí y se mantienen en este archivo; por eso se
+# desactiva el mensaje C0302 de longitud del módulo
+# pylint: disable=C0302
 import json
 import os
 from datetime import datetime
-from typing import Dict, Optional
+from typing import Dict, List, Optional
+
+from cache import record_cache
+from diagnostics import configure_logging, get_logger
+from indexes import normalize_text, secondary_index
+from inventory import RoomInventory, room_inventory, stay_range
+from occupancy import record_change
+from storage import JsonRepository, get_session
+from waitlist import WAITING, waitlist_queue
+
+# Reglas de integridad al eliminar un hotel o cliente con reservaciones
+# activas
+ON_DELETE_RULES = ("restrict", "cascade")
+
+# Los errores y eventos se reportan por logging, no con print
+logger = get_logger("booking")
+
+# Motivos por los que se rechaza una reservación
+REJECTION_MESSAGES = {
+    "invalid_owner": "Cliente o hotel inválido.",
+    "invalid_dates": "La fecha de salida debe ser posterior a la de "
+                     "entrada.",
+    "no_rooms": "No hay habitaciones disponibles.",
+}
+
+
+class _BatchRejected(Exception):
+    """
+    Interrumpe un lote atómico para que su transacción deshaga las
+    reservaciones que ya había registrado.
+    """
 
 
 # 1. Hotel
@@ -72,15 +106,22 @@ class Hotel:
         create_hotel(name, location, total_rooms): Crea un nuevo hotel y lo
                                                    guarda en el archivo JSON.
         delete_hotel(hotel_id): Elimina un hotel por su ID.
-        display_hotel_info(hotel_id): Retorna un objeto Hotel si existe,
-                                      o None en caso contrario.
+        get_hotel(hotel_id): Retorna un objeto Hotel si existe,
+                             o None en caso contrario.
+        display_hotel_info(hotel_id): Igual que get_hotel, pero además
+                                      muestra el hotel en la consola.
         modify_hotel_information(hotel_id, ...): Modifica la información
                                                  de un hotel existente.
-        reserve_room(hotel_id): Reserva una habitación disponible en el hotel.
+        reserve_room(hotel_id, check_in, check_out): Reserva una habitación
+                                                    disponible en el hotel.
         cancel_room_reservation(hotel_id): Cancela una reserva existente
                                            (si hay habitaciones ocupadas).
     """
+    __slots__ = ("hotel_id", "name", "location", "total_rooms",
+                 "booked_rooms")
     FILE_PATH = "hotels.json"
+    ON_DELETE = "restrict"
+    CACHE_SIZE = 1024
 
     def __init__(self, hotel_id: int, name: str,
                  location: str, total_rooms: int, booked_rooms: int = 0):
@@ -104,6 +145,13 @@ class Hotel:
         """
         return self.total_rooms - self.booked_rooms
 
+    @staticmethod
+    def repository() -> JsonRepository:
+        """
+        Devuelve el repositorio de hoteles de la sesión activa.
+        """
+        return get_session().repository("hotels", Hotel.FILE_PATH)
+
     @staticmethod
     def load_hotels() -> Dict[str, dict]:
         """
@@ -111,18 +159,16 @@ class Hotel:
         y los devuelve como un diccionario
         con claves de tipo string (hotel_id).
         """
-        if not os.path.exists(Hotel.FILE_PATH):
-            return {}
-        with open(Hotel.FILE_PATH, 'r', encoding='utf-8') as hotel_file:
-            return json.load(hotel_file)
+        return Hotel.repository().snapshot()
 
     @staticmethod
     def save_hotels(data: Dict[str, dict]) -> None:
         """
         Guarda el diccionario proporcionado en el archivo hotels.json.
         """
-        with open(Hotel.FILE_PATH, 'w', encoding='utf-8') as hotel_file:
-            json.dump(data, hotel_file, indent=2)
+        repo = Hotel.repository()
+        with get_session().transaction(repo):
+            repo.replace_all(data)
 
     # a. Crea un Hotel
     @staticmethod
@@ -131,50 +177,57 @@ class Hotel:
         Crea un nuevo Hotel, asigna un nuevo ID,
         lo guarda en JSON y devuelve la instancia de Hotel.
         """
-        hotels_data = Hotel.load_hotels()
-        # Genera un nuevo ID encontrando el ID máximo existente y añadiéndole 1
-        existing_ids = [int(hid) for hid in hotels_data.keys()]
-        new_id = max(existing_ids, default=0) + 1
-
-        hotel = Hotel(hotel_id=new_id, name=name,
-                      location=location, total_rooms=total_rooms)
-        hotels_data[str(new_id)] = {
-            "hotel_id": new_id,
-            "name": name,
-            "location": location,
-            "total_rooms": total_rooms,
-            "booked_rooms": 0
-        }
-        Hotel.save_hotels(hotels_data)
-        return hotel
+        repo = Hotel.repository()
+        with get_session().transaction(repo):
+            # Toma el siguiente ID del contador persistente del almacén
+            new_id = repo.next_id()
+            repo.put(str(new_id), {
+                "hotel_id": new_id,
+                "name": name,
+                "location": location,
+                "total_rooms": total_rooms,
+                "booked_rooms": 0
+            })
+        return Hotel(hotel_id=new_id, name=name,
+                     location=location, total_rooms=total_rooms)
 
     # b. Elimina el Hotel
     @staticmethod
-    def delete_hotel(hotel_id: int) -> bool:
+    def delete_hotel(hotel_id: int, on_delete: Optional[str] = None) -> bool:
         """
         Elimina el hotel con el hotel_id dado del archivo JSON.
         Devuelve True si se eliminó con éxito, o False si el hotel no existe.
+        Si tiene reservaciones activas se aplica on_delete (por defecto
+        Hotel.ON_DELETE): "restrict" no lo elimina y "cascade" cancela
+        esas reservaciones.
         """
-        hotels_data = Hotel.load_hotels()
-        if str(hotel_id) in hotels_data:
-            del hotels_data[str(hotel_id)]
-            Hotel.save_hotels(hotels_data)
-            return True
-        return False
+        return Reservation.delete_owner(Hotel.repository(), "hotel_id",
+                                        hotel_id,
+                                        on_delete or Hotel.ON_DELETE)
+
+    @staticmethod
+    def get_hotel(hotel_id: int) -> Optional['Hotel']:
+        """
+        Devuelve una instancia de Hotel para el hotel_id dado,
+        o None si no existe. No escribe nada en la consola.
+        El registro sale de una caché LRU, pero cada llamada recibe
+        una instancia nueva que puede modificarse sin afectarla.
+        """
+        repo = Hotel.repository()
+        repo.refresh()
+        return record_cache(repo, Hotel, Hotel.CACHE_SIZE).get(
+            str(hotel_id))
 
     # c. Muestra la información del Hotel
     @staticmethod
     def display_hotel_info(hotel_id: int) -> Optional['Hotel']:
         """
-        Devuelve una instancia de Hotel para el hotel_id dado,
-        o None si no existe.
+        Muestra en la consola el hotel con el hotel_id dado y lo
+        devuelve como en get_hotel.
         """
-        hotels_data = Hotel.load_hotels()
-        data = hotels_data.get(str(hotel_id))
-        print(data)
-        if data is None:
-            return None
-        return Hotel(**data)
+        hotel = Hotel.get_hotel(hotel_id)
+        print(hotel)
+        return hotel
 
     # d. Modifica la información del Hotel
     @staticmethod
@@ -185,46 +238,76 @@ class Hotel:
         Modifica la información del hotel si existe.
         Devuelve True si se modificó con éxito, False en caso contrario.
         """
-        hotels_data = Hotel.load_hotels()
-        hotel_dict = hotels_data.get(str(hotel_id))
-        if not hotel_dict:
-            return False
-
-        if name is not None:
-            hotel_dict["name"] = name
-        if location is not None:
-            hotel_dict["location"] = location
-        if total_rooms is not None:
-            # Nos aseguramos de que el nuevo total
-            # no sea menor que las habitaciones ya reservadas
-            if total_rooms < hotel_dict["booked_rooms"]:
+        repo = Hotel.repository()
+        with get_session().transaction(repo):
+            hotel_dict = repo.get(str(hotel_id))
+            if not hotel_dict:
                 return False
-            hotel_dict["total_rooms"] = total_rooms
+            hotel_dict = dict(hotel_dict)
+
+            if name is not None:
+                hotel_dict["name"] = name
+            if location is not None:
+                hotel_dict["location"] = location
+            if total_rooms is not None:
+                # Nos aseguramos de que el nuevo total no sea menor que
+                # las habitaciones ocupadas en la noche más concurrida
+                if total_rooms < Hotel.rooms_in_use(hotel_dict):
+                    return False
+                hotel_dict["total_rooms"] = total_rooms
+
+            repo.put(str(hotel_id), hotel_dict)
+            return True
 
-        hotels_data[str(hotel_id)] = hotel_dict
-        Hotel.save_hotels(hotels_data)
-        return True
+    @staticmethod
+    def rooms_in_use(hotel_dict: dict, check_in: Optional[datetime] = None,
+                     check_out: Optional[datetime] = None,
+                     inventory: Optional[RoomInventory] = None) -> int:
+        """
+        Habitaciones ocupadas del hotel: las apartadas sin fechas (que
+        bloquean todas las noches) más el máximo de habitaciones
+        ocupadas en una noche del rango, o en cualquier noche si no se
+        da un rango.
+        """
+        hotel_id = hotel_dict["hotel_id"]
+        if inventory is None:
+            inventory = room_inventory(Reservation.repository())
+        undated = (hotel_dict["booked_rooms"]
+                   - inventory.dated_reservations(hotel_id))
+        if check_in is None or check_out is None:
+            return undated + inventory.peak(hotel_id)
+        return undated + inventory.occupied(hotel_id, check_in.toordinal(),
+                                            check_out.toordinal())
 
     # e. Reserva una habitación
     @staticmethod
-    def reserve_room(hotel_id: int) -> bool:
+    def reserve_room(hotel_id: int, check_in: Optional[datetime] = None,
+                     check_out: Optional[datetime] = None) -> bool:
         """
         Reserva una sola habitación en el hotel especificado.
+        Con check_in y check_out la disponibilidad se revisa solo para
+        esas noches; sin fechas la habitación se aparta para todas.
         Devuelve True si se reservó con éxito, False en caso contrario.
         """
-        hotels_data = Hotel.load_hotels()
-        hotel_dict = hotels_data.get(str(hotel_id))
-        if not hotel_dict:
-            return False
+        repo = Hotel.repository()
+        with get_session().transaction(repo, Reservation.repository()):
+            hotel_dict = repo.get(str(hotel_id))
+            if not hotel_dict:
+                return False
 
-        available_rooms = (hotel_dict["total_rooms"]
-                           - hotel_dict["booked_rooms"])
-        if available_rooms > 0:
-            hotel_dict["booked_rooms"] += 1
-            hotels_data[str(hotel_id)] = hotel_dict
-            Hotel.save_hotels(hotels_data)
-            return True
-        return False
+            if check_in is None or check_out is None:
+                available_rooms = (hotel_dict["total_rooms"]
+                                   - hotel_dict["booked_rooms"])
+            else:
+                available_rooms = (hotel_dict["total_rooms"]
+                                   - Hotel.rooms_in_use(
+                                       hotel_dict, check_in, check_out))
+            if available_rooms > 0:
+                hotel_dict = dict(hotel_dict)
+                hotel_dict["booked_rooms"] += 1
+                repo.put(str(hotel_id), hotel_dict)
+                return True
+            return False
 
     # f. Cancela una Reservacion
     @staticmethod
@@ -234,17 +317,55 @@ class Hotel:
         en el hotel especificado, si es posible.
         Devuelve True si se liberó con éxito, o False en caso contrario.
         """
-        hotels_data = Hotel.load_hotels()
-        hotel_dict = hotels_data.get(str(hotel_id))
-        if not hotel_dict:
+        repo = Hotel.repository()
+        with get_session().transaction(repo):
+            hotel_dict = repo.get(str(hotel_id))
+            if not hotel_dict:
+                return False
+
+            if hotel_dict["booked_rooms"] > 0:
+                hotel_dict = dict(hotel_dict)
+                hotel_dict["booked_rooms"] -= 1
+                repo.put(str(hotel_id), hotel_dict)
+                return True
             return False
 
-        if hotel_dict["booked_rooms"] > 0:
-            hotel_dict["booked_rooms"] -= 1
-            hotels_data[str(hotel_id)] = hotel_dict
-            Hotel.save_hotels(hotels_data)
-            return True
-        return False
+    # Búsqueda de disponibilidad
+    @staticmethod
+    def search(location: Optional[str] = None, rooms: int = 1,
+               check_in: Optional[datetime] = None,
+               check_out: Optional[datetime] = None) -> List['Hotel']:
+        """
+        Devuelve los hoteles de la ubicación dada (todos si es None) con
+        al menos rooms habitaciones libres entre check_in y check_out
+        (en cualquier noche si no se dan fechas), ordenados de mayor a
+        menor capacidad libre. La ubicación se compara sin importar
+        mayúsculas y se resuelve con un índice secundario, y la
+        ocupación por noche sale del inventario de reservaciones, así
+        que no se lee ni se imprime cada hotel.
+        """
+        repo = Hotel.repository()
+        reservations = Reservation.repository()
+        repo.refresh()
+        reservations.refresh()
+        if location is None:
+            records = repo.items()
+        else:
+            keys = secondary_index(repo, "location",
+                                   normalize_text).lookup(location)
+            records = ((key, repo.get(key)) for key in keys)
+        inventory = room_inventory(reservations)
+
+        matches = []
+        for _, hotel_dict in records:
+            if hotel_dict is None:
+                continue
+            free = hotel_dict["total_rooms"] - Hotel.rooms_in_use(
+                hotel_dict, check_in, check_out, inventory)
+            if free >= rooms:
+                matches.append((free, hotel_dict))
+        matches.sort(key=lambda match: (-match[0], match[1]["hotel_id"]))
+        return [Hotel(**hotel_dict) for _, hotel_dict in matches]
 
     def __repr__(self):
         return (f"Hotel(hotel_id={self.hotel_id}, name='{self.name}', "
@@ -266,18 +387,31 @@ class Customer:
         create_customer(name, email): Crea un nuevo cliente
                                       y lo guarda en el archivo JSON.
         delete_customer(customer_id): Elimina un cliente por su ID.
-        display_customer_info(customer_id): Retorna un objeto Customer si
-                                            existe, o None en caso contrario.
+        get_customer(customer_id): Retorna un objeto Customer si existe,
+                                   o None en caso contrario.
+        display_customer_info(customer_id): Igual que get_customer, pero
+                                            además muestra el cliente.
         modify_customer_information(customer_id, ...): Modifica los datos de
                                                        un cliente existente.
+        find_by_email(email): Busca un cliente por su correo (único).
     """
+    __slots__ = ("customer_id", "name", "email")
     FILE_PATH = "customers.json"
+    ON_DELETE = "restrict"
+    CACHE_SIZE = 1024
 
     def __init__(self, customer_id: int, name: str, email: str):
         self.customer_id = customer_id
         self.name = name
         self.email = email
 
+    @staticmethod
+    def repository() -> JsonRepository:
+        """
+        Devuelve el repositorio de clientes de la sesión activa.
+        """
+        return get_session().repository("customers", Customer.FILE_PATH)
+
     @staticmethod
     def load_customers() -> Dict[str, dict]:
         """
@@ -285,67 +419,79 @@ class Customer:
         y los devuelve como un diccionario
         con claves de tipo string (hotel_id).
         """
-        if not os.path.exists(Customer.FILE_PATH):
-            return {}
-        with open(Customer.FILE_PATH, 'r', encoding='utf-8') as customer_file:
-            return json.load(customer_file)
+        return Customer.repository().snapshot()
 
     @staticmethod
     def save_customers(data: Dict[str, dict]) -> None:
         """
         Guarda el diccionario proporcionado en el archivo customers.json.
         """
-        with open(Customer.FILE_PATH, 'w', encoding='utf-8') as customer_file:
-            json.dump(data, customer_file, indent=2)
+        repo = Customer.repository()
+        with get_session().transaction(repo):
+            repo.replace_all(data)
 
     # a. Crea un Cliente
     @staticmethod
-    def create_customer(name: str, email: str) -> 'Customer':
+    def create_customer(name: str, email: str) -> Optional['Customer']:
         """
         Crea un nuevo cliente, asigna un nuevo ID,
         lo guarda en JSON y devuelve la instancia de cliente.
+        Devuelve None si el correo ya pertenece a otro cliente.
         """
-        customers_data = Customer.load_customers()
-        existing_ids = [int(cid) for cid in customers_data.keys()]
-        new_id = max(existing_ids, default=0) + 1
-
-        cust = Customer(customer_id=new_id, name=name, email=email)
-        customers_data[str(new_id)] = {
-            "customer_id": new_id,
-            "name": name,
-            "email": email
-        }
-        Customer.save_customers(customers_data)
-        return cust
+        repo = Customer.repository()
+        with get_session().transaction(repo):
+            if Customer.email_index(repo).lookup_one(email) is not None:
+                logger.warning("Ya existe un cliente con el correo %s.",
+                               email, extra={"event": "customer_rejected",
+                                             "reason": "duplicate_email",
+                                             "email": email})
+                return None
+            new_id = repo.next_id()
+            repo.put(str(new_id), {
+                "customer_id": new_id,
+                "name": name,
+                "email": email
+            })
+        return Customer(customer_id=new_id, name=name, email=email)
 
     # b. Elimina un Cliente
     @staticmethod
-    def delete_customer(customer_id: int) -> bool:
+    def delete_customer(customer_id: int,
+                        on_delete: Optional[str] = None) -> bool:
         """
         Elimina el cliente con el customer_id dado del archivo JSON.
         Devuelve True si se eliminó con éxito, o False si el cliente no existe.
+        Si tiene reservaciones activas se aplica on_delete (por defecto
+        Customer.ON_DELETE), igual que en Hotel.delete_hotel.
         """
-        customers_data = Customer.load_customers()
-        if str(customer_id) in customers_data:
-            del customers_data[str(customer_id)]
-            Customer.save_customers(customers_data)
-            return True
-        return False
+        return Reservation.delete_owner(Customer.repository(),
+                                        "customer_id", customer_id,
+                                        on_delete or Customer.ON_DELETE)
+
+    @staticmethod
+    def get_customer(customer_id: int) -> Optional['Customer']:
+        """
+        Devuelve una instancia de cliente para el customer_id dado,
+        o None si no existe. No escribe nada en la consola.
+        El registro sale de una caché LRU, pero cada llamada recibe
+        una instancia nueva que puede modificarse sin afectarla.
+        """
+        repo = Customer.repository()
+        repo.refresh()
+        return record_cache(repo, Customer, Customer.CACHE_SIZE).get(
+            str(customer_id))
 
     # c. Muestra la Información de un Cliente
     @staticmethod
     def display_customer_info(customer_id: int
                               ) -> Optional['Customer']:
         """
-        Devuelve una instancia de cliente para el customer_id dado,
-        o None si no existe.
+        Muestra en la consola el cliente con el customer_id dado y lo
+        devuelve como en get_customer.
         """
-        customers_data = Customer.load_customers()
-        data = customers_data.get(str(customer_id))
-        print(data)
-        if data is None:
-            return None
-        return Customer(**data)
+        customer = Customer.get_customer(customer_id)
+        print(customer)
+        return customer
 
     # d. Modifica la Información de un Cliente
     @staticmethod
@@ -355,19 +501,43 @@ class Customer:
         Modifica la información un cliente si existe.
         Devuelve True si se modificó con éxito, False en caso contrario.
         """
-        customers_data = Customer.load_customers()
-        cust_dict = customers_data.get(str(customer_id))
-        if not cust_dict:
-            return False
+        repo = Customer.repository()
+        with get_session().transaction(repo):
+            cust_dict = repo.get(str(customer_id))
+            if not cust_dict:
+                return False
+            cust_dict = dict(cust_dict)
 
-        if name is not None:
-            cust_dict["name"] = name
-        if email is not None:
-            cust_dict["email"] = email
+            if name is not None:
+                cust_dict["name"] = name
+            if email is not None:
+                owner = Customer.email_index(repo).lookup_one(email)
+                if owner is not None and owner != str(customer_id):
+                    return False
+                cust_dict["email"] = email
 
-        customers_data[str(customer_id)] = cust_dict
-        Customer.save_customers(customers_data)
-        return True
+            repo.put(str(customer_id), cust_dict)
+            return True
+
+    @staticmethod
+    def email_index(repo: JsonRepository):
+        """
+        Índice único de correo (sin importar mayúsculas) a cliente.
+        """
+        return secondary_index(repo, "email", normalize_text)
+
+    @staticmethod
+    def find_by_email(email: str) -> Optional['Customer']:
+        """
+        Devuelve el cliente con el correo dado, o None si no existe.
+        """
+        repo = Customer.repository()
+        repo.refresh()
+        key = Customer.email_index(repo).lookup_one(email)
+        data = None if key is None else repo.get(key)
+        if data is None:
+            return None
+        return Customer(**data)
 
     def __repr__(self):
         return (f"Customer(customer_id={self.customer_id}, "
@@ -393,7 +563,11 @@ class Reservation:
             y el hotel existen y hay habitaciones disponibles.
         cancel_reservation(reservation_id): Cancela una reserva activa
                                             y libera la habitación en el hotel.
+        for_customer(customer_id), for_hotel(hotel_id): Reservaciones de
+            un cliente o de un hotel, resueltas con índices secundarios.
     """
+    __slots__ = ("reservation_id", "customer_id", "hotel_id", "check_in",
+                 "check_out", "is_active")
     FILE_PATH = "reservations.json"
 
     def __init__(self, reservation_id: int, customer_id: int, hotel_id: int,
@@ -413,24 +587,62 @@ class Reservation:
         self.check_out = check_out
         self.is_active = is_active
 
+    @staticmethod
+    def repository() -> JsonRepository:
+        """
+        Devuelve el repositorio de reservaciones de la sesión activa.
+        """
+        return get_session().repository("reservations",
+                                        Reservation.FILE_PATH)
+
+    @staticmethod
+    def stats_repository() -> JsonRepository:
+        """
+        Devuelve el almacén de los contadores de ocupación (ver
+        occupancy.py), que está junto al de reservaciones.
+        """
+        return get_session().repository("occupancy",
+                                        f"{Reservation.FILE_PATH}.stats")
+
     @staticmethod
     def load_reservations() -> Dict[str, dict]:
         """
         Carga todas las reservaciones desde el archivo reservations.json
         y los devuelve como un diccionario.
         """
-        if not os.path.exists(Reservation.FILE_PATH):
-            return {}
-        with open(Reservation.FILE_PATH, 'r', encoding='utf-8') as res_file:
-            return json.load(res_file)
+        return Reservation.repository().snapshot()
 
     @staticmethod
     def save_reservations(data: Dict[str, dict]) -> None:
         """
         Guarda el diccionario proporcionado en el archivo reservations.json.
         """
-        with open(Reservation.FILE_PATH, 'w', encoding='utf-8') as res_file:
-            json.dump(data, res_file, indent=2)
+        repo = Reservation.repository()
+        stats = Reservation.stats_repository()
+        with get_session().transaction(repo, stats):
+            previous = repo.snapshot()
+            repo.replace_all(data)
+            # Las que desaparecen no cambian los contadores, como al
+            # archivarlas
+            for key, record in data.items():
+                record_change(stats, previous.get(key), record)
+
+    @staticmethod
+    def log_rejection(reason: str, customer_id: int, hotel_id: int,
+                      position: Optional[int] = None) -> None:
+        """
+        Reporta una solicitud de reservación rechazada con su motivo
+        (una clave de REJECTION_MESSAGES) y, en lotes, su posición.
+        """
+        extra = {"event": "reservation_rejected", "reason": reason,
+                 "customer_id": customer_id, "hotel_id": hotel_id}
+        message = REJECTION_MESSAGES[reason]
+        if position is None:
+            logger.warning(message, extra=extra)
+        else:
+            extra["position"] = position
+            logger.warning("Error en la solicitud %d: %s", position,
+                           message, extra=extra)
 
     # a. Crea una Reservacion (Cliente, Hotel)
     @staticmethod
@@ -441,28 +653,56 @@ class Reservation:
         y si hay una habitación disponible.
         Devuelve el objeto reservation si tiene éxito, o None si falla.
         """
-        # 1. Verifica que el cliente y el hotel existan
-        customer = Customer.display_customer_info(customer_id)
-        hotel = Hotel.display_hotel_info(hotel_id)
-        if not customer or not hotel:
-            print("Error: Cliente o hotel inválido.")
-            return None
-
-        # 2. Intenta reservar una habitación en el hotel
-        if not Hotel.reserve_room(hotel_id):
-            print("Error: No hay habitaciones disponibles.")
-            return None
-
-        # 3. Crea el registro de la reservacion
-        reservations_data = Reservation.load_reservations()
-        existing_ids = [int(rid) for rid in reservations_data.keys()]
-        new_id = max(existing_ids, default=0) + 1
-
         # Almacena las fechas como strings para JSON
         check_in_str = check_in.strftime("%Y-%m-%d")
         check_out_str = check_out.strftime("%Y-%m-%d")
 
-        reservation = Reservation(
+        # La reserva de la habitación y el registro de la reservacion
+        # ocurren juntos o no ocurren, aunque otros procesos reserven
+        # al mismo tiempo
+        repo = Reservation.repository()
+        stats = Reservation.stats_repository()
+        with get_session().transaction(Customer.repository(),
+                                       Hotel.repository(), repo, stats):
+            # 1. Verifica que el cliente y el hotel existan bajo los
+            # mismos candados, para que una eliminación concurrente no
+            # deje la reservación sin dueño
+            if (str(customer_id) not in Customer.repository()
+                    or str(hotel_id) not in Hotel.repository()):
+                Reservation.log_rejection("invalid_owner", customer_id,
+                                          hotel_id)
+                return None
+            stay = stay_range(check_in_str, check_out_str)
+            if stay is None:
+                Reservation.log_rejection("invalid_dates", customer_id,
+                                          hotel_id)
+                return None
+
+            # 2. Intenta reservar una habitación en el hotel
+            if not Hotel.reserve_room(hotel_id, check_in, check_out):
+                Reservation.log_rejection("no_rooms", customer_id, hotel_id)
+                return None
+
+            # 3. Crea el registro de la reservacion
+            new_id = repo.next_id()
+            record = {
+                "reservation_id": new_id,
+                "customer_id": customer_id,
+                "hotel_id": hotel_id,
+                "check_in": check_in_str,
+                "check_out": check_out_str,
+                "is_active": True
+            }
+            repo.put(str(new_id), record)
+            room_inventory(repo).book(hotel_id, *stay)
+            record_change(stats, None, record)
+
+        logger.info("Reservación %s creada.", new_id,
+                    extra={"event": "reservation_created",
+                           "reservation_id": new_id,
+                           "customer_id": customer_id,
+                           "hotel_id": hotel_id})
+        return Reservation(
             reservation_id=new_id,
             customer_id=customer_id,
             hotel_id=hotel_id,
@@ -470,15 +710,102 @@ class Reservation:
             check_out=check_out_str,
             is_active=True
         )
-        reservations_data[str(new_id)] = {
-            "reservation_id": new_id,
+
+    # Reservaciones en lote
+    @staticmethod
+    def create_reservations(requests: List[tuple], atomic: bool = True
+                            ) -> List[Optional['Reservation']]:
+        """
+        Crea varias reservaciones de una vez. Cada solicitud es una tupla
+        (customer_id, hotel_id, check_in, check_out) como los argumentos
+        de create_reservation.
+
+        Los clientes y hoteles se validan en una sola pasada, la
+        disponibilidad se aparta para todo el lote bajo los mismos
+        candados y los cambios se escriben una sola vez al final.
+        Con atomic=True, si alguna solicitud falla la transacción
+        deshace las que ya se habían registrado (sus IDs no se
+        reutilizan); con atomic=False se crean las que se puedan.
+
+        Devuelve una lista alineada con las solicitudes con la
+        reservacion creada o None si esa solicitud falló.
+        """
+        requests = list(requests)
+        results: List[Optional[Reservation]] = [None] * len(requests)
+        repo = Reservation.repository()
+        try:
+            # Los clientes también se bloquean para que una eliminación
+            # concurrente no deje reservaciones sin dueño
+            with get_session().transaction(Customer.repository(),
+                                           Hotel.repository(), repo,
+                                           Reservation.stats_repository()):
+                for position, request in enumerate(requests):
+                    error = Reservation._batch_error(repo, *request)
+                    if error is None:
+                        results[position] = Reservation._book(repo,
+                                                              *request)
+                        continue
+                    Reservation.log_rejection(error, request[0],
+                                              request[1], position)
+                    if atomic:
+                        raise _BatchRejected()
+        except _BatchRejected:
+            # La transacción deshizo las reservaciones del lote y el
+            # inventario se reconstruye porque la generación cambió
+            return [None] * len(requests)
+        return results
+
+    @staticmethod
+    def _batch_error(repo: JsonRepository, customer_id: int, hotel_id: int,
+                     check_in: datetime, check_out: datetime
+                     ) -> Optional[str]:
+        """
+        Revisa una solicitud del lote contra lo que ya apartaron las
+        anteriores. Devuelve el motivo del rechazo (una clave de
+        REJECTION_MESSAGES) o None si se puede reservar.
+        """
+        hotel_dict = Hotel.repository().get(str(hotel_id))
+        if (hotel_dict is None
+                or str(customer_id) not in Customer.repository()):
+            return "invalid_owner"
+        if stay_range(check_in.strftime("%Y-%m-%d"),
+                      check_out.strftime("%Y-%m-%d")) is None:
+            return "invalid_dates"
+        if hotel_dict["total_rooms"] <= Hotel.rooms_in_use(
+                hotel_dict, check_in, check_out, room_inventory(repo)):
+            return "no_rooms"
+        return None
+
+    @staticmethod
+    def _book(repo: JsonRepository, customer_id: int, hotel_id: int,
+              check_in: datetime, check_out: datetime) -> 'Reservation':
+        """
+        Registra una reservación del lote ya validada y aparta su
+        habitación para que las siguientes solicitudes vean la
+        ocupación. Se llama dentro de la transacción del lote.
+        """
+        hotels = Hotel.repository()
+        hotel_dict = dict(hotels.get(str(hotel_id)))
+        hotel_dict["booked_rooms"] += 1
+        hotels.put(str(hotel_id), hotel_dict)
+        reservation = Reservation(
+            reservation_id=repo.next_id(),
+            customer_id=customer_id,
+            hotel_id=hotel_id,
+            check_in=check_in.strftime("%Y-%m-%d"),
+            check_out=check_out.strftime("%Y-%m-%d"))
+        record = {
+            "reservation_id": reservation.reservation_id,
             "customer_id": customer_id,
             "hotel_id": hotel_id,
-            "check_in": check_in_str,
-            "check_out": check_out_str,
+            "check_in": reservation.check_in,
+            "check_out": reservation.check_out,
             "is_active": True
         }
-        Reservation.save_reservations(reservations_data)
+        repo.put(str(reservation.reservation_id), record)
+        room_inventory(repo).book(hotel_id, *stay_range(
+            reservation.check_in, reservation.check_out))
+        record_change(Reservation.stats_repository(), None, record)
         return reservation
 
     # b. Cancelar una reservacion
@@ -487,25 +814,137 @@ class Reservation:
         """
         Cancela una reservacion existente (la marca como inactiva)
         y libera una habitación en el hotel.
+        La habitación liberada pasa a la siguiente solicitud de la
+        lista de espera del hotel que quepa en esas fechas.
         Devuelve True si tuvo éxito, False en caso contrario.
         """
-        reservations_data = Reservation.load_reservations()
-        res_dict = reservations_data.get(str(reservation_id))
-        if not res_dict:
-            return False
-        if not res_dict["is_active"]:
-            # Ya estaba cancelada
-            return False
+        repo = Reservation.repository()
+        # Incluye los almacenes que usa la promoción de la lista de
+        # espera, para tomar todos los candados en el mismo orden
+        with get_session().transaction(Customer.repository(),
+                                       Hotel.repository(), repo,
+                                       Reservation.stats_repository(),
+                                       Waitlist.repository()):
+            res_dict = repo.get(str(reservation_id))
+            if not res_dict:
+                return False
+            if not res_dict["is_active"]:
+                # Ya estaba cancelada
+                return False
+            Reservation._deactivate(repo, str(reservation_id), res_dict)
+            Waitlist.promote(res_dict["hotel_id"])
+        logger.info("Reservación %s cancelada.", reservation_id,
+                    extra={"event": "reservation_canceled",
+                           "reservation_id": reservation_id,
+                           "hotel_id": res_dict["hotel_id"]})
+        return True
 
-        # Marca la reservacion como inactiva
+    @staticmethod
+    def _deactivate(repo: JsonRepository, key: str, res_dict: dict) -> None:
+        """
+        Marca la reservacion como inactiva, libera sus noches y la
+        habitación en el hotel y la cuenta como cancelada. Se llama
+        dentro de una transacción sobre hoteles, reservaciones y sus
+        contadores.
+        """
+        inventory = room_inventory(repo)
+        previous = res_dict
+        res_dict = dict(res_dict)
         res_dict["is_active"] = False
-        reservations_data[str(reservation_id)] = res_dict
-        Reservation.save_reservations(reservations_data)
+        repo.put(key, res_dict)
+        record_change(Reservation.stats_repository(), previous, res_dict)
+        stay = stay_range(res_dict["check_in"], res_dict["check_out"])
+        if stay is not None:
+            inventory.release(res_dict["hotel_id"], *stay)
+        Hotel.cancel_room_reservation(res_dict["hotel_id"])
 
-        # Libera la habitación en el hotel
-        hotel_id = res_dict["hotel_id"]
-        Hotel.cancel_room_reservation(hotel_id)
-        return True
+    @staticmethod
+    def _active_keys(repo: JsonRepository, field: str,
+                     value: int) -> List[str]:
+        """
+        Claves de las reservaciones activas cuyo campo vale value,
+        resueltas con el índice secundario del campo en O(k).
+        """
+        keys = []
+        for key in secondary_index(repo, field).lookup(value):
+            data = repo.get(key)
+            if data is not None and data["is_active"]:
+                keys.append(key)
+        return keys
+
+    @staticmethod
+    def delete_owner(owner_repo: JsonRepository, field: str, owner_id: int,
+                     on_delete: str) -> bool:
+        """
+        Elimina un hotel o cliente aplicando la regla de integridad con
+        sus reservaciones activas: "restrict" rechaza la eliminación si
+        las hay y "cascade" las cancela antes de eliminar. Las
+        reservaciones canceladas se conservan como historial y las
+        habitaciones que liberan pasan a la lista de espera de su hotel
+        una vez eliminado el dueño.
+        """
+        if on_delete not in ON_DELETE_RULES:
+            raise ValueError(f"Regla de eliminación desconocida: {on_delete}")
+        repo = Reservation.repository()
+        with get_session().transaction(Customer.repository(),
+                                       Hotel.repository(), owner_repo, repo,
+                                       Reservation.stats_repository(),
+                                       Waitlist.repository()):
+            if str(owner_id) not in owner_repo:
+                return False
+            active = Reservation._active_keys(repo, field, owner_id)
+            if active and on_delete == "restrict":
+                logger.warning("Hay %d reservaciones activas asociadas.",
+                               len(active),
+                               extra={"event": "delete_restricted",
+                                      "field": field,
+                                      "owner_id": owner_id,
+                                      "active": len(active)})
+                return False
+            released = set()
+            for key in active:
+                res_dict = repo.get(key)
+                Reservation._deactivate(repo, key, res_dict)
+                released.add(res_dict["hotel_id"])
+            deleted = owner_repo.delete(str(owner_id))
+            for hotel_id in sorted(released):
+                Waitlist.promote(hotel_id)
+            return deleted
+
+    @staticmethod
+    def _find(field: str, value: int,
+              active_only: bool) -> List['Reservation']:
+        """
+        Reservaciones cuyo campo vale value, resueltas con el índice
+        secundario del campo y ordenadas por ID.
+        """
+        repo = Reservation.repository()
+        repo.refresh()
+        keys = secondary_index(repo, field).lookup(value)
+        found = []
+        for key in sorted(keys, key=int):
+            data = repo.get(key)
+            if data is not None and (data["is_active"] or not active_only):
+                found.append(Reservation(**data))
+        return found
+
+    @staticmethod
+    def for_customer(customer_id: int,
+                     active_only: bool = False) -> List['Reservation']:
+        """
+        Devuelve las reservaciones del cliente dado; solo las activas si
+        active_only es True.
+        """
+        return Reservation._find("customer_id", customer_id, active_only)
+
+    @staticmethod
+    def for_hotel(hotel_id: int,
+                  active_only: bool = False) -> List['Reservation']:
+        """
+        Devuelve las reservaciones del hotel dado; solo las activas si
+        active_only es True.
+        """
+        return Reservation._find("hotel_id", hotel_id, active_only)
 
     def __repr__(self):
         return (
@@ -518,11 +957,251 @@ class Reservation:
             f"is_active={self.is_active})")
 
 
+# 4. Lista de espera
+# Un atributo por campo del registro, como Reservation
+class Waitlist:  # pylint: disable=too-many-instance-attributes
+    """
+    Solicitud de reservación en espera de un hotel sin habitaciones
+    para esas fechas. Cuando una cancelación libera una habitación, la
+    siguiente solicitud que cabe se convierte en reservación.
+
+    Atributos:
+        waitlist_id (int): ID único de la solicitud; da el orden de
+                           llegada.
+        customer_id (int): Cliente que la hizo.
+        hotel_id (int): Hotel que se solicitó.
+        check_in (str), check_out (str): Fechas 'YYYY-MM-DD'.
+        priority (int): Prioridad (por ejemplo el nivel del cliente);
+                        se atiende primero la más alta.
+        requested_at (str): Fecha y hora de la solicitud.
+        status (str): "waiting", "promoted" o "withdrawn".
+        reservation_id (int): Reservación creada al atenderla, o 0.
+
+    Métodos estáticos principales:
+        join(customer_id, hotel_id, check_in, check_out, priority): Agrega
+            una solicitud a la lista de espera.
+        reserve_or_join(...): Reserva si hay lugar o, si no, espera.
+        withdraw(waitlist_id): Retira una solicitud en espera.
+        promote(hotel_id): Atiende las solicitudes que ya caben.
+        pending(hotel_id): Solicitudes en espera en orden de atención.
+    """
+    __slots__ = ("waitlist_id", "customer_id", "hotel_id", "check_in",
+                 "check_out", "priority", "requested_at", "status",
+                 "reservation_id")
+    FILE_PATH = "waitlist.json"
+    # Solicitudes que se revisan como máximo por cada habitación
+    # liberada; las que no caben regresan a la cola
+    PROMOTION_WINDOW = 16
+
+    # Se construye con Waitlist(**registro): un argumento por campo
+    def __init__(  # pylint: disable=R0913,R0917
+            self, waitlist_id: int, customer_id: int, hotel_id: int,
+            check_in: str, check_out: str, priority: int = 0,
+            requested_at: str = "", status: str = WAITING,
+            reservation_id: int = 0):
+        self.waitlist_id = waitlist_id
+        self.customer_id = customer_id
+        self.hotel_id = hotel_id
+        self.check_in = check_in
+        self.check_out = check_out
+        self.priority = priority
+        self.requested_at = requested_at
+        self.status = status
+        self.reservation_id = reservation_id
+
+    @staticmethod
+    def repository() -> JsonRepository:
+        """
+        Devuelve el repositorio de la lista de espera de la sesión activa.
+        """
+        return get_session().repository("waitlist", Waitlist.FILE_PATH)
+
+    @staticmethod
+    def join(customer_id: int, hotel_id: int, check_in: datetime,
+             check_out: datetime, priority: int = 0) -> Optional['Waitlist']:
+        """
+        Agrega una solicitud a la lista de espera del hotel. Devuelve la
+        solicitud, o None si el cliente, el hotel o las fechas no son
+        válidos.
+        """
+        check_in_str = check_in.strftime("%Y-%m-%d")
+        check_out_str = check_out.strftime("%Y-%m-%d")
+        if not Customer.get_customer(customer_id) or not Hotel.get_hotel(
+                hotel_id):
+            Reservation.log_rejection("invalid_owner", customer_id, hotel_id)
+            return None
+        if stay_range(check_in_str, check_out_str) is None:
+            Reservation.log_rejection("invalid_dates", customer_id, hotel_id)
+            return None
+        repo = Waitlist.repository()
+        with get_session().transaction(repo):
+            new_id = repo.next_id()
+            record = {
+                "waitlist_id": new_id,
+                "customer_id": customer_id,
+                "hotel_id": hotel_id,
+                "check_in": check_in_str,
+                "check_out": check_out_str,
+                "priority": priority,
+                "requested_at": datetime.now().isoformat(
+                    timespec="seconds"),
+                "status": WAITING,
+                "reservation_id": 0
+            }
+            waitlist_queue(repo)
+            repo.put(str(new_id), record)
+        logger.info("Solicitud %s en lista de espera.", new_id,
+                    extra={"event": "waitlist_joined",
+                           "waitlist_id": new_id,
+                           "customer_id": customer_id,
+                           "hotel_id": hotel_id})
+        return Waitlist(**record)
+
+    @staticmethod
+    def reserve_or_join(customer_id: int, hotel_id: int,
+                        check_in: datetime, check_out: datetime,
+                        priority: int = 0):
+        """
+        Crea la reservación si hay una habitación disponible y, si no,
+        deja la solicitud en la lista de espera. Devuelve la
+        Reservation, la solicitud Waitlist, o None si los datos no son
+        válidos.
+        """
+        with get_session().transaction(Customer.repository(),
+                                       Hotel.repository(),
+                                       Reservation.repository(),
+                                       Reservation.stats_repository(),
+                                       Waitlist.repository()):
+            reservation = Reservation.create_reservation(
+                customer_id, hotel_id, check_in, check_out)
+            if reservation is not None:
+                return reservation
+            return Waitlist.join(customer_id, hotel_id, check_in,
+                                 check_out, priority)
+
+    @staticmethod
+    def withdraw(waitlist_id: int) -> bool:
+        """
+        Retira una solicitud en espera. Devuelve False si no existe o ya
+        no estaba en espera.
+        """
+        repo = Waitlist.repository()
+        with get_session().transaction(repo):
+            record = repo.get(str(waitlist_id))
+            if record is None or record["status"] != WAITING:
+                return False
+            record = dict(record)
+            record["status"] = "withdrawn"
+            repo.put(str(waitlist_id), record)
+            return True
+
+    @staticmethod
+    def promote(hotel_id: int) -> List[Reservation]:
+        """
+        Convierte en reservaciones las solicitudes en espera del hotel
+        que ya caben, en orden de prioridad y llegada. Revisa a lo más
+        PROMOTION_WINDOW solicitudes, cada una en O(log n); las que no
+        caben conservan su lugar. Devuelve las reservaciones creadas.
+        """
+        repo = Waitlist.repository()
+        hotels = Hotel.repository()
+        promoted = []
+        queue = None
+        popped = []
+        try:
+            with get_session().transaction(Customer.repository(), hotels,
+                                           Reservation.repository(),
+                                           Reservation.stats_repository(),
+                                           repo):
+                queue = waitlist_queue(repo)
+                for _ in range(Waitlist.PROMOTION_WINDOW):
+                    key = queue.pop(hotel_id)
+                    if key is None:
+                        break
+                    popped.append(key)
+                    record = repo.get(key)
+                    if record is None or record["status"] != WAITING:
+                        continue
+                    hotel_dict = hotels.get(str(hotel_id))
+                    if hotel_dict is None:
+                        break
+                    reservation = Waitlist._promote_one(repo, key, record,
+                                                        hotel_dict)
+                    if reservation is not None:
+                        promoted.append(reservation)
+        finally:
+            # Las solicitudes revisadas que siguen en espera (no cabían,
+            # el hotel ya no existe o la transacción falló) regresan a
+            # la cola con su lugar
+            for key in popped:
+                record = repo.get(key)
+                if record is not None and record["status"] == WAITING:
+                    queue.push(key, record)
+        return promoted
+
+    @staticmethod
+    def _promote_one(repo, key: str, record: dict,
+                     hotel_dict: dict) -> Optional[Reservation]:
+        """
+        Convierte la solicitud en reservación si cabe. Si cabía pero el
+        cliente ya no existe la retira. Devuelve la reservación creada,
+        o None si la solicitud sigue en espera o se retiró.
+        """
+        check_in = datetime.strptime(record["check_in"], "%Y-%m-%d")
+        check_out = datetime.strptime(record["check_out"], "%Y-%m-%d")
+        if hotel_dict["total_rooms"] <= Hotel.rooms_in_use(
+                hotel_dict, check_in, check_out):
+            return None
+        reservation = Reservation.create_reservation(
+            record["customer_id"], record["hotel_id"], check_in, check_out)
+        record = dict(record)
+        if reservation is None:
+            record["status"] = "withdrawn"
+            repo.put(key, record)
+            return None
+        record["status"] = "promoted"
+        record["reservation_id"] = reservation.reservation_id
+        repo.put(key, record)
+        logger.info("Solicitud %s atendida con la reservación %s.",
+                    key, reservation.reservation_id,
+                    extra={"event": "waitlist_promoted",
+                           "waitlist_id": int(key),
+                           "reservation_id": reservation.reservation_id,
+                           "hotel_id": record["hotel_id"]})
+        return reservation
+
+    @staticmethod
+    def pending(hotel_id: int) -> List['Waitlist']:
+        """
+        Devuelve las solicitudes en espera del hotel en el orden en que
+        se atenderían.
+        """
+        repo = Waitlist.repository()
+        repo.refresh()
+        waiting = [Waitlist(**repo.get(key)) for key in
+                   secondary_index(repo, "hotel_id").lookup(hotel_id)
+                   if repo.get(key)["status"] == WAITING]
+        return sorted(waiting, key=lambda entry: (-entry.priority,
+                                                  entry.waitlist_id))
+
+    def __repr__(self):
+        return (
+            f"Waitlist("
+            f"waitlist_id={self.waitlist_id}, "
+            f"customer_id={self.customer_id}, "
+            f"hotel_id={self.hotel_id}, "
+            f"check_in='{self.check_in}', "
+            f"check_out='{self.check_out}', "
+            f"priority={self.priority}, "
+            f"status='{self.status}')")
+
+
 # Función principal
 def main():
     """
     Función principal que crea y manipula hoteles, clientes y reservas.
     """
+    configure_logging(structured=False)
     # Nos aseguramos de que existan los archivos JSON (con diccionarios vacíos)
     for filename in ["hotels.json", "customers.json", "reservations.json"]:
         if not os.path.exists(filename):
@@ -0,0 +1,164 @@
+"""
+Analítica de ocupación y cancelaciones por hotel.
+
+Las consultas de un tablero leen los contadores por hotel y por día (y
+sus acumulados por mes y totales) que occupancy.py guarda en su propio
+almacén y actualiza en las transacciones que crean o cancelan
+reservaciones, de modo que no recorren las reservaciones y cuestan lo
+mismo en cualquier proceso:
+
+* nights: habitaciones ocupadas cada noche por reservaciones activas
+  o archivadas al terminar su estancia;
+* created / cancelled: reservaciones con entrada ese día y cuántas de
+  ellas se cancelaron (la tasa de cancelación es por fecha de entrada).
+
+Archivar reservaciones no cambia los contadores. rebuild() los recalcula
+desde cero con la partición caliente y las particiones archivadas, por
+ejemplo después de editar los archivos a mano.
+
+Uso:
+    python analytics.py rebuild
+    python analytics.py report 1 [--month 2025-03]
+"""
+import argparse
+import calendar
+import json
+from datetime import date, datetime
+from typing import Iterable, Optional, Tuple
+
+from A01323987_A6_2 import Hotel, Reservation
+from archive import partitions, read_partition
+from occupancy import TOTAL, compute, counter_key, read_counters
+from storage import get_session
+
+
+def hotel_counters(hotel_id: int, day: Optional[date] = None,
+                   month: Optional[str] = None) -> Tuple[int, int, int]:
+    """
+    Devuelve (created, cancelled, nights) del hotel para un día, un mes
+    'YYYY-MM' o, sin ninguno de los dos, en total.
+    """
+    if day is not None:
+        scope = day.isoformat()
+    elif month is not None:
+        scope = month
+    else:
+        scope = TOTAL
+    stats = Reservation.stats_repository()
+    stats.refresh()
+    return read_counters(stats, counter_key(hotel_id, scope))
+
+
+def _all_records(repository) -> Iterable[dict]:
+    """
+    Reservaciones de las particiones archivadas y de la caliente; si
+    una quedó en ambas, cuenta la caliente.
+    """
+    hot = dict(repository.items())
+    for month in partitions():
+        for key, record in read_partition(month).items():
+            if key not in hot:
+                yield record
+    yield from hot.values()
+
+
+def rebuild() -> int:
+    """
+    Recalcula desde cero los contadores con todas las reservaciones,
+    bajo los candados de reservaciones y contadores. Devuelve cuántos
+    registros de contadores quedaron.
+    """
+    repo = Reservation.repository()
+    stats = Reservation.stats_repository()
+    with get_session().transaction(repo, stats):
+        data = compute(_all_records(repo))
+        stats.replace_all(data)
+    return len(data)
+
+
+def _rates(hotel_id: int, counters: Tuple[int, int, int],
+           nights_available: Optional[int]) -> dict:
+    """
+    Arma el resultado de una consulta con sus tasas.
+    """
+    created, cancelled, nights = counters
+    return {
+        "hotel_id": hotel_id,
+        "reservations": created,
+        "cancellations": cancelled,
+        "nights_booked": nights,
+        "cancellation_rate": cancelled / created if created else 0.0,
+        "occupancy_rate": (nights / nights_available
+                           if nights_available else None),
+    }
+
+
+def _total_rooms(hotel_id: int) -> Optional[int]:
+    """
+    Habitaciones del hotel, o None si no existe.
+    """
+    hotel = Hotel.get_hotel(hotel_id)
+    return hotel.total_rooms if hotel is not None else None
+
+
+def daily(hotel_id: int, day: date) -> dict:
+    """
+    Ocupación y cancelaciones del hotel en un día.
+    """
+    return _rates(hotel_id, hotel_counters(hotel_id, day=day),
+                  _total_rooms(hotel_id))
+
+
+def monthly(hotel_id: int, month: str) -> dict:
+    """
+    Ocupación y cancelaciones del hotel en un mes 'YYYY-MM'.
+    """
+    year, number = (int(part) for part in month.split("-"))
+    rooms = _total_rooms(hotel_id)
+    days = calendar.monthrange(year, number)[1]
+    return _rates(hotel_id, hotel_counters(hotel_id, month=month),
+                  rooms * days if rooms is not None else None)
+
+
+def summary(hotel_id: int) -> dict:
+    """
+    Totales del hotel. La tasa de ocupación no aplica (None) porque no
+    hay un periodo de referencia.
+    """
+    return _rates(hotel_id, hotel_counters(hotel_id), None)
+
+
+def _month(value: str) -> str:
+    """
+    Valida un mes 'YYYY-MM' de la línea de comandos.
+    """
+    try:
+        return datetime.strptime(value, "%Y-%m").strftime("%Y-%m")
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"mes inválido: {value!r} (se espera YYYY-MM)") from None
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Herramienta de línea de comandos: reconstruye los contadores o
+    muestra el reporte de un hotel.
+    """
+    parser = argparse.ArgumentParser(description="Analítica de ocupación")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("rebuild", help="Reconstruye los contadores")
+    report = commands.add_parser("report", help="Reporte de un hotel")
+    report.add_argument("hotel_id", type=int)
+    report.add_argument("--month", type=_month, help="Mes YYYY-MM")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        print(f"Contadores reconstruidos: {rebuild()} registros")
+        return
+    result = (monthly(args.hotel_id, args.month) if args.month
+              else summary(args.hotel_id))
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Archivo histórico de reservaciones en particiones frías por mes.
+
+El almacén de reservaciones (reservations.json o el backend de la
+sesión) es la partición caliente: las operaciones de reservar, cancelar
+y revisar disponibilidad solo leen y escriben ahí. archive_reservations()
+mueve a particiones frías las reservaciones canceladas y las que ya
+terminaron (salida anterior o igual a la fecha de corte), agrupadas por
+mes de entrada en archivos JSON comprimidos con gzip:
+
+    <reservations.json>.archive/2025-03.json.gz
+
+Las reservaciones terminadas que seguían activas se cierran como en una
+cancelación (se libera la habitación del hotel), porque la partición
+caliente ya no las cuenta, y se archivan desactivadas (is_active False)
+con la marca completed, que las distingue de las canceladas. El
+historial sigue disponible con history(), que junta la partición
+caliente con las frías del rango de meses pedido.
+
+El trabajo toma los candados de hoteles y reservaciones, así que puede
+ejecutarse con el sistema en uso. Las particiones frías se escriben
+antes de quitar las reservaciones del almacén caliente; si el proceso
+se interrumpe entre ambos pasos, la siguiente ejecución vuelve a
+archivarlas sin duplicarlas (cada partición es un diccionario por ID).
+
+Uso:
+    python archive.py [--before 2025-01-01] [--backend json]
+"""
+import argparse
+import gzip
+import json
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+from A01323987_A6_2 import Hotel, Reservation
+from diagnostics import configure_logging, get_logger
+from indexes import secondary_index
+from inventory import room_inventory, stay_range
+from occupancy import COMPLETED
+from storage import BACKENDS, Session, get_session, set_session
+
+# Partición de las reservaciones sin fecha de entrada válida
+UNDATED_PARTITION = "undated"
+PARTITION_SUFFIX = ".json.gz"
+
+logger = get_logger("archive")
+
+
+def archive_dir(path: Optional[str] = None) -> str:
+    """
+    Directorio de las particiones frías del almacén de reservaciones
+    dado (por defecto, el de Reservation.FILE_PATH).
+    """
+    return f"{path or Reservation.FILE_PATH}.archive"
+
+
+def partition_key(record: dict) -> str:
+    """
+    Mes de entrada ('YYYY-MM') de la reservación, que decide su
+    partición fría.
+    """
+    check_in = record.get("check_in")
+    try:
+        return date.fromisoformat(check_in).strftime("%Y-%m")
+    except (TypeError, ValueError):
+        return UNDATED_PARTITION
+
+
+def partitions(path: Optional[str] = None) -> List[str]:
+    """
+    Devuelve los meses que tienen partición fría, en orden.
+    """
+    directory = archive_dir(path)
+    if not os.path.isdir(directory):
+        return []
+    return sorted(name[:-len(PARTITION_SUFFIX)]
+                  for name in os.listdir(directory)
+                  if name.endswith(PARTITION_SUFFIX))
+
+
+def read_partition(month: str, path: Optional[str] = None
+                   ) -> Dict[str, dict]:
+    """
+    Lee las reservaciones de la partición fría del mes dado; un mes
+    sin partición devuelve un diccionario vacío.
+    """
+    partition = os.path.join(archive_dir(path), month + PARTITION_SUFFIX)
+    try:
+        with gzip.open(partition, "rt", encoding="utf-8") as file_obj:
+            return json.load(file_obj)
+    except FileNotFoundError:
+        return {}
+
+
+def _write_partition(month: str, records: Dict[str, dict],
+                     path: Optional[str] = None) -> None:
+    """
+    Agrega los registros a la partición fría del mes y la reemplaza
+    de forma atómica (archivo temporal, fsync y rename).
+    """
+    directory = archive_dir(path)
+    os.makedirs(directory, exist_ok=True)
+    merged = read_partition(month, path)
+    merged.update(records)
+    partition = os.path.join(directory, month + PARTITION_SUFFIX)
+    temporary = partition + ".tmp"
+    with open(temporary, "wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as file_obj:
+            file_obj.write(json.dumps(
+                merged, separators=(",", ":")).encode("utf-8"))
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(temporary, partition)
+
+
+def _cold_copy(record: dict) -> dict:
+    """
+    Registro con el que la reservación se guarda en la partición fría:
+    una terminada que seguía activa se desactiva y se marca completed.
+    """
+    if not record.get("is_active"):
+        return record
+    return dict(record, is_active=False, **{COMPLETED: True})
+
+
+def _is_cold(record: dict, before: date) -> bool:
+    """
+    Indica si la reservación ya no pertenece a la partición caliente:
+    está cancelada o su salida es anterior o igual a before.
+    """
+    if not record.get("is_active"):
+        return True
+    try:
+        return date.fromisoformat(record.get("check_out")) <= before
+    except (TypeError, ValueError):
+        return False
+
+
+def archive_reservations(before: Optional[date] = None) -> Dict[str, int]:
+    """
+    Mueve a las particiones frías las reservaciones canceladas y las
+    terminadas hasta before (por defecto, hoy). Devuelve cuántas se
+    archivaron por mes.
+    """
+    before = before or date.today()
+    repo = Reservation.repository()
+    archived: Dict[str, int] = {}
+    with get_session().transaction(Hotel.repository(), repo):
+        by_month: Dict[str, Dict[str, dict]] = {}
+        for key, record in repo.items():
+            if _is_cold(record, before):
+                by_month.setdefault(partition_key(record), {})[key] = record
+        for month, records in sorted(by_month.items()):
+            _write_partition(month, {key: _cold_copy(record)
+                                     for key, record in records.items()})
+            archived[month] = len(records)
+
+        inventory = room_inventory(repo)
+        for records in by_month.values():
+            for key, record in records.items():
+                repo.delete(key)
+                if not record.get("is_active"):
+                    continue
+                # La estancia terminó: se libera como en una cancelación
+                stay = stay_range(record["check_in"], record["check_out"])
+                if stay is not None:
+                    inventory.release(record["hotel_id"], *stay)
+                Hotel.cancel_room_reservation(record["hotel_id"])
+    logger.info("Se archivaron %d reservaciones.", sum(archived.values()),
+                extra={"event": "reservations_archived",
+                       "before": before.isoformat(), "months": archived})
+    return archived
+
+
+def history(customer_id: Optional[int] = None,
+            hotel_id: Optional[int] = None,
+            start_month: Optional[str] = None,
+            end_month: Optional[str] = None) -> List[Reservation]:
+    """
+    Devuelve las reservaciones, calientes y archivadas, del cliente y/o
+    hotel dados cuyo mes de entrada ('YYYY-MM') está entre start_month y
+    end_month (incluidos), ordenadas por ID. Solo se leen las
+    particiones frías de ese rango; las reservaciones sin fecha válida
+    solo aparecen si no se da un rango.
+    """
+    bounded = start_month is not None or end_month is not None
+
+    def in_range(month: str) -> bool:
+        if month == UNDATED_PARTITION:
+            return not bounded
+        return ((start_month is None or month >= start_month)
+                and (end_month is None or month <= end_month))
+
+    def wanted(record: dict) -> bool:
+        return ((customer_id is None
+                 or record.get("customer_id") == customer_id)
+                and (hotel_id is None or record.get("hotel_id") == hotel_id)
+                and in_range(partition_key(record)))
+
+    found: Dict[str, dict] = {}
+    for month in partitions():
+        if not in_range(month):
+            continue
+        for key, record in read_partition(month).items():
+            if wanted(record):
+                found[key] = record
+    # Si una reservación quedó en ambos lados, manda la caliente
+    repo = Reservation.repository()
+    repo.refresh()
+    if customer_id is not None:
+        keys = secondary_index(repo, "customer_id").lookup(customer_id)
+    elif hotel_id is not None:
+        keys = secondary_index(repo, "hotel_id").lookup(hotel_id)
+    else:
+        keys = repo.keys()
+    for key in keys:
+        record = repo.get(key)
+        if record is not None and wanted(record):
+            found[key] = record
+    return [Reservation(**{field: value
+                           for field, value in found[key].items()
+                           if field != COMPLETED})
+            for key in sorted(found, key=int)]
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Ejecuta el trabajo de archivo desde la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(
+        description="Archiva reservaciones canceladas o terminadas")
+    parser.add_argument("--before", type=date.fromisoformat, default=None,
+                        help="Fecha de corte YYYY-MM-DD (por defecto hoy)")
+    parser.add_argument("--backend", default="json",
+                        help="json, wal, sqlite o binary")
+    args = parser.parse_args(argv)
+
+    if args.backend == "sqlite":
+        import sqlite_storage  # noqa: F401 pylint: disable=C0415,W0611
+    elif args.backend == "binary":
+        import codec  # noqa: F401 pylint: disable=C0415,W0611
+    configure_logging(structured=False)
+    session = Session(backend=BACKENDS[args.backend])
+    previous = set_session(session)
+    try:
+        archived = archive_reservations(args.before)
+    finally:
+        session.close()
+        set_session(previous)
+    for month, count in sorted(archived.items()):
+        print(f"{month}: {count} reservaciones archivadas")
+
+
+if __name__ == "__main__":
+    main()
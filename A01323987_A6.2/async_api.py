@@ -0,0 +1,146 @@
+"""
+Fachada asíncrona de Hotel y Reservation para aplicaciones con asyncio.
+
+Las operaciones de A01323987_A6_2 leen y escriben archivos, así que no
+pueden llamarse directamente desde el ciclo de eventos sin bloquearlo.
+AsyncBooking las ejecuta en un pool de hilos dedicado a E/S sobre su
+propia sesión diferida (los cambios quedan en memoria), asociada solo a
+los hilos del pool, y agrupa las escrituras:
+cada operación espera a que sus cambios estén en disco, pero todas las
+que terminan dentro de la misma ventana (flush_delay) comparten un solo
+flush. Las reservaciones de un mismo hotel se serializan con un
+asyncio.Lock por hotel, que junto con los candados de la sesión
+mantiene la garantía de no sobrevender.
+
+Uso:
+    async with AsyncBooking() as booking:
+        reservation = await booking.create_reservation(1, 1, entrada,
+                                                       salida)
+"""
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
+from typing import Dict, List, Optional
+
+from A01323987_A6_2 import Hotel, Reservation
+from storage import JsonRepository, Session, bind_session
+
+
+class AsyncBooking:
+    """
+    Operaciones de reservación no bloqueantes.
+
+    Los hilos de su pool de E/S usan la sesión diferida de la fachada,
+    de modo que lo que Hotel, Customer y Reservation hagan a través de
+    ella se escribe con los flush agrupados; el resto del proceso sigue
+    usando su propia sesión.
+
+    Atributos:
+        flush_delay (float): Segundos que se espera a otras operaciones
+                             antes de escribir.
+    """
+
+    def __init__(self, backend=JsonRepository, flush_delay: float = 0.005,
+                 io_workers: int = 4):
+        self.flush_delay = flush_delay
+        self.session = Session(backend=backend, flush_interval=None)
+        self._executor = ThreadPoolExecutor(
+            max_workers=io_workers, thread_name_prefix="booking-io",
+            initializer=bind_session, initargs=(self.session,))
+        self._hotel_locks: Dict[int, asyncio.Lock] = defaultdict(
+            asyncio.Lock)
+        self._pending_flush: Optional[asyncio.Future] = None
+        self.flushes = 0
+
+    async def _run(self, function, *args, **kwargs):
+        """
+        Ejecuta una función bloqueante en el pool de E/S.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, partial(function, *args, **kwargs))
+
+    async def _durable(self) -> None:
+        """
+        Espera a que lo hecho hasta ahora esté en disco. Si no hay un
+        flush programado se programa uno; si lo hay, se comparte.
+        """
+        if self._pending_flush is None:
+            loop = asyncio.get_running_loop()
+            self._pending_flush = loop.create_future()
+            loop.create_task(self._flush_later(self._pending_flush))
+        await asyncio.shield(self._pending_flush)
+
+    async def _flush_later(self, future: asyncio.Future) -> None:
+        """
+        Espera flush_delay para juntar más operaciones y escribe. El
+        commit toma los candados de los almacenes, así que no escribe
+        una operación que otro hilo del pool esté a medio aplicar.
+        """
+        await asyncio.sleep(self.flush_delay)
+        # Lo que termine a partir de aquí espera al siguiente flush
+        self._pending_flush = None
+        try:
+            await self._run(self.session.commit)
+        except Exception as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+        else:
+            self.flushes += 1
+            future.set_result(None)
+
+    async def create_reservation(self, customer_id: int, hotel_id: int,
+                                 check_in: datetime, check_out: datetime
+                                 ) -> Optional[Reservation]:
+        """
+        Versión asíncrona de Reservation.create_reservation. Regresa
+        cuando la reservación ya está en disco.
+        """
+        async with self._hotel_locks[hotel_id]:
+            reservation = await self._run(
+                Reservation.create_reservation, customer_id, hotel_id,
+                check_in, check_out)
+        if reservation is not None:
+            await self._durable()
+        return reservation
+
+    async def cancel_reservation(self, reservation_id: int) -> bool:
+        """
+        Versión asíncrona de Reservation.cancel_reservation. Regresa
+        cuando la cancelación ya está en disco.
+        """
+        record = await self._run(Reservation.repository().get,
+                                 str(reservation_id))
+        if record is None:
+            return False
+        async with self._hotel_locks[record["hotel_id"]]:
+            canceled = await self._run(Reservation.cancel_reservation,
+                                       reservation_id)
+        if canceled:
+            await self._durable()
+        return canceled
+
+    async def search(self, location: Optional[str] = None, rooms: int = 1,
+                     check_in: Optional[datetime] = None,
+                     check_out: Optional[datetime] = None) -> List[Hotel]:
+        """
+        Versión asíncrona de Hotel.search.
+        """
+        return await self._run(Hotel.search, location, rooms, check_in,
+                               check_out)
+
+    async def close(self) -> None:
+        """
+        Escribe lo pendiente y detiene el pool de E/S.
+        """
+        if self._pending_flush is not None:
+            await asyncio.shield(self._pending_flush)
+        await self._run(self.session.close)
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'AsyncBooking':
+        return self
+
+    async def __aexit__(self, exc_type, exc, traceback) -> None:
+        await self.close()
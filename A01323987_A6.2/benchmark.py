@@ -0,0 +1,446 @@
+"""
+Benchmark y prueba de estrés de los backends de almacenamiento.
+
+Para cada backend disponible (json, wal, sqlite, binary) y cada tamaño
+de almacén (por defecto 1e3 a 1e6 registros):
+
+1. Llena un directorio temporal con hoteles, clientes y reservaciones
+   por medio de la carga masiva (bulkload.load) y mide su rendimiento.
+2. Mide el rendimiento y las latencias p50/p95/p99 de crear clientes,
+   consultar clientes, reservar y cancelar, con las mismas funciones
+   que usa la aplicación y escritura inmediata. Cada fase se detiene al
+   llegar a --ops operaciones o a --seconds segundos, lo que pase
+   primero, para que los tamaños grandes terminen en tiempo razonable.
+3. Reporta la memoria máxima (RSS) del proceso. Cada combinación corre
+   en un proceso nuevo para que la medida no arrastre la de otras.
+
+Además, por backend, varios procesos reservan y cancelan al mismo
+tiempo habitaciones del mismo hotel y se revisa que no haya sobreventa
+(más reservaciones activas que habitaciones, o un booked_rooms que no
+coincide) ni actualizaciones perdidas (reservaciones logradas o
+canceladas que no quedaron en el almacén).
+
+Uso:
+    python benchmark.py [--backends json,sqlite] [--sizes 1000,10000]
+                        [--ops 1000] [--seconds 10] [--json salida.json]
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from A01323987_A6_2 import Customer, Hotel, Reservation, Waitlist
+from bulkload import load
+from diagnostics import configure_logging
+from storage import BACKENDS, Session, session_scope, set_session
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+SIZES = (1000, 10000, 100000, 1000000)
+OPERATIONS = ("create", "lookup", "reserve", "cancel")
+# Reservaciones por hotel al llenar el almacén y habitaciones de cada uno
+RESERVATIONS_PER_HOTEL = 100
+HOTEL_ROOMS = 20
+LOCATIONS = ("Monterrey", "Guadalajara", "Cancún", "Puebla")
+# Las reservaciones cargadas son de LOADED_YEAR; las medidas, del
+# siguiente, para que siempre haya habitaciones
+LOADED_YEAR = 2025
+
+
+def available_backends() -> List[str]:
+    """
+    Backends registrados, incluidos los opcionales que se puedan
+    importar.
+    """
+    for module in ("sqlite_storage", "codec"):
+        try:
+            __import__(module)
+        except ImportError:
+            continue
+    return list(BACKENDS)
+
+
+def store_paths(directory: str) -> tuple:
+    """
+    Rutas de los almacenes de hoteles, clientes, reservaciones y lista
+    de espera dentro del directorio dado.
+    """
+    return tuple(os.path.join(directory, name) for name in (
+        "hotels.json", "customers.json", "reservations.json",
+        "waitlist.json"))
+
+
+def _use_paths(paths: tuple) -> tuple:
+    """
+    Apunta los almacenes de las clases a las rutas dadas y devuelve las
+    anteriores.
+    """
+    previous = (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+                Waitlist.FILE_PATH)
+    (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+     Waitlist.FILE_PATH) = paths
+    return previous
+
+
+def _percentile(latencies: Sequence[float], fraction: float
+                ) -> Optional[float]:
+    """
+    Percentil (por rango más cercano) de latencias ya ordenadas, en ms.
+    """
+    if not latencies:
+        return None
+    return round(latencies[round((len(latencies) - 1) * fraction)], 3)
+
+
+def _stay(rng: random.Random, year: int) -> tuple:
+    """
+    Estancia aleatoria de 1 a 3 noches dentro del año dado.
+    """
+    check_in = date(year, 1, 1) + timedelta(days=rng.randrange(360))
+    return check_in, check_in + timedelta(days=rng.randint(1, 3))
+
+
+def _write_jsonl(path: str, rows) -> None:
+    """
+    Escribe los registros generados como JSONL, uno por línea.
+    """
+    with open(path, "w", encoding="utf-8") as file_obj:
+        for row in rows:
+            file_obj.write(json.dumps(row) + "\n")
+
+
+def populate(directory: str, size: int, rng: random.Random) -> dict:
+    """
+    Llena los almacenes con size clientes, size reservaciones y un hotel
+    por cada RESERVATIONS_PER_HOTEL reservaciones, con la carga masiva.
+    Devuelve los registros cargados y el rendimiento.
+    """
+    hotels = max(1, size // RESERVATIONS_PER_HOTEL)
+    sources = os.path.join(directory, "sources")
+    os.makedirs(sources)
+
+    def reservation_rows():
+        for _ in range(size):
+            check_in, check_out = _stay(rng, LOADED_YEAR)
+            yield {"customer_id": rng.randint(1, size),
+                   "hotel_id": rng.randint(1, hotels),
+                   "check_in": check_in.isoformat(),
+                   "check_out": check_out.isoformat()}
+
+    _write_jsonl(os.path.join(sources, "hotels.jsonl"), (
+        {"name": f"Hotel {number}",
+         "location": LOCATIONS[number % len(LOCATIONS)],
+         "total_rooms": HOTEL_ROOMS} for number in range(hotels)))
+    _write_jsonl(os.path.join(sources, "customers.jsonl"), (
+        {"name": f"Cliente {number}",
+         "email": f"cliente{number}@example.com"} for number in range(size)))
+    _write_jsonl(os.path.join(sources, "reservations.jsonl"),
+                 reservation_rows())
+
+    loaded = 0
+    start = time.perf_counter()
+    for store in ("hotels", "customers", "reservations"):
+        loaded += load(store, os.path.join(sources, f"{store}.jsonl"),
+                       strict=True)["loaded"]
+    elapsed = time.perf_counter() - start
+    return {"ops": loaded, "seconds": round(elapsed, 3),
+            "ops_per_second": round(loaded / elapsed, 1)}
+
+
+def measure(operation: Callable[[int], object], ops: int,
+            seconds: float) -> dict:
+    """
+    Ejecuta operation(i) hasta ops veces o hasta agotar seconds y
+    devuelve el rendimiento y los percentiles de latencia.
+    """
+    latencies = []
+    start = time.perf_counter()
+    deadline = start + seconds
+    for number in range(ops):
+        began = time.perf_counter()
+        operation(number)
+        finished = time.perf_counter()
+        latencies.append((finished - began) * 1000)
+        if finished >= deadline:
+            break
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"ops": len(latencies), "seconds": round(elapsed, 3),
+            "ops_per_second": round(len(latencies) / elapsed, 1)
+            if elapsed else None,
+            "p50_ms": _percentile(latencies, 0.50),
+            "p95_ms": _percentile(latencies, 0.95),
+            "p99_ms": _percentile(latencies, 0.99)}
+
+
+def peak_memory_mb() -> Optional[float]:
+    """
+    Memoria residente máxima del proceso en MB, si el sistema la da.
+    """
+    if resource is None:
+        return None
+    # ru_maxrss está en KB en Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                 1)
+
+
+def run_case(backend: str, size: int, ops: int = 1000,
+             seconds: float = 10.0, seed: int = 0) -> dict:
+    """
+    Mide un backend con un almacén de size registros en un directorio
+    temporal y devuelve los resultados por operación.
+    """
+    # En un proceso nuevo los backends opcionales aún no se registran
+    available_backends()
+    configure_logging(level=logging.ERROR, structured=False)
+    rng = random.Random(seed)
+    hotels = max(1, size // RESERVATIONS_PER_HOTEL)
+    reserved: List[int] = []
+
+    def create(number: int) -> None:
+        Customer.create_customer(f"Nuevo {number}",
+                                 f"nuevo{number}@example.com")
+
+    def lookup(_: int) -> None:
+        Customer.get_customer(rng.randint(1, size))
+
+    def reserve(_: int) -> None:
+        check_in, check_out = _stay(rng, LOADED_YEAR + 1)
+        reservation = Reservation.create_reservation(
+            rng.randint(1, size), rng.randint(1, hotels),
+            datetime.combine(check_in, datetime.min.time()),
+            datetime.combine(check_out, datetime.min.time()))
+        if reservation is not None:
+            reserved.append(reservation.reservation_id)
+
+    def cancel(number: int) -> None:
+        if number < len(reserved):
+            Reservation.cancel_reservation(reserved[number])
+
+    result = {"backend": backend, "records": size}
+    with tempfile.TemporaryDirectory() as directory:
+        previous = _use_paths(store_paths(directory))
+        try:
+            with session_scope(backend=BACKENDS[backend]):
+                result["load"] = populate(directory, size, rng)
+                result["create"] = measure(create, ops, seconds)
+                result["lookup"] = measure(lookup, ops, seconds)
+                result["reserve"] = measure(reserve, ops, seconds)
+                result["cancel"] = measure(cancel, len(reserved), seconds)
+        finally:
+            _use_paths(previous)
+    result["peak_rss_mb"] = peak_memory_mb()
+    return result
+
+
+def _stress_worker(paths: tuple, backend: str, customer_id: int,
+                   plan: Tuple[int, int], results) -> None:
+    """
+    Proceso de la prueba de estrés: reserva la misma estancia del hotel
+    1 varias veces, cancela una de cada cancel_every logradas y reporta
+    (logradas, canceladas). plan es (attempts, cancel_every).
+    """
+    attempts, cancel_every = plan
+    _use_paths(paths)
+    # En un proceso nuevo los backends opcionales aún no se registran
+    available_backends()
+    configure_logging(level=logging.ERROR, structured=False)
+    set_session(Session(backend=BACKENDS[backend]))
+    booked = cancelled = 0
+    for _ in range(attempts):
+        reservation = Reservation.create_reservation(
+            customer_id, 1, datetime(2025, 3, 1), datetime(2025, 3, 3))
+        if reservation is None:
+            continue
+        booked += 1
+        if booked % cancel_every == 0:
+            if Reservation.cancel_reservation(reservation.reservation_id):
+                cancelled += 1
+    results.put((booked, cancelled))
+
+
+def _run_stress_workers(paths: tuple, backend: str, workers: int,
+                        plan: Tuple[int, int]) -> List[tuple]:
+    """
+    Lanza un proceso de la prueba de estrés por cliente, espera a que
+    terminen y devuelve sus reportes (logradas, canceladas).
+    """
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(
+        target=_stress_worker,
+        args=(paths, backend, number + 1, plan, results))
+        for number in range(workers)]
+    for process in processes:
+        process.start()
+    reports = [results.get(timeout=300) for _ in processes]
+    for process in processes:
+        process.join()
+    return reports
+
+
+def _stress_state(backend: str) -> Tuple[dict, Dict[str, dict]]:
+    """
+    Lee directo del almacén el hotel 1 y las reservaciones que dejaron
+    los procesos de la prueba de estrés.
+    """
+    hotel = BACKENDS[backend]("hotels", Hotel.FILE_PATH).get("1")
+    reservations = BACKENDS[backend]("reservations", Reservation.FILE_PATH)
+    records = dict(reservations.items())
+    reservations.close()
+    return hotel, records
+
+
+def stress(backend: str, workers: int = 4, attempts: int = 25,
+           rooms: int = 20, cancel_every: int = 3) -> dict:
+    """
+    Varios procesos reservan y cancelan en el mismo hotel al mismo
+    tiempo. Devuelve lo que reportaron, lo que quedó en el almacén y si
+    hubo sobreventa o actualizaciones perdidas.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = store_paths(directory)
+        previous = _use_paths(paths)
+        try:
+            with session_scope(backend=BACKENDS[backend]):
+                Hotel.create_hotel("Hotel Concurrido", "Ciudad", rooms)
+                for number in range(workers):
+                    Customer.create_customer(f"Cliente {number}",
+                                             f"estres{number}@example.com")
+            reports = _run_stress_workers(paths, backend, workers,
+                                          (attempts, cancel_every))
+            hotel, records = _stress_state(backend)
+        finally:
+            _use_paths(previous)
+    booked = sum(report[0] for report in reports)
+    cancelled = sum(report[1] for report in reports)
+    active = sum(1 for record in records.values() if record["is_active"])
+    return {"backend": backend, "workers": workers,
+            "attempts": workers * attempts, "rooms": rooms,
+            "booked": booked, "cancelled": cancelled, "active": active,
+            "overbooked": active > rooms or hotel["booked_rooms"] != active,
+            "lost_updates": (abs(len(records) - booked)
+                             + abs(active - (booked - cancelled)))}
+
+
+def _cell(value) -> str:
+    """
+    Texto de una celda de la tabla.
+    """
+    if value is None:
+        return "-"
+    if isinstance(value, bool):
+        return "sí" if value else "no"
+    return str(value)
+
+
+def _table(headers: Sequence[str], rows: List[Sequence]) -> str:
+    """
+    Tabla de texto con columnas alineadas.
+    """
+    cells = [list(headers)] + [[_cell(value) for value in row]
+                               for row in rows]
+    widths = [max(len(row[column]) for row in cells)
+              for column in range(len(headers))]
+    lines = ["  ".join(cell.rjust(width) for cell, width in
+                       zip(row, widths)) for row in cells]
+    lines.insert(1, "  ".join("-" * width for width in widths))
+    return "\n".join(lines)
+
+
+def format_report(cases: List[dict], stresses: List[dict]) -> str:
+    """
+    Tablas comparativas de rendimiento, memoria y estrés.
+    """
+    rows = []
+    for case in cases:
+        for operation in ("load",) + OPERATIONS:
+            phase = case[operation]
+            rows.append((case["backend"], case["records"], operation,
+                         phase["ops"], phase["ops_per_second"],
+                         phase.get("p50_ms"), phase.get("p95_ms"),
+                         phase.get("p99_ms")))
+    sections = [_table(("backend", "registros", "operación", "ops",
+                        "ops/s", "p50 ms", "p95 ms", "p99 ms"), rows)]
+    if cases:
+        sections.append(_table(
+            ("backend", "registros", "carga s", "memoria máx. MB"),
+            [(case["backend"], case["records"], case["load"]["seconds"],
+              case["peak_rss_mb"]) for case in cases]))
+    if stresses:
+        sections.append(_table(
+            ("backend", "procesos", "intentos", "habitaciones", "logradas",
+             "canceladas", "activas", "sobreventa", "perdidas"),
+            [(item["backend"], item["workers"], item["attempts"],
+              item["rooms"], item["booked"], item["cancelled"],
+              item["active"], item["overbooked"], item["lost_updates"])
+             for item in stresses]))
+    return "\n\n".join(sections)
+
+
+def _run_isolated(backend: str, size: int, ops: int, seconds: float,
+                  seed: int) -> dict:
+    """
+    Ejecuta run_case en un proceso nuevo para medir su memoria aparte.
+    """
+    with ProcessPoolExecutor(
+            max_workers=1,
+            mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(run_case, backend, size, ops, seconds,
+                               seed).result()
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Punto de entrada de la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(
+        description="Benchmark y prueba de estrés de los backends")
+    parser.add_argument("--backends", default=",".join(available_backends()),
+                        help="Backends separados por coma")
+    parser.add_argument("--sizes", default=",".join(map(str, SIZES)),
+                        help="Tamaños de almacén separados por coma")
+    parser.add_argument("--ops", type=int, default=1000,
+                        help="Operaciones máximas por fase")
+    parser.add_argument("--seconds", type=float, default=10.0,
+                        help="Tiempo máximo por fase")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="Procesos de la prueba de estrés")
+    parser.add_argument("--attempts", type=int, default=25,
+                        help="Reservas que intenta cada proceso")
+    parser.add_argument("--no-stress", action="store_true",
+                        help="Omite la prueba de estrés")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Guarda los resultados en JSON")
+    args = parser.parse_args(argv)
+
+    backends = [name for name in args.backends.split(",") if name]
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    cases: List[dict] = []
+    stresses: List[dict] = []
+    for backend in backends:
+        for size in sizes:
+            cases.append(_run_isolated(backend, size, args.ops, args.seconds,
+                                       args.seed))
+            print(f"{backend} {size}: listo", flush=True)
+        if not args.no_stress:
+            stresses.append(stress(backend, args.workers, args.attempts))
+    print(format_report(cases, stresses))
+    if args.json:
+        results: Dict[str, list] = {"cases": cases, "stress": stresses}
+        with open(args.json, "w", encoding="utf-8") as file_obj:
+            json.dump(results, file_obj, indent=2, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    main()
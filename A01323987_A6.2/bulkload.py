@@ -0,0 +1,348 @@
+"""
+Carga y exportación masiva de hoteles, clientes y reservaciones.
+
+Crear registros uno por uno con create_hotel o create_customer escribe
+el almacén completo en cada alta. load() lee un archivo CSV o JSONL
+registro por registro, valida cada uno contra el esquema del almacén
+(codec.SCHEMAS) y las reglas del sistema, asigna IDs y escribe cada
+almacén una sola vez al final, dentro de una transacción que toma sus
+candados. export() recorre el almacén y escribe los registros uno por
+uno. Ambos sentidos cuestan tiempo lineal y solo tienen en memoria el
+registro en curso además del propio almacén.
+
+Un registro sin ID recibe el siguiente del contador del almacén; uno
+con ID lo conserva (por ejemplo al importar una exportación) si no está
+ocupado. Los registros inválidos se reportan por logging y se omiten,
+o con strict=True cancelan toda la carga.
+
+Uso:
+    python bulkload.py load hotels hoteles.csv
+    python bulkload.py export reservations reservaciones.jsonl
+    python bulkload.py export-snapshot respaldo/
+    python bulkload.py import-snapshot respaldo/
+"""
+import argparse
+import csv
+import json
+import os
+from datetime import date
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+from A01323987_A6_2 import Customer, Hotel, Reservation
+from codec import SCHEMAS
+from diagnostics import configure_logging, get_logger
+from inventory import room_inventory, stay_range
+from occupancy import record_change
+from storage import BACKENDS, Session, get_session, set_session
+
+STORES = {"hotels": Hotel, "customers": Customer,
+          "reservations": Reservation}
+# Orden en que se importan los almacenes de un respaldo, para que las
+# reservaciones encuentren a sus hoteles y clientes
+SNAPSHOT_ORDER = ("hotels", "customers", "reservations")
+FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+DEFAULTS = {"booked_rooms": 0, "is_active": True}
+# Un solo codificador para todas las líneas JSONL
+_ENCODE = json.JSONEncoder(ensure_ascii=False,
+                           separators=(",", ":")).encode
+
+logger = get_logger("bulkload")
+
+
+def file_format(path: str, explicit: Optional[str] = None) -> str:
+    """
+    Formato del archivo ('csv' o 'jsonl') según su extensión, a menos
+    que se indique explícitamente.
+    """
+    fmt = explicit or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in ("csv", "jsonl"):
+        raise ValueError(f"Formato no soportado: {path}")
+    return fmt
+
+
+def _rows(path: str, fmt: str) -> Iterator[Tuple[int, object]]:
+    """
+    Lee el archivo registro por registro y devuelve pares (número de
+    registro, diccionario). Una línea JSON inválida se devuelve como
+    la excepción correspondiente para que se reporte como las demás.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as file_obj:
+        if fmt == "csv":
+            for number, row in enumerate(csv.DictReader(file_obj), 1):
+                # Las celdas vacías cuentan como campos ausentes
+                yield number, {field: value for field, value in row.items()
+                               if value not in ("", None)}
+            return
+        number = 0
+        for line in file_obj:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError as error:
+                yield number, ValueError(f"JSON inválido: {error.msg}")
+
+
+def _coerce(field: str, kind: str, value):
+    """
+    Convierte el valor al tipo del esquema; CSV entrega todo como
+    texto. Lanza ValueError si no es posible.
+    """
+    if kind == "int":
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise ValueError(f"{field} debe ser entero")
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError(f"{field} debe ser entero") from None
+    if kind == "bool":
+        if isinstance(value, bool):
+            return value
+        text = str(value).strip().lower()
+        if text in ("true", "1"):
+            return True
+        if text in ("false", "0"):
+            return False
+        raise ValueError(f"{field} debe ser true o false")
+    if not isinstance(value, str) or not value.strip():
+        raise ValueError(f"{field} debe ser un texto no vacío")
+    if kind == "date":
+        try:
+            return date.fromisoformat(value).isoformat()
+        except ValueError:
+            raise ValueError(f"{field} debe ser una fecha "
+                             f"YYYY-MM-DD") from None
+    return value
+
+
+def _record(store: str, row) -> dict:
+    """
+    Arma el registro del almacén con los campos del esquema; el ID
+    queda en None si el archivo no lo trae.
+    """
+    if isinstance(row, Exception):
+        raise row
+    if not isinstance(row, dict):
+        raise ValueError("el registro debe ser un objeto")
+    (id_field, _), *fields = SCHEMAS[store]
+    record = {id_field: None}
+    if id_field in row:
+        record[id_field] = _coerce(id_field, "int", row[id_field])
+    for field, kind in fields:
+        if field in row:
+            record[field] = _coerce(field, kind, row[field])
+        elif field in DEFAULTS:
+            record[field] = DEFAULTS[field]
+        else:
+            raise ValueError(f"falta el campo {field}")
+    return record
+
+
+def _check_hotel(record: dict, _book_rooms: bool) -> None:
+    if record["total_rooms"] < 0:
+        raise ValueError("total_rooms no puede ser negativo")
+    if not 0 <= record["booked_rooms"] <= record["total_rooms"]:
+        raise ValueError("booked_rooms debe estar entre 0 y total_rooms")
+
+
+def _check_customer(record: dict, _book_rooms: bool) -> None:
+    repo = Customer.repository()
+    # El índice se actualiza con cada put(), así que también detecta
+    # correos repetidos dentro del mismo archivo
+    if Customer.email_index(repo).lookup_one(record["email"]) is not None:
+        raise ValueError(f"ya existe un cliente con el correo "
+                         f"{record['email']}")
+
+
+def _check_reservation(record: dict, book_rooms: bool) -> None:
+    """
+    Valida la reservación y, si está activa, aparta sus noches. Con
+    book_rooms también ocupa la habitación en el hotel (como
+    create_reservation); sin él se confía en el booked_rooms del hotel,
+    como al importar un respaldo.
+    """
+    hotels = Hotel.repository()
+    hotel_dict = hotels.get(str(record["hotel_id"]))
+    if hotel_dict is None:
+        raise ValueError(f"el hotel {record['hotel_id']} no existe")
+    if str(record["customer_id"]) not in Customer.repository():
+        raise ValueError(f"el cliente {record['customer_id']} no existe")
+    stay = stay_range(record["check_in"], record["check_out"])
+    if stay is None:
+        raise ValueError("la salida debe ser posterior a la entrada")
+    if not record["is_active"]:
+        return
+    inventory = room_inventory(Reservation.repository())
+    if book_rooms:
+        in_use = Hotel.rooms_in_use(
+            hotel_dict, date.fromordinal(stay[0]),
+            date.fromordinal(stay[1]), inventory)
+        if in_use >= hotel_dict["total_rooms"]:
+            raise ValueError("no hay habitaciones disponibles")
+        hotel_dict = dict(hotel_dict)
+        hotel_dict["booked_rooms"] += 1
+        hotels.put(str(record["hotel_id"]), hotel_dict)
+    inventory.book(record["hotel_id"], *stay)
+
+
+CHECKS: Dict[str, Callable[[dict, bool], None]] = {
+    "hotels": _check_hotel,
+    "customers": _check_customer,
+    "reservations": _check_reservation,
+}
+
+
+def load(store: str, path: str, fmt: Optional[str] = None,
+         book_rooms: bool = True, strict: bool = False) -> Dict[str, int]:
+    """
+    Carga los registros del archivo al almacén dado ('hotels',
+    'customers' o 'reservations') y devuelve cuántos se cargaron y
+    cuántos se rechazaron. Todo se escribe una sola vez al final.
+    """
+    fmt = file_format(path, fmt)
+    repo = STORES[store].repository()
+    id_field = SCHEMAS[store][0][0]
+    report = {"loaded": 0, "rejected": 0}
+    next_free = None
+    highest = 0
+    stats = Reservation.stats_repository()
+    with get_session().transaction(Hotel.repository(),
+                                   Customer.repository(), repo, stats):
+        for number, row in _rows(path, fmt):
+            try:
+                record = _record(store, row)
+                if (record[id_field] is not None
+                        and str(record[id_field]) in repo):
+                    raise ValueError(f"el ID {record[id_field]} ya existe")
+                CHECKS[store](record, book_rooms)
+            except ValueError as error:
+                if strict:
+                    raise ValueError(
+                        f"{path}, registro {number}: {error}") from None
+                report["rejected"] += 1
+                logger.warning("Registro %d de %s rechazado: %s", number,
+                               path, error,
+                               extra={"event": "bulk_row_rejected",
+                                      "store": store, "row": number,
+                                      "reason": str(error)})
+                continue
+            if record[id_field] is None:
+                # El primer ID sale del contador; los siguientes se
+                # asignan en bloque y el contador se adelanta al final
+                if next_free is None:
+                    next_free = repo.next_id()
+                while str(next_free) in repo:
+                    next_free += 1
+                record[id_field] = next_free
+                next_free += 1
+            repo.put(str(record[id_field]), record)
+            if store == "reservations":
+                # Los contadores de ocupación cuentan las cargadas
+                record_change(stats, None, record)
+            highest = max(highest, record[id_field])
+            report["loaded"] += 1
+        if highest:
+            repo.advance_sequence(highest)
+    logger.info("Carga de %s: %d registros, %d rechazados.", store,
+                report["loaded"], report["rejected"],
+                extra={"event": "bulk_load", "store": store, **report})
+    return report
+
+
+def export(store: str, path: str, fmt: Optional[str] = None) -> int:
+    """
+    Escribe los registros del almacén dado al archivo, uno por uno, y
+    devuelve cuántos se exportaron. El archivo se reemplaza de forma
+    atómica al terminar.
+    """
+    fmt = file_format(path, fmt)
+    repo = STORES[store].repository()
+    fields = [field for field, _ in SCHEMAS[store]]
+    count = 0
+    temporary = f"{path}.tmp"
+    with get_session().transaction(repo), \
+            open(temporary, "w", encoding="utf-8", newline="") as file_obj:
+        if fmt == "csv":
+            writer = csv.DictWriter(file_obj, fieldnames=fields,
+                                    extrasaction="ignore")
+            writer.writeheader()
+            write = writer.writerow
+        else:
+            def write(record: dict) -> None:
+                file_obj.write(_ENCODE(record) + "\n")
+        for _, record in repo.items():
+            write(record)
+            count += 1
+    os.replace(temporary, path)
+    return count
+
+
+def export_snapshot(directory: str, fmt: str = "jsonl") -> Dict[str, int]:
+    """
+    Exporta los tres almacenes a <directory>/<almacén>.<fmt>.
+    """
+    os.makedirs(directory, exist_ok=True)
+    return {store: export(store, os.path.join(directory,
+                                              f"{store}.{fmt}"), fmt)
+            for store in SNAPSHOT_ORDER}
+
+
+def import_snapshot(directory: str, fmt: str = "jsonl",
+                    strict: bool = False) -> Dict[str, Dict[str, int]]:
+    """
+    Importa un respaldo hecho con export_snapshot conservando los IDs.
+    Las reservaciones no vuelven a ocupar habitaciones porque el
+    booked_rooms de los hoteles del respaldo ya las cuenta.
+    """
+    reports = {}
+    for store in SNAPSHOT_ORDER:
+        path = os.path.join(directory, f"{store}.{fmt}")
+        if os.path.exists(path):
+            reports[store] = load(store, path, fmt, book_rooms=False,
+                                  strict=strict)
+    return reports
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Punto de entrada de la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Carga y exportación "
+                                     "masiva")
+    parser.add_argument("--backend", default="json",
+                        help="json, wal, sqlite o binary")
+    parser.add_argument("--format", choices=("csv", "jsonl"), default=None)
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("load", "export"):
+        command = commands.add_parser(name)
+        command.add_argument("store", choices=sorted(STORES))
+        command.add_argument("path")
+    commands.choices["load"].add_argument("--strict", action="store_true")
+    for name in ("export-snapshot", "import-snapshot"):
+        commands.add_parser(name).add_argument("directory")
+    args = parser.parse_args(argv)
+
+    if args.backend == "sqlite":
+        import sqlite_storage  # noqa: F401 pylint: disable=C0415,W0611
+    configure_logging(structured=False)
+    session = Session(backend=BACKENDS[args.backend])
+    previous = set_session(session)
+    try:
+        if args.command == "load":
+            result = load(args.store, args.path, args.format,
+                          strict=args.strict)
+        elif args.command == "export":
+            result = export(args.store, args.path, args.format)
+        elif args.command == "export-snapshot":
+            result = export_snapshot(args.directory, args.format or "jsonl")
+        else:
+            result = import_snapshot(args.directory, args.format or "jsonl")
+    finally:
+        session.close()
+        set_session(previous)
+    print(json.dumps(result, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+Caché de lectura (read-through) de objetos por repositorio.
+
+Las búsquedas por ID de hoteles y clientes leen el registro del
+repositorio cada vez (y con SQLite hacen una consulta). RecordCache
+guarda una copia privada de los registros leídos en un LRU de tamaño
+acotado:
+
+* los put() y delete() de este proceso invalidan la entrada de su clave
+  (la caché es listener del repositorio);
+* cuando la generación del repositorio cambia (otro proceso escribió el
+  archivo, según su firma o data_version, o el contenido se reemplazó
+  completo) se vacía toda la caché.
+
+Cada búsqueda recibe un objeto nuevo construido con la copia, así que
+modificarlo no altera la caché ni el repositorio; para cambiar un
+registro se usan las funciones de modificación, que pasan por el
+repositorio.
+"""
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+DEFAULT_MAXSIZE = 1024
+
+
+# Los contadores públicos se suman al estado del LRU
+class RecordCache:  # pylint: disable=too-many-instance-attributes
+    """
+    LRU de copias de los registros de un repositorio, de las que se
+    construyen los objetos que se devuelven.
+
+    Atributos:
+        maxsize (int): Número máximo de registros en caché.
+        hits (int): Búsquedas resueltas desde la caché.
+        misses (int): Búsquedas que tuvieron que ir al repositorio.
+        invalidations (int): Entradas descartadas por cambios.
+    """
+
+    def __init__(self, repository, factory: Callable,
+                 maxsize: int = DEFAULT_MAXSIZE):
+        if maxsize < 1:
+            raise ValueError("El tamaño de la caché debe ser positivo.")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._repository = weakref.ref(repository)
+        self._factory = factory
+        self._entries: "OrderedDict[str, dict]" = OrderedDict()
+        self._generation = None
+        # Cambia con cada invalidación; un registro leído antes de una
+        # invalidación no se guarda
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def sync(self) -> None:
+        """
+        Vacía la caché si la generación del repositorio cambió.
+        """
+        generation = self._repository().generation
+        if generation == self._generation:
+            return
+        with self._lock:
+            if generation != self._generation:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                self._generation = generation
+                self._version += 1
+
+    def get(self, key: str):
+        """
+        Devuelve un objeto nuevo con el registro de la clave dada,
+        leyéndolo del repositorio si no está en caché, o None si el
+        registro no existe (las ausencias no se guardan).
+        """
+        self.sync()
+        with self._lock:
+            record = self._entries.get(key)
+            if record is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._factory(**record)
+            self.misses += 1
+            version = self._version
+        record = self._repository().get(key)
+        if record is None:
+            return None
+        record = dict(record)
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = record
+                if len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+        return self._factory(**record)
+
+    def invalidate(self, key: str, old: Optional[dict] = None,
+                   new: Optional[dict] = None) -> None:
+        """
+        Descarta la entrada de la clave dada. Se registra como listener
+        del repositorio, por eso recibe también los registros.
+        """
+        del old, new
+        with self._lock:
+            self._version += 1
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        """
+        Descarta todas las entradas.
+        """
+        with self._lock:
+            self._version += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Devuelve los contadores de la caché para monitoreo.
+        """
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "invalidations": self.invalidations,
+                    "size": len(self._entries), "maxsize": self.maxsize}
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def record_cache(repository, factory: Callable,
+                 maxsize: int = DEFAULT_MAXSIZE) -> RecordCache:
+    """
+    Devuelve la caché de registros del repositorio, creándola la primera
+    vez y registrándola como listener para invalidar sus entradas.
+    """
+    with _caches_lock:
+        cache = _caches.get(repository)
+        if cache is None:
+            cache = RecordCache(repository, factory, maxsize)
+            _caches[repository] = cache
+            repository.add_listener(cache.invalidate)
+    return cache
+
+
+def cache_stats() -> Dict[str, Dict[str, int]]:
+    """
+    Devuelve los contadores de las cachés vivas por nombre de
+    repositorio, sumando los de repositorios con el mismo nombre (por
+    ejemplo, de varias sesiones).
+    """
+    with _caches_lock:
+        caches = list(_caches.items())
+    totals: Dict[str, Dict[str, int]] = {}
+    for repository, cache in caches:
+        total = totals.setdefault(repository.name, {})
+        for counter, value in cache.stats().items():
+            total[counter] = total.get(counter, 0) + value
+    return totals
@@ -0,0 +1,287 @@
+"""
+Formato binario compacto para los almacenes de Hotel, Customer y
+Reservation.
+
+Cada almacén tiene un esquema fijo de campos; los registros que lo
+cumplen se guardan por columnas (arrays de enteros y bloques de texto
+UTF-8) y los que no (campos extra, tipos inesperados o datos
+inválidos) se guardan aparte como JSON para no perder nada. Las fechas
+'YYYY-MM-DD' se guardan como ordinales, así que una reservación ocupa
+33 bytes en lugar de ~130 en JSON compacto.
+
+El backend BinaryRepository guarda cada almacén junto a su archivo
+JSON (hotels.json -> hotels.bin). Uso como herramienta de conversión:
+    python codec.py convert hotels.json customers.json reservations.json
+"""
+import gc
+import json
+import os
+import struct
+import sys
+from array import array
+from datetime import date
+from functools import partial
+from operator import itemgetter
+from typing import Dict, List, Optional, Tuple
+
+from storage import BACKENDS, JsonRepository, convert_stores
+
+MAGIC = b"HRB2"
+HEADER = struct.Struct("<4sII")
+COLUMN_SIZE = struct.Struct("<I")
+
+SCHEMAS = {
+    "hotels": (("hotel_id", "int"), ("name", "str"), ("location", "str"),
+               ("total_rooms", "int"), ("booked_rooms", "int")),
+    "customers": (("customer_id", "int"), ("name", "str"),
+                  ("email", "str")),
+    "reservations": (("reservation_id", "int"), ("customer_id", "int"),
+                     ("hotel_id", "int"), ("check_in", "date"),
+                     ("check_out", "date"), ("is_active", "bool")),
+    "waitlist": (("waitlist_id", "int"), ("customer_id", "int"),
+                 ("hotel_id", "int"), ("check_in", "date"),
+                 ("check_out", "date"), ("priority", "int"),
+                 ("requested_at", "str"), ("status", "str"),
+                 ("reservation_id", "int")),
+    "occupancy": (("counter", "str"), ("created", "int"),
+                  ("cancelled", "int"), ("nights", "int")),
+}
+
+STORE_NAMES = {
+    "hotels.json": "hotels",
+    "customers.json": "customers",
+    "reservations.json": "reservations",
+    "waitlist.json": "waitlist",
+    "reservations.json.stats": "occupancy",
+}
+
+# Tipo de array de cada columna; los textos van en un solo bloque
+# UTF-8 separados por NUL
+_TYPECODES = {"int": "q", "bool": "b", "date": "i"}
+_SEPARATOR = "\x00"
+
+
+def _fits_int(value) -> bool:
+    # bool es subclase de int, pero se leería de vuelta como int
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and -2 ** 63 <= value < 2 ** 63)
+
+
+def _fits_bool(value) -> bool:
+    return isinstance(value, bool)
+
+
+def _fits_date(value) -> bool:
+    try:
+        return date.fromisoformat(value).isoformat() == value
+    except (TypeError, ValueError):
+        return False
+
+
+def _fits_str(value) -> bool:
+    return isinstance(value, str) and _SEPARATOR not in value
+
+
+_FITS = {"int": _fits_int, "bool": _fits_bool, "date": _fits_date,
+         "str": _fits_str}
+
+
+def binary_path(path: str) -> str:
+    """
+    Ruta del archivo binario que corresponde al archivo JSON dado.
+    """
+    root, ext = os.path.splitext(path)
+    return f"{root}.bin" if ext == ".json" else f"{path}.bin"
+
+
+class RecordCodec:
+    """
+    Codifica y decodifica los registros {id: registro} de un almacén
+    según su esquema. Los valores se guardan por columnas: cada campo
+    numérico es un array contiguo y cada campo de texto un bloque, de
+    modo que la lectura convierte columnas enteras con array.frombytes
+    y str.split en lugar de interpretar registro por registro.
+
+    Atributos:
+        fields (tuple): Pares (nombre, tipo) del esquema.
+    """
+
+    def __init__(self, fields: Tuple[Tuple[str, str], ...]):
+        self.fields = fields
+        self.names = tuple(name for name, _ in fields)
+        self._names_set = set(self.names)
+        # Empareja los nombres del esquema con los valores de una fila
+        self._pair = partial(zip, self.names)
+        # Obtiene de un registro los valores de cada columna
+        self._getters = tuple(itemgetter(name) for name in self.names)
+        # Revisa si el valor de cada columna cabe en su tipo
+        self._checks = tuple((name, _FITS[kind]) for name, kind in fields)
+
+    def _build(self, columns: List[list]) -> Dict[str, dict]:
+        """
+        Arma los registros {id: registro} a partir de las columnas. Los
+        ciclos corren en C (map y zip), sin código de Python por fila.
+        """
+        if not columns:
+            return {}
+        rows = map(dict, map(self._pair, zip(*columns)))
+        return dict(zip(map(str, columns[0]), rows))
+
+    def _fits(self, key: str, record) -> bool:
+        """
+        Indica si el registro cumple el esquema y puede ir en las
+        columnas.
+        """
+        if not isinstance(record, dict) or record.keys() != self._names_set:
+            return False
+        return (all(check(record[name]) for name, check in self._checks)
+                and key == str(record[self.names[0]]))
+
+    def encode(self, records: Dict[str, dict]) -> bytes:
+        """
+        Convierte los registros al formato binario.
+        """
+        rows = []
+        overflow = {}
+        for key, record in records.items():
+            if self._fits(key, record):
+                rows.append(record)
+            else:
+                overflow[key] = record
+
+        columns = []
+        for (_, kind), getter in zip(self.fields, self._getters):
+            values = list(map(getter, rows))
+            if kind == "str":
+                data = _SEPARATOR.join(values).encode("utf-8")
+            else:
+                if kind == "date":
+                    values = [date.fromisoformat(value).toordinal()
+                              for value in values]
+                column = array(_TYPECODES[kind], values)
+                if sys.byteorder == "big":
+                    column.byteswap()
+                data = column.tobytes()
+            columns.append(COLUMN_SIZE.pack(len(data)) + data)
+        extra = (json.dumps(overflow, separators=(",", ":")).encode("utf-8")
+                 if overflow else b"")
+        return (HEADER.pack(MAGIC, len(rows), len(extra))
+                + b"".join(columns) + extra)
+
+    def decode(self, data: bytes) -> Dict[str, dict]:
+        """
+        Reconstruye los registros desde el formato binario.
+        """
+        magic, count, extra_size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("El archivo no tiene el formato binario")
+        offset = HEADER.size
+        columns = []
+        for _, kind in self.fields:
+            (size,) = COLUMN_SIZE.unpack_from(data, offset)
+            offset += COLUMN_SIZE.size
+            raw = data[offset:offset + size]
+            offset += size
+            if kind == "str":
+                column = raw.decode("utf-8").split(_SEPARATOR) if count else []
+            else:
+                column = array(_TYPECODES[kind])
+                column.frombytes(raw)
+                if sys.byteorder == "big":
+                    column.byteswap()
+                if kind == "bool":
+                    column = list(map(bool, column))
+                elif kind == "date":
+                    # Pocas fechas distintas: se convierten una sola vez
+                    dates = {ordinal: date.fromordinal(ordinal).isoformat()
+                             for ordinal in set(column)}
+                    column = list(map(dates.__getitem__, column))
+            columns.append(column)
+        extra = data[offset:offset + extra_size]
+
+        # Los registros no forman ciclos; pausar el recolector evita que
+        # recorra el millón de dicts recién creados varias veces
+        collecting = gc.isenabled()
+        gc.disable()
+        try:
+            records = self._build(columns)
+        finally:
+            if collecting:
+                gc.enable()
+        if extra:
+            records.update(json.loads(extra))
+        return records
+
+
+class BinaryRepository(JsonRepository):
+    """
+    Repositorio con la misma interfaz que JsonRepository que guarda el
+    almacén en el formato binario de su esquema. Como el JSON, el
+    archivo se reescribe completo (de forma atómica) en cada flush().
+
+    Atributos:
+        json_path (str): Ruta del archivo JSON del almacén.
+    """
+
+    def __init__(self, name: str, path: str):
+        super().__init__(name, binary_path(path))
+        self.json_path = path
+        self.codec = RecordCodec(SCHEMAS[name])
+
+    def _read(self) -> Dict[str, dict]:
+        """
+        Lee el archivo binario; un archivo inexistente es un almacén
+        vacío.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'rb') as store_file:
+            return self.codec.decode(store_file.read())
+
+    def _write(self, records: Dict[str, dict], changed) -> None:
+        """
+        Reescribe el archivo binario completo.
+        """
+        del changed  # El formato siempre se reescribe completo
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as store_file:
+            store_file.write(self.codec.encode(records))
+            store_file.flush()
+            os.fsync(store_file.fileno())
+        os.replace(tmp_path, self.path)
+
+
+BACKENDS["binary"] = BinaryRepository
+
+
+def convert_json(path: str, name: Optional[str] = None) -> int:
+    """
+    Convierte un archivo JSON de almacén a su archivo binario y devuelve
+    cuántos registros se convirtieron.
+    """
+    if name is None:
+        name = STORE_NAMES.get(os.path.basename(path))
+    if name not in SCHEMAS:
+        raise ValueError(f"No se reconoce el almacén de {path}")
+    with open(path, 'r', encoding='utf-8') as store_file:
+        records: Dict[str, dict] = json.load(store_file)
+    repo = BinaryRepository(name, path)
+    repo.replace_all(records)
+    repo.flush()
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Herramienta de línea de comandos para convertir los archivos JSON.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 2 or args[0] != "convert":
+        print("Uso: python codec.py convert "
+              "hotels.json [customers.json reservations.json]")
+        return
+    convert_stores(args[1:], convert_json, binary_path, "convertir")
+
+
+if __name__ == "__main__":
+    main()
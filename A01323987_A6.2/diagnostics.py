@@ -0,0 +1,81 @@
+"""
+Registro de diagnósticos del sistema de reservaciones.
+
+Los módulos no escriben a la terminal: reportan eventos con el módulo
+logging bajo el logger "reservations" y sus hijos, con niveles
+(DEBUG, INFO, WARNING, ...) y campos estructurados que se pasan en
+extra= (por ejemplo event, reason, hotel_id). configure_logging()
+instala un handler que escribe cada evento como una línea JSON con
+esos campos, listo para enviarse a un agregador de logs.
+
+Sin configurar, los eventos de nivel WARNING o mayor siguen
+apareciendo en la consola (stderr) con el handler de último recurso
+de logging, y los de menor nivel no cuestan más que revisar el nivel.
+"""
+import json
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Optional, TextIO, Union
+
+LOGGER_NAME = "reservations"
+
+# Atributos propios de LogRecord; lo demás viene de extra=
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord(
+    "", logging.INFO, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formatea cada registro como un objeto JSON en una línea con la
+    hora, el nivel, el logger, el mensaje y los campos de extra=.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(
+                record.created, timezone.utc).isoformat(
+                    timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+def get_logger(component: Optional[str] = None) -> logging.Logger:
+    """
+    Devuelve el logger del sistema o el de uno de sus componentes
+    ("reservations.<component>").
+    """
+    if component is None:
+        return logging.getLogger(LOGGER_NAME)
+    return logging.getLogger(f"{LOGGER_NAME}.{component}")
+
+
+def configure_logging(level: Union[int, str] = logging.WARNING,
+                      stream: Optional[TextIO] = None,
+                      structured: bool = True) -> logging.Handler:
+    """
+    Envía los eventos del sistema al stream dado (stderr por defecto)
+    a partir del nivel indicado, como JSON o como texto legible.
+    Reemplaza el handler instalado por una llamada anterior.
+    """
+    logger = get_logger()
+    for handler in list(logger.handlers):
+        if getattr(handler, "_reservations_handler", False):
+            logger.removeHandler(handler)
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if structured else
+                         logging.Formatter(
+                             "%(levelname)s %(name)s: %(message)s"))
+    handler._reservations_handler = True  # pylint: disable=W0212
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return handler
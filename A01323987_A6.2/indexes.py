@@ -0,0 +1,206 @@
+"""
+Índices secundarios sobre los repositorios.
+
+Un índice secundario asocia el valor de un campo de los registros (por
+ejemplo la ubicación de un hotel) con el conjunto de claves que lo
+tienen, de modo que una búsqueda por ese campo no tenga que recorrer
+todo el archivo. Se construye una vez con el contenido del repositorio,
+se mantiene al día con los put() y delete() de este proceso y se
+reconstruye cuando la generación del repositorio cambia (otro proceso
+escribió o el contenido se reemplazó completo).
+
+Si el repositorio tiene su propio índice del campo (indexed_fields,
+como SqliteRepository), las búsquedas se le delegan y no se construye
+nada en memoria.
+"""
+import threading
+import weakref
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+
+def normalize_text(value: str) -> str:
+    """
+    Normaliza un texto para compararlo sin importar mayúsculas ni
+    espacios al inicio o al final.
+    """
+    return str(value).strip().casefold()
+
+
+class RepositoryMirror:
+    """
+    Estructura en memoria derivada del contenido de un repositorio. Las
+    subclases implementan build(), que la reconstruye completa, y
+    update(), que se registra como listener del repositorio para
+    reflejar los cambios de este proceso.
+
+    Atributos:
+        generation (int): Generación del repositorio a partir de la cual
+                          se construyó.
+    """
+
+    def __init__(self, generation: Optional[int] = None):
+        self.generation = generation
+        self._lock = threading.RLock()
+
+    def build(self, items: Iterable[Tuple[str, dict]],
+              generation: int) -> None:
+        """
+        Reconstruye la estructura con los pares (clave, registro) dados.
+        """
+        raise NotImplementedError
+
+    def update(self, key: str, old: Optional[dict],
+               new: Optional[dict]) -> None:
+        """
+        Refleja el cambio de un registro.
+        """
+        raise NotImplementedError
+
+    def sync(self, repository) -> None:
+        """
+        Reconstruye la estructura si la generación del repositorio
+        cambió.
+        """
+        generation = repository.generation
+        if self.generation == generation:
+            return
+        with self._lock:
+            if self.generation != generation:
+                self.build(repository.items(), generation)
+
+
+class SecondaryIndex(RepositoryMirror):
+    """
+    Índice de un campo de los registros hacia sus claves.
+
+    Atributos:
+        field (str): Campo indexado.
+        generation (int): Generación del repositorio a partir de la cual
+                          se construyó.
+    """
+
+    def __init__(self, field: str,
+                 normalize: Optional[Callable] = None):
+        super().__init__()
+        self.field = field
+        self._normalize = normalize
+        self._keys: Dict[object, Set[str]] = defaultdict(set)
+
+    def _value(self, record: Optional[dict]):
+        """
+        Valor indexado del registro, o None si no tiene el campo.
+        """
+        if record is None:
+            return None
+        value = record.get(self.field)
+        if value is None or self._normalize is None:
+            return value
+        return self._normalize(value)
+
+    def build(self, items: Iterable[Tuple[str, dict]],
+              generation: int) -> None:
+        """
+        Reconstruye el índice con los pares (clave, registro) dados.
+        """
+        keys = defaultdict(set)
+        for key, record in items:
+            value = self._value(record)
+            if value is not None:
+                keys[value].add(key)
+        with self._lock:
+            self._keys = keys
+            self.generation = generation
+
+    def update(self, key: str, old: Optional[dict],
+               new: Optional[dict]) -> None:
+        """
+        Refleja el cambio de un registro. Se registra como listener del
+        repositorio.
+        """
+        old_value = self._value(old)
+        new_value = self._value(new)
+        if old_value == new_value:
+            return
+        with self._lock:
+            if old_value is not None:
+                keys = self._keys.get(old_value)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys[old_value]
+            if new_value is not None:
+                self._keys[new_value].add(key)
+
+    def lookup_one(self, value) -> Optional[str]:
+        """
+        Devuelve una de las claves cuyo campo vale value, o None. Pensado
+        para índices únicos, donde a lo más hay una.
+        """
+        if value is not None and self._normalize is not None:
+            value = self._normalize(value)
+        with self._lock:
+            return next(iter(self._keys.get(value, ())), None)
+
+    def lookup(self, value) -> Set[str]:
+        """
+        Devuelve una copia de las claves cuyo campo vale value.
+        """
+        if value is not None and self._normalize is not None:
+            value = self._normalize(value)
+        with self._lock:
+            return set(self._keys.get(value, ()))
+
+
+class RepositoryIndex:
+    """
+    Índice secundario que resuelve el propio repositorio con
+    lookup_keys(), por ejemplo con un índice de SQLite. No guarda nada
+    en memoria, así que no se reconstruye cuando otro proceso escribe.
+
+    Atributos:
+        field (str): Campo indexado.
+    """
+
+    def __init__(self, repository, field: str):
+        self.field = field
+        self._repository = weakref.ref(repository)
+
+    def lookup_one(self, value) -> Optional[str]:
+        """
+        Devuelve una de las claves cuyo campo vale value, o None.
+        """
+        return next(iter(self.lookup(value)), None)
+
+    def lookup(self, value) -> Set[str]:
+        """
+        Devuelve las claves cuyo campo vale value.
+        """
+        return self._repository().lookup_keys(self.field, value)
+
+
+_indexes = weakref.WeakKeyDictionary()
+_indexes_lock = threading.Lock()
+
+
+def secondary_index(repository, field: str,
+                    normalize: Optional[Callable] = None):
+    """
+    Devuelve el índice del campo dado sobre el repositorio, creándolo
+    la primera vez y reconstruyéndolo si la generación del repositorio
+    cambió desde que se construyó. Si el repositorio indexa el campo
+    por sí mismo devuelve un RepositoryIndex, que normaliza igual.
+    """
+    with _indexes_lock:
+        by_field = _indexes.setdefault(repository, {})
+        index = by_field.get(field)
+        if index is None:
+            if field in repository.indexed_fields:
+                index = RepositoryIndex(repository, field)
+            else:
+                index = SecondaryIndex(field, normalize)
+                repository.add_listener(index.update)
+            by_field[field] = index
+    if isinstance(index, SecondaryIndex):
+        index.sync(repository)
+    return index
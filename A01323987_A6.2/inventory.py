@@ -0,0 +1,127 @@
+"""
+Inventario de habitaciones por fecha.
+
+Para cada hotel se lleva un arreglo de ocupación por día (ordinal de la
+fecha -> habitaciones ocupadas esa noche) construido a partir de las
+reservaciones activas. Revisar la disponibilidad de un rango cuesta
+O(días del rango) en lugar de recorrer todas las reservaciones, y al
+cancelar se liberan exactamente las noches que la reservación ocupaba.
+"""
+import threading
+import weakref
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+
+def stay_range(check_in: str, check_out: str) -> Optional[Tuple[int, int]]:
+    """
+    Convierte las fechas 'YYYY-MM-DD' de una estancia en el rango de
+    noches [inicio, fin) como ordinales. Devuelve None si las fechas no
+    son válidas o la salida no es posterior a la entrada.
+    """
+    try:
+        start = date.fromisoformat(check_in).toordinal()
+        end = date.fromisoformat(check_out).toordinal()
+    except (TypeError, ValueError):
+        return None
+    if end <= start:
+        return None
+    return start, end
+
+
+class RoomInventory:
+    """
+    Ocupación por noche de cada hotel.
+
+    Atributos:
+        generation (int): Generación del repositorio de reservaciones a
+                          partir de la cual se construyó.
+    """
+
+    def __init__(self, generation: int = 0):
+        self.generation = generation
+        self._occupancy: Dict[int, Dict[int, int]] = defaultdict(dict)
+        self._dated: Dict[int, int] = defaultdict(int)
+
+    @classmethod
+    def build(cls, reservations: Iterable[dict],
+              generation: int = 0) -> 'RoomInventory':
+        """
+        Construye el inventario con las reservaciones activas.
+        """
+        inventory = cls(generation)
+        for record in reservations:
+            if record.get("is_active"):
+                stay = stay_range(record.get("check_in"),
+                                  record.get("check_out"))
+                if stay is not None:
+                    inventory.book(record["hotel_id"], *stay)
+        return inventory
+
+    def book(self, hotel_id: int, start: int, end: int) -> None:
+        """
+        Ocupa una habitación del hotel en las noches [start, end).
+        """
+        days = self._occupancy[hotel_id]
+        for day in range(start, end):
+            days[day] = days.get(day, 0) + 1
+        self._dated[hotel_id] += 1
+
+    def release(self, hotel_id: int, start: int, end: int) -> None:
+        """
+        Libera una habitación del hotel en las noches [start, end).
+        """
+        days = self._occupancy[hotel_id]
+        for day in range(start, end):
+            count = days.get(day, 0) - 1
+            if count > 0:
+                days[day] = count
+            else:
+                days.pop(day, None)
+        self._dated[hotel_id] = max(self._dated[hotel_id] - 1, 0)
+
+    def occupied(self, hotel_id: int, start: int, end: int) -> int:
+        """
+        Máximo de habitaciones ocupadas en alguna noche de [start, end).
+        """
+        days = self._occupancy.get(hotel_id)
+        if not days:
+            return 0
+        return max((days.get(day, 0) for day in range(start, end)),
+                   default=0)
+
+    def peak(self, hotel_id: int) -> int:
+        """
+        Máximo de habitaciones ocupadas en cualquier noche.
+        """
+        return max(self._occupancy.get(hotel_id, {}).values(), default=0)
+
+    def dated_reservations(self, hotel_id: int) -> int:
+        """
+        Cantidad de reservaciones activas con fechas del hotel.
+        """
+        return self._dated.get(hotel_id, 0)
+
+
+_inventories = weakref.WeakKeyDictionary()
+_inventories_lock = threading.Lock()
+
+
+def room_inventory(repository) -> RoomInventory:
+    """
+    Devuelve el inventario del repositorio de reservaciones dado,
+    reconstruyéndolo si el repositorio cambió por fuera de este proceso
+    (su generación es distinta).
+    """
+    generation = repository.generation
+    inventory = _inventories.get(repository)
+    if inventory is None or inventory.generation != generation:
+        with _inventories_lock:
+            inventory = _inventories.get(repository)
+            if inventory is None or inventory.generation != generation:
+                inventory = RoomInventory.build(
+                    (record for _, record in repository.items()),
+                    generation)
+                _inventories[repository] = inventory
+    return inventory
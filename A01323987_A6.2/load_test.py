@@ -0,0 +1,181 @@
+"""
+Generador de carga para server.py.
+
+Simula clientes de reservaciones: cada cliente abre una conexión
+persistente y envía, durante el tiempo indicado, una mezcla de
+búsquedas, consultas de hotel y reservaciones. Al final reporta
+solicitudes por segundo, las latencias p50/p99 vistas por los clientes
+y las métricas por ruta que reporta el servidor.
+
+Uso:
+    python server.py --port 8080 &
+    python load_test.py --port 8080 --clients 8 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+LOCATIONS = ("Monterrey", "Guadalajara", "Cancún", "Puebla")
+
+
+def _request(connection, method: str, path: str, body=None):
+    """
+    Envía una solicitud por la conexión persistente y devuelve
+    (código, cuerpo decodificado).
+    """
+    # El cuerpo en bytes se envía junto con los encabezados en un solo
+    # send(), lo que evita la espera de Nagle con ACK retrasado
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    headers = {"Content-Type": "application/json"} if data else {}
+    connection.request(method, path, body=data, headers=headers)
+    response = connection.getresponse()
+    return response.status, json.loads(response.read() or b"null")
+
+
+def seed(address: Tuple[str, int], hotels: int, customers: int) -> tuple:
+    """
+    Crea hoteles y clientes de prueba en el servidor (host, puerto) y
+    devuelve sus IDs: (hoteles, clientes).
+    """
+    connection = http.client.HTTPConnection(*address)
+    hotel_ids = []
+    for number in range(hotels):
+        _, hotel = _request(connection, "POST", "/hotels", {
+            "name": f"Hotel {number}",
+            "location": LOCATIONS[number % len(LOCATIONS)],
+            "total_rooms": 50})
+        hotel_ids.append(hotel["hotel_id"])
+    customer_ids = []
+    stamp = time.time_ns()
+    for number in range(customers):
+        status, customer = _request(connection, "POST", "/customers", {
+            "name": f"Cliente {number}",
+            "email": f"cliente{number}.{stamp}@example.com"})
+        if status == 201:
+            customer_ids.append(customer["customer_id"])
+    connection.close()
+    return hotel_ids, customer_ids
+
+
+class Client(threading.Thread):
+    """
+    Cliente simulado con una conexión persistente al servidor
+    (host, puerto). catalog son los IDs (hoteles, clientes) que usa en
+    sus solicitudes.
+    """
+
+    def __init__(self, address: Tuple[str, int], deadline: float,
+                 catalog: Tuple[List[int], List[int]], book_ratio: float):
+        super().__init__(daemon=True)
+        self.connection = http.client.HTTPConnection(*address)
+        self.deadline = deadline
+        self.catalog = catalog
+        self.book_ratio = book_ratio
+        self.latencies: List[float] = []
+        self.errors = 0
+        self._random = random.Random()
+
+    def _next(self) -> tuple:
+        hotel_ids, customer_ids = self.catalog
+        choice = self._random.random()
+        start = date(2025, 1, 1) + timedelta(
+            days=self._random.randrange(365))
+        end = start + timedelta(days=self._random.randint(1, 5))
+        if choice < self.book_ratio:
+            return "POST", "/reservations", {
+                "customer_id": self._random.choice(customer_ids),
+                "hotel_id": self._random.choice(hotel_ids),
+                "check_in": start.isoformat(),
+                "check_out": end.isoformat()}
+        if choice < (1 + self.book_ratio) / 2:
+            query = urlencode({"location": self._random.choice(LOCATIONS),
+                               "rooms": 1, "check_in": start.isoformat(),
+                               "check_out": end.isoformat()})
+            return "GET", f"/hotels?{query}", None
+        return ("GET", f"/hotels/{self._random.choice(hotel_ids)}",
+                None)
+
+    def run(self):
+        while time.perf_counter() < self.deadline:
+            method, path, body = self._next()
+            start = time.perf_counter()
+            try:
+                status, _ = _request(self.connection, method, path, body)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                self.connection.close()
+                continue
+            self.latencies.append((time.perf_counter() - start) * 1000)
+            if status >= 500:
+                self.errors += 1
+        self.connection.close()
+
+
+def _summary(address: Tuple[str, int], workers: List[Client],
+             elapsed: float) -> dict:
+    """
+    Resume lo que midieron los clientes y agrega las métricas que
+    reporta el servidor.
+    """
+    latencies = sorted(value for worker in workers
+                       for value in worker.latencies)
+    last = max(len(latencies) - 1, 0)
+    connection = http.client.HTTPConnection(*address)
+    _, server_metrics = _request(connection, "GET", "/metrics")
+    connection.close()
+    return {
+        "requests": len(latencies),
+        "errors": sum(worker.errors for worker in workers),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(latencies[round(last * 0.50)], 3)
+        if latencies else None,
+        "p99_ms": round(latencies[round(last * 0.99)], 3)
+        if latencies else None,
+        "server": server_metrics,
+    }
+
+
+def run_load(address: Tuple[str, int], clients: int, seconds: float,
+             book_ratio: float = 0.3,
+             population: Tuple[int, int] = (20, 50)) -> dict:
+    """
+    Ejecuta la carga contra el servidor (host, puerto) y devuelve el
+    resumen. population es cuántos hoteles y clientes se crean antes.
+    """
+    catalog = seed(address, *population)
+    deadline = time.perf_counter() + seconds
+    workers = [Client(address, deadline, catalog, book_ratio)
+               for _ in range(clients)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return _summary(address, workers, time.perf_counter() - start)
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Punto de entrada de la línea de comandos.
+    """
+    parser = argparse.ArgumentParser(description="Generador de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--book-ratio", type=float, default=0.3,
+                        help="Fracción de solicitudes que reservan")
+    args = parser.parse_args(argv)
+    result = run_load((args.host, args.port), args.clients, args.seconds,
+                      book_ratio=args.book_ratio)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
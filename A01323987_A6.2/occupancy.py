@@ -0,0 +1,136 @@
+"""
+Contadores persistentes de ocupación y cancelaciones por hotel.
+
+Los contadores viven en su propio almacén, junto al de reservaciones
+(<reservations.json>.stats en el backend de la sesión), con un registro
+por hotel y día, uno por hotel y mes y uno por hotel en total:
+
+* nights: habitaciones ocupadas cada noche por reservaciones activas
+  o archivadas al terminar su estancia;
+* created / cancelled: reservaciones con entrada ese día y cuántas de
+  ellas se cancelaron (la tasa de cancelación es por fecha de entrada).
+
+record_change() los ajusta dentro de las mismas transacciones que crean
+o cancelan reservaciones, así que cualquier proceso los consulta con
+una lectura, sin recorrer las reservaciones. Eliminar una reservación
+del almacén caliente, que solo ocurre al archivarla, no los cambia: la
+historia se conserva. compute() los calcula desde cero para una
+reconstrucción completa.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Dict, Iterable, Optional, Tuple
+
+from inventory import stay_range
+
+# Marca de las reservaciones archivadas porque su estancia terminó
+COMPLETED = "completed"
+# Contadores de cada registro, en el orden en que se devuelven
+FIELDS = ("created", "cancelled", "nights")
+# Alcance del registro con los totales de un hotel
+TOTAL = "total"
+
+
+def counter_key(hotel_id: int, scope: str) -> str:
+    """
+    Clave del registro de un hotel para un día 'YYYY-MM-DD', un mes
+    'YYYY-MM' o TOTAL.
+    """
+    return f"{hotel_id}:{scope}"
+
+
+def was_stayed(record: dict) -> bool:
+    """
+    Indica si la reservación ocupa (u ocupó) sus noches: está activa o
+    se archivó porque su estancia terminó, no porque se canceló.
+    """
+    return bool(record.get("is_active") or record.get(COMPLETED))
+
+
+def _contributions(record: Optional[dict]) -> Dict[str, list]:
+    """
+    Lo que aporta una reservación a cada registro de contadores:
+    {clave: [created, cancelled, nights]}.
+    """
+    if record is None:
+        return {}
+    stay = stay_range(record.get("check_in"), record.get("check_out"))
+    if stay is None:
+        return {}
+    hotel_id = record["hotel_id"]
+    start, end = stay
+    stayed = was_stayed(record)
+    first = date.fromordinal(start)
+    result = defaultdict(lambda: [0, 0, 0])
+    for scope in (first.isoformat(), first.strftime("%Y-%m"), TOTAL):
+        entry = result[counter_key(hotel_id, scope)]
+        entry[0] += 1
+        entry[1] += not stayed
+    if stayed:
+        for ordinal in range(start, end):
+            day = date.fromordinal(ordinal)
+            result[counter_key(hotel_id, day.isoformat())][2] += 1
+            result[counter_key(hotel_id, day.strftime("%Y-%m"))][2] += 1
+        result[counter_key(hotel_id, TOTAL)][2] += end - start
+    return result
+
+
+def _add(totals: Dict[str, list], record: Optional[dict],
+         sign: int) -> None:
+    """
+    Suma (sign=1) o resta (sign=-1) a totals lo que aporta una
+    reservación.
+    """
+    for key, values in _contributions(record).items():
+        entry = totals[key]
+        for position, value in enumerate(values):
+            entry[position] += sign * value
+
+
+def _record(key: str, values: Iterable[int]) -> dict:
+    """
+    Registro del almacén de contadores.
+    """
+    return {"counter": key, **dict(zip(FIELDS, values))}
+
+
+def record_change(store, old: Optional[dict], new: Optional[dict]) -> None:
+    """
+    Ajusta los contadores por el cambio de una reservación de old a new
+    (old None al crearla). Se llama dentro de una transacción que
+    incluye el almacén de contadores; las eliminaciones (new None) no
+    cambian nada.
+    """
+    if new is None:
+        return
+    deltas = defaultdict(lambda: [0, 0, 0])
+    _add(deltas, old, -1)
+    _add(deltas, new, 1)
+    for key, delta in deltas.items():
+        if not any(delta):
+            continue
+        current = read_counters(store, key)
+        store.put(key, _record(key, (value + change for value, change
+                                     in zip(current, delta))))
+
+
+def compute(records: Iterable[dict]) -> Dict[str, dict]:
+    """
+    Calcula desde cero el contenido del almacén de contadores para las
+    reservaciones dadas.
+    """
+    totals = defaultdict(lambda: [0, 0, 0])
+    for record in records:
+        _add(totals, record, 1)
+    return {key: _record(key, values) for key, values in totals.items()}
+
+
+def read_counters(store, key: str) -> Tuple[int, int, int]:
+    """
+    Devuelve (created, cancelled, nights) del registro dado, o ceros si
+    no existe.
+    """
+    record = store.get(key)
+    if record is None:
+        return 0, 0, 0
+    return tuple(record[field] for field in FIELDS)
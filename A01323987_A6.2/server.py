@@ -0,0 +1,385 @@
+"""
+Servidor HTTP local para Hotel, Customer y Reservation.
+
+Expone las operaciones del sistema como una API JSON sobre los
+almacenes del proceso, con conexiones persistentes (HTTP/1.1
+keep-alive) atendidas por un pool de hilos, y mide la latencia de cada
+ruta (p50/p99) en GET /metrics.
+
+Rutas:
+    GET    /health
+    GET    /metrics
+    GET    /metrics/cache          aciertos y fallos de la caché
+    GET    /hotels?location=&rooms=&check_in=&check_out=
+    POST   /hotels                 {"name", "location", "total_rooms"}
+    GET    /hotels/<id>
+    PATCH  /hotels/<id>            {"name", "location", "total_rooms"}
+    DELETE /hotels/<id>?on_delete=restrict|cascade
+    GET    /customers?email=
+    POST   /customers              {"name", "email"}
+    GET    /customers/<id>
+    PATCH  /customers/<id>         {"name", "email"}
+    DELETE /customers/<id>?on_delete=restrict|cascade
+    GET    /reservations?customer_id=|hotel_id=
+    POST   /reservations           {"customer_id", "hotel_id",
+                                    "check_in", "check_out"}
+    POST   /reservations/batch     {"requests": [...], "atomic": true}
+    GET    /reservations/<id>
+    DELETE /reservations/<id>      cancela la reservación
+
+Uso:
+    python server.py [--port 8080] [--workers 16] [--backend json]
+                     [--flush-interval 0]
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from A01323987_A6_2 import Customer, Hotel, Reservation
+from cache import cache_stats
+from diagnostics import configure_logging
+from storage import BACKENDS, Session, set_session
+
+DEFAULT_PORT = 8080
+LATENCY_SAMPLES = 10000
+DATE_FORMAT = "%Y-%m-%d"
+
+
+class LatencyMetrics:
+    """
+    Guarda las latencias más recientes de cada ruta y calcula sus
+    percentiles bajo demanda.
+    """
+
+    def __init__(self, samples: int = LATENCY_SAMPLES):
+        self.samples = samples
+        self._latencies = defaultdict(lambda: deque(maxlen=self.samples))
+        self._counts = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, route: str, milliseconds: float) -> None:
+        """
+        Agrega la latencia de una solicitud.
+        """
+        with self._lock:
+            self._latencies[route].append(milliseconds)
+            self._counts[route] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        """
+        Devuelve solicitudes, p50, p99 y máximo (ms) por ruta.
+        """
+        with self._lock:
+            copies = {route: sorted(values)
+                      for route, values in self._latencies.items()}
+            counts = dict(self._counts)
+        result = {}
+        for route, values in copies.items():
+            last = len(values) - 1
+            result[route] = {
+                "requests": counts[route],
+                "p50_ms": round(values[round(last * 0.50)], 3),
+                "p99_ms": round(values[round(last * 0.99)], 3),
+                "max_ms": round(values[last], 3),
+            }
+        return result
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    Servidor HTTP que atiende cada conexión en un pool de hilos de
+    tamaño fijo en lugar de crear un hilo por conexión. Una conexión
+    persistente ocupa un hilo mientras esté abierta, así que workers es
+    también el máximo de clientes atendidos a la vez.
+    """
+
+    def __init__(self, address, handler, workers: int = 16):
+        super().__init__(address, handler)
+        self.metrics = LatencyMetrics()
+        self._pool = ThreadPoolExecutor(max_workers=workers,
+                                        thread_name_prefix="http")
+
+    def process_request(self, request, client_address):
+        self._pool.submit(self._serve, request, client_address)
+
+    def _serve(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:  # pylint: disable=broad-except
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _parse_date(value) -> datetime:
+    return datetime.strptime(value, DATE_FORMAT)
+
+
+def _hotel_dict(hotel: Hotel) -> dict:
+    return {"hotel_id": hotel.hotel_id, "name": hotel.name,
+            "location": hotel.location, "total_rooms": hotel.total_rooms,
+            "booked_rooms": hotel.booked_rooms}
+
+
+def _customer_dict(customer: Customer) -> dict:
+    return {"customer_id": customer.customer_id, "name": customer.name,
+            "email": customer.email}
+
+
+def _reservation_dict(reservation: Reservation) -> dict:
+    return {"reservation_id": reservation.reservation_id,
+            "customer_id": reservation.customer_id,
+            "hotel_id": reservation.hotel_id,
+            "check_in": reservation.check_in,
+            "check_out": reservation.check_out,
+            "is_active": reservation.is_active}
+
+
+def _get_record(repository, record_id: str) -> Tuple[int, dict]:
+    repository.refresh()
+    record = repository.get(record_id)
+    if record is None:
+        return 404, {"error": "No existe"}
+    return 200, record
+
+
+class BookingHandler(BaseHTTPRequestHandler):
+    """
+    Atiende las rutas de la API (ver el docstring del módulo).
+    """
+    protocol_version = "HTTP/1.1"
+    # Cierra las conexiones persistentes que queden inactivas
+    timeout = 30
+    # Las respuestas pequeñas no deben esperar el ACK retrasado del
+    # cliente en conexiones persistentes
+    disable_nagle_algorithm = True
+
+    def _respond(self, status: int, body) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        if self.close_connection:
+            self.send_header("Connection", "close")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self) -> dict:
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            # El cuerpo no se puede leer: se cierra la conexión en lugar
+            # de bloquear el hilo esperando el fin del flujo
+            self.close_connection = True
+            raise ValueError("Content-Length inválido")
+        if not length:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise ValueError("Se esperaba un objeto JSON")
+        return body
+
+    def _dispatch(self) -> None:
+        start = time.perf_counter()
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        query = {key: values[-1]
+                 for key, values in parse_qs(url.query).items()}
+        # Las métricas se agrupan por ruta, no por ID
+        route = "/" + "/".join(
+            "{id}" if part.isdigit() else part for part in parts)
+        try:
+            status, body = self._route(parts, query)
+        except (ValueError, KeyError, TypeError) as error:
+            status, body = 400, {"error": f"Solicitud inválida: {error}"}
+        except Exception as error:  # pylint: disable=broad-except
+            # Un error inesperado responde 500 en lugar de cortar la
+            # conexión sin respuesta, y también se mide
+            status, body = 500, {"error": f"Error interno: {error}"}
+        self._respond(status, body)
+        self.server.metrics.record(f"{self.command} {route}",
+                                   (time.perf_counter() - start) * 1000)
+
+    def _route(self, parts, query) -> Tuple[int, object]:
+        method = self.command
+        if parts == ["health"] and method == "GET":
+            return 200, {"status": "ok"}
+        if parts == ["metrics"] and method == "GET":
+            return 200, self.server.metrics.summary()
+        if parts == ["metrics", "cache"] and method == "GET":
+            return 200, cache_stats()
+        if not parts:
+            return 404, {"error": "Ruta no encontrada"}
+
+        resource, rest = parts[0], parts[1:]
+        handler = {"hotels": self._hotels, "customers": self._customers,
+                   "reservations": self._reservations}.get(resource)
+        if handler is None or len(rest) > 1:
+            return 404, {"error": "Ruta no encontrada"}
+        return handler(method, rest[0] if rest else None, query)
+
+    def _hotels(self, method, item, query) -> Tuple[int, object]:
+        # pylint: disable=too-many-return-statements
+        if item is None and method == "GET":
+            check_in = query.get("check_in")
+            check_out = query.get("check_out")
+            hotels = Hotel.search(
+                query.get("location"), int(query.get("rooms", 1)),
+                _parse_date(check_in) if check_in else None,
+                _parse_date(check_out) if check_out else None)
+            return 200, [_hotel_dict(hotel) for hotel in hotels]
+        if item is None and method == "POST":
+            body = self._body()
+            hotel = Hotel.create_hotel(body["name"], body["location"],
+                                       int(body["total_rooms"]))
+            return 201, _hotel_dict(hotel)
+        if item is None:
+            return 405, {"error": "Método no permitido"}
+        if method == "GET":
+            return _get_record(Hotel.repository(), item)
+        if method == "PATCH":
+            body = self._body()
+            if not Hotel.modify_hotel_information(
+                    int(item), body.get("name"), body.get("location"),
+                    body.get("total_rooms")):
+                return 409, {"error": "No se pudo modificar"}
+            return _get_record(Hotel.repository(), item)
+        if method == "DELETE":
+            if not Hotel.delete_hotel(int(item), query.get("on_delete")):
+                return 409, {"error": "No se pudo eliminar"}
+            return 200, {"deleted": True}
+        return 405, {"error": "Método no permitido"}
+
+    def _customers(self, method, item, query) -> Tuple[int, object]:
+        # pylint: disable=too-many-return-statements
+        if item is None and method == "GET":
+            customer = Customer.find_by_email(query["email"])
+            if customer is None:
+                return 404, {"error": "No existe"}
+            return 200, _customer_dict(customer)
+        if item is None and method == "POST":
+            body = self._body()
+            customer = Customer.create_customer(body["name"], body["email"])
+            if customer is None:
+                return 409, {"error": "El correo ya está registrado"}
+            return 201, _customer_dict(customer)
+        if item is None:
+            return 405, {"error": "Método no permitido"}
+        if method == "GET":
+            return _get_record(Customer.repository(), item)
+        if method == "PATCH":
+            body = self._body()
+            if not Customer.modify_customer_information(
+                    int(item), body.get("name"), body.get("email")):
+                return 409, {"error": "No se pudo modificar"}
+            return _get_record(Customer.repository(), item)
+        if method == "DELETE":
+            if not Customer.delete_customer(int(item),
+                                            query.get("on_delete")):
+                return 409, {"error": "No se pudo eliminar"}
+            return 200, {"deleted": True}
+        return 405, {"error": "Método no permitido"}
+
+    def _reservations(self, method, item, query) -> Tuple[int, object]:
+        # pylint: disable=too-many-return-statements
+        if item is None and method == "GET":
+            if "customer_id" in query:
+                found = Reservation.for_customer(int(query["customer_id"]))
+            else:
+                found = Reservation.for_hotel(int(query["hotel_id"]))
+            return 200, [_reservation_dict(res) for res in found]
+        if item is None and method == "POST":
+            body = self._body()
+            reservation = Reservation.create_reservation(
+                int(body["customer_id"]), int(body["hotel_id"]),
+                _parse_date(body["check_in"]),
+                _parse_date(body["check_out"]))
+            if reservation is None:
+                return 409, {"error": "No se pudo reservar"}
+            return 201, _reservation_dict(reservation)
+        if item == "batch" and method == "POST":
+            body = self._body()
+            requests = [(int(req["customer_id"]), int(req["hotel_id"]),
+                         _parse_date(req["check_in"]),
+                         _parse_date(req["check_out"]))
+                        for req in body["requests"]]
+            results = Reservation.create_reservations(
+                requests, bool(body.get("atomic", True)))
+            return 200, [None if res is None else _reservation_dict(res)
+                         for res in results]
+        if item is None or not item.isdigit():
+            return 405, {"error": "Método no permitido"}
+        if method == "GET":
+            return _get_record(Reservation.repository(), item)
+        if method == "DELETE":
+            if not Reservation.cancel_reservation(int(item)):
+                return 409, {"error": "No se pudo cancelar"}
+            return 200, {"canceled": True}
+        return 405, {"error": "Método no permitido"}
+
+    do_GET = do_POST = do_PATCH = do_DELETE = _dispatch
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """
+        No escribe una línea por solicitud en la consola.
+        """
+
+
+def create_server(port: int = DEFAULT_PORT, workers: int = 16,
+                  host: str = "127.0.0.1") -> PooledHTTPServer:
+    """
+    Crea el servidor sin iniciarlo (port=0 elige un puerto libre).
+    """
+    return PooledHTTPServer((host, port), BookingHandler, workers)
+
+
+def main(argv: Optional[list] = None) -> None:
+    """
+    Inicia el servidor hasta que se interrumpa con Ctrl+C.
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--backend", default="json",
+                        help="json, wal, sqlite o binary")
+    parser.add_argument("--flush-interval", type=float, default=0.0,
+                        help="Segundos entre escrituras (0: inmediata)")
+    parser.add_argument("--log-level", default="WARNING",
+                        help="Nivel mínimo de los eventos en stderr")
+    args = parser.parse_args(argv)
+    configure_logging(args.log_level.upper())
+
+    if args.backend == "sqlite":
+        import sqlite_storage  # noqa: F401 pylint: disable=C0415,W0611
+    elif args.backend == "binary":
+        import codec  # noqa: F401 pylint: disable=C0415,W0611
+    session = Session(backend=BACKENDS[args.backend],
+                      flush_interval=args.flush_interval)
+    set_session(session)
+
+    server = create_server(args.port, args.workers)
+    print(f"Servidor de reservaciones en http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        session.close()
+
+
+if __name__ == "__main__":
+    main()
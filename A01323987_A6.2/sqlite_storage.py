@@ -0,0 +1,556 @@
+"""
+Backend de almacenamiento en SQLite para Hotel, Customer y Reservation.
+
+Cada almacén vive en una base de datos junto a su archivo JSON
+(hotels.json -> hotels.db) con una tabla que guarda el registro
+completo en una columna JSON y, aparte, las columnas por las que se
+busca, con índices. Las búsquedas de los índices secundarios
+(secondary_index) sobre esas columnas se resuelven con consultas a los
+índices de la base en lugar de índices en memoria. Las bases se abren
+en modo WAL y las conexiones se reutilizan desde un pool.
+
+Uso como herramienta de migración:
+    python sqlite_storage.py migrate hotels.json customers.json \
+reservations.json
+
+Si un archivo no tiene el nombre por defecto se indica su almacén con
+almacen=ruta (por ejemplo hotels=respaldo.json).
+"""
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+from indexes import normalize_text
+from storage import BACKENDS, Savepoints, convert_stores
+
+# Columnas de búsqueda de cada almacén, además de id y data
+COLUMNS = {
+    "hotels": ("name", "location", "total_rooms", "booked_rooms"),
+    "customers": ("name", "email"),
+    "reservations": ("customer_id", "hotel_id", "check_in", "check_out",
+                     "is_active"),
+}
+
+# Índices secundarios de cada almacén: (columna, normalizada). Los de
+# columnas normalizadas indexan normalize_text(columna), como los
+# índices en memoria que buscan sin importar mayúsculas
+INDEXES = {
+    "hotels": (("location", True),),
+    "customers": (("email", True),),
+    "reservations": (("hotel_id", False), ("customer_id", False)),
+}
+
+# Nombre del almacén según el archivo JSON por defecto
+STORE_NAMES = {
+    "hotels.json": "hotels",
+    "customers.json": "customers",
+    "reservations.json": "reservations",
+    "reservations.json.stats": "occupancy",
+}
+
+
+def database_path(path: str) -> str:
+    """
+    Devuelve la ruta de la base de datos que corresponde a un archivo
+    JSON de almacén.
+    """
+    return os.path.splitext(path)[0] + ".db"
+
+
+class ConnectionPool:
+    """
+    Conjunto de conexiones abiertas a una base de datos que los hilos
+    toman y devuelven, en lugar de abrir una conexión por operación.
+    """
+
+    def __init__(self, db_path: str, size: int = 4):
+        self.db_path = db_path
+        self._connections: queue.Queue = queue.Queue()
+        for _ in range(size):
+            self._connections.put(self._connect())
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.db_path, timeout=30,
+                                     check_same_thread=False,
+                                     isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        # Función de los índices de columnas normalizadas
+        connection.create_function("normalize_text", 1, normalize_text,
+                                   deterministic=True)
+        return connection
+
+    @contextmanager
+    def connection(self):
+        """
+        Presta una conexión del pool mientras dura el bloque with.
+        """
+        connection = self._connections.get()
+        try:
+            yield connection
+        finally:
+            self._connections.put(connection)
+
+    def close(self) -> None:
+        """
+        Cierra todas las conexiones que están en el pool.
+        """
+        while True:
+            try:
+                self._connections.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """
+    Devuelve el pool compartido de una base de datos.
+    """
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = ConnectionPool(db_path)
+            _pools[db_path] = pool
+        return pool
+
+
+def close_pools() -> None:
+    """
+    Cierra las conexiones de todos los pools abiertos.
+    """
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+# Estado de JsonRepository más la conexión, el pool y las sentencias
+class SqliteRepository(Savepoints):  # pylint: disable=R0902
+    """
+    Repositorio con la misma interfaz que JsonRepository respaldado por
+    una tabla de SQLite. Los cambios se acumulan en memoria hasta
+    flush(), que los escribe en una sola transacción. Las sentencias
+    SQL se arman una vez por repositorio, así que sqlite3 las reutiliza
+    ya preparadas desde su caché de sentencias.
+
+    Atributos:
+        name (str): Nombre lógico del almacén, que es también la tabla.
+        path (str): Ruta del archivo JSON del almacén.
+        db_path (str): Ruta de la base de datos.
+        indexed_fields (tuple): Campos que lookup_keys() resuelve con un
+                                índice de la base.
+    """
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self.db_path = database_path(path)
+        self.columns = COLUMNS.get(name, ())
+        self._indexes = dict(INDEXES.get(name, ()))
+        self.indexed_fields = tuple(self._indexes)
+        self._pending: Dict[str, Optional[dict]] = {}
+        # Por cada transacción abierta, el cambio pendiente que tenía cada
+        # clave antes de ella: {clave: (estaba pendiente, copia o None)}
+        self._savepoints: List[Dict[str, Tuple[bool, Optional[dict]]]] = []
+        self._lock = threading.RLock()
+        self._pool = get_pool(self.db_path)
+        self._generation = 0
+        self._listeners: List[Callable] = []
+        # Conexión propia para PRAGMA data_version, que cambia cuando
+        # cualquier otra conexión confirma cambios en la base
+        self._version_connection = sqlite3.connect(
+            self.db_path, check_same_thread=False)
+        self._known_version = self._data_version()
+
+        column_list = "".join(f", {column}" for column in self.columns)
+        placeholders = ", ?" * len(self.columns)
+        # Sentencias de la tabla por operación
+        self._sql = {
+            "get": f"SELECT data FROM {name} WHERE id = ?",
+            "all": f"SELECT id, data FROM {name}",
+            "keys": f"SELECT id FROM {name}",
+            "count": f"SELECT COUNT(*) FROM {name}",
+            "put": (f"INSERT OR REPLACE INTO {name} "
+                    f"(id{column_list}, data) VALUES (?{placeholders}, ?)"),
+            "delete": f"DELETE FROM {name} WHERE id = ?",
+            "max_id": (f"SELECT MAX(CAST(id AS INTEGER)) FROM {name} "
+                       f"WHERE id GLOB '[0-9]*'"),
+        }
+        self._create_schema()
+
+    def _create_schema(self) -> None:
+        column_defs = "".join(f", {column}" for column in self.columns)
+        with self._pool.connection() as connection:
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.name} "
+                f"(id TEXT PRIMARY KEY{column_defs}, data TEXT NOT NULL)")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sequences "
+                "(name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            for column in self.indexed_fields:
+                connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS "
+                    f"{self._index_name(column)} "
+                    f"ON {self.name} ({self._index_expression(column)})")
+
+    def _index_name(self, column: str) -> str:
+        suffix = "_normalized" if self._indexes[column] else ""
+        return f"idx_{self.name}_{column}{suffix}"
+
+    def _index_expression(self, column: str) -> str:
+        if self._indexes[column]:
+            return f"normalize_text({column})"
+        return column
+
+    def _data_version(self) -> int:
+        return self._version_connection.execute(
+            "PRAGMA data_version").fetchone()[0]
+
+    @property
+    def generation(self) -> int:
+        """
+        Número que cambia cuando la base fue modificada por una conexión
+        ajena a este repositorio (otro proceso) o cuando el contenido se
+        reemplaza completo.
+        """
+        with self._lock:
+            version = self._data_version()
+            if version != self._known_version:
+                self._known_version = version
+                self._generation += 1
+            return self._generation
+
+    def _row(self, key: str, record: dict) -> tuple:
+        return ((key,) + tuple(record.get(column) for column in self.columns)
+                + (json.dumps(record, separators=(",", ":")),))
+
+    def _remember(self, key: str) -> None:
+        """
+        Guarda, la primera vez dentro de la transacción en curso, el
+        cambio pendiente que tenía la clave, como en JsonRepository.
+        """
+        changes = self._savepoints[-1]
+        if key not in changes:
+            pending = self._pending.get(key)
+            changes[key] = (key in self._pending,
+                            None if pending is None else dict(pending))
+
+    def rollback_savepoint(self) -> None:
+        """
+        Deshace los cambios pendientes hechos desde el último punto de
+        restauración y lo cierra.
+        """
+        with self._lock:
+            changes = self._savepoints.pop()
+            for key, (was_pending, previous) in changes.items():
+                if was_pending:
+                    self._pending[key] = previous
+                else:
+                    self._pending.pop(key, None)
+            if changes:
+                self._generation += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Devuelve el registro con la clave dada, o None si no existe.
+        """
+        if key in self._pending:
+            if self._savepoints:
+                with self._lock:
+                    self._remember(key)
+            return self._pending[key]
+        with self._pool.connection() as connection:
+            row = connection.execute(self._sql["get"], (key,)).fetchone()
+        return None if row is None else json.loads(row[0])
+
+    def add_listener(self, callback: Callable) -> None:
+        """
+        Registra una función callback(key, old, new) que se llama en cada
+        put() o delete(), como en JsonRepository.
+        """
+        self._listeners.append(callback)
+
+    def put(self, key: str, record: dict) -> None:
+        """
+        Inserta o reemplaza un registro y lo marca como pendiente.
+        """
+        with self._lock:
+            if self._savepoints:
+                self._remember(key)
+            old = self.get(key) if self._listeners else None
+            self._pending[key] = record
+            for callback in self._listeners:
+                callback(key, old, record)
+
+    def delete(self, key: str) -> bool:
+        """
+        Elimina un registro. Devuelve False si no existía.
+        """
+        with self._lock:
+            old = self.get(key)
+            if old is None:
+                return False
+            if self._savepoints:
+                self._remember(key)
+            self._pending[key] = None
+            for callback in self._listeners:
+                callback(key, old, None)
+            return True
+
+    def replace_all(self, data: Dict[str, dict]) -> None:
+        """
+        Reemplaza el contenido completo del almacén.
+        """
+        with self._lock:
+            for key in self.keys():
+                if self._savepoints:
+                    self._remember(key)
+                self._pending[key] = None
+            for key in data:
+                if self._savepoints:
+                    self._remember(key)
+            self._pending.update(data)
+            self._generation += 1
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Itera sobre los pares (clave, registro).
+        """
+        with self._pool.connection() as connection:
+            rows = connection.execute(self._sql["all"]).fetchall()
+        pending = dict(self._pending)
+        for key, data in rows:
+            if key not in pending:
+                yield key, json.loads(data)
+        for key, record in pending.items():
+            if record is not None:
+                yield key, record
+
+    def keys(self) -> Iterator[str]:
+        """
+        Itera sobre las claves de los registros.
+        """
+        with self._pool.connection() as connection:
+            stored = [row[0] for row in
+                      connection.execute(self._sql["keys"]).fetchall()]
+        pending = dict(self._pending)
+        keys = [key for key in stored if key not in pending]
+        keys.extend(key for key, record in pending.items()
+                    if record is not None)
+        return iter(keys)
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Devuelve una copia de todos los registros.
+        """
+        return dict(self.items())
+
+    def find(self, column: str, value) -> List[dict]:
+        """
+        Devuelve los registros cuyo valor en una columna indexada es
+        value, incluidos los cambios pendientes.
+        """
+        if column not in self.columns:
+            raise ValueError(f"Columna sin índice: {column}")
+        with self._pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT id, data FROM {self.name} WHERE {column} = ?",
+                (value,)).fetchall()
+        pending = dict(self._pending)
+        found = [json.loads(data) for key, data in rows
+                 if key not in pending]
+        found.extend(record for record in pending.values()
+                     if record is not None and record.get(column) == value)
+        return found
+
+    def lookup_keys(self, field: str, value) -> Set[str]:
+        """
+        Devuelve las claves de los registros cuyo campo vale value
+        (comparado con normalize_text si el índice es normalizado),
+        incluidos los cambios pendientes. La consulta usa el índice de
+        la base, así que no depende de lo que otros procesos escriban.
+        """
+        normalized = self._indexes.get(field)
+        if normalized is None:
+            raise ValueError(f"Columna sin índice: {field}")
+        if normalized and value is not None:
+            value = normalize_text(value)
+        with self._pool.connection() as connection:
+            rows = connection.execute(
+                f"SELECT id FROM {self.name} "
+                f"WHERE {self._index_expression(field)} = ?",
+                (value,)).fetchall()
+        pending = dict(self._pending)
+        keys = {key for (key,) in rows if key not in pending}
+        for key, record in pending.items():
+            if record is None or record.get(field) is None:
+                continue
+            current = record[field]
+            if normalized:
+                current = normalize_text(current)
+            if current == value:
+                keys.add(key)
+        return keys
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key) is not None
+
+    def __len__(self) -> int:
+        with self._pool.connection() as connection:
+            count = connection.execute(self._sql["count"]).fetchone()[0]
+            for key, record in dict(self._pending).items():
+                stored = connection.execute(self._sql["get"],
+                                            (key,)).fetchone() is not None
+                count += (record is not None) - stored
+        return count
+
+    def next_id(self) -> int:
+        """
+        Entrega el siguiente ID numérico del almacén desde la tabla
+        sequences, en una transacción propia que serializa a los
+        procesos que crean registros al mismo tiempo.
+        """
+        with self._lock, self._pool.connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = connection.execute(
+                    "SELECT value FROM sequences WHERE name = ?",
+                    (self.name,)).fetchone()
+                if row is not None:
+                    value = row[0]
+                else:
+                    value = connection.execute(
+                        self._sql["max_id"]).fetchone()[0] or 0
+                value += 1
+                while (str(value) in self._pending or connection.execute(
+                        self._sql["get"], (str(value),)).fetchone()):
+                    value += 1
+                connection.execute(
+                    "INSERT OR REPLACE INTO sequences (name, value) "
+                    "VALUES (?, ?)", (self.name, value))
+            except sqlite3.Error:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+            # Avanzar el contador no cambia los registros del almacén
+            self._known_version = self._data_version()
+        return value
+
+    def advance_sequence(self, value: int) -> None:
+        """
+        Garantiza que el contador de IDs sea al menos value.
+        """
+        with self._lock, self._pool.connection() as connection:
+            connection.execute(
+                "INSERT INTO sequences (name, value) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET "
+                "value = MAX(value, excluded.value)", (self.name, value))
+            self._known_version = self._data_version()
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Indica si hay cambios que aún no se escriben en la base.
+        """
+        return bool(self._pending)
+
+    def flush(self) -> None:
+        """
+        Escribe los cambios pendientes en una sola transacción.
+        """
+        with self._lock:
+            if not self._pending:
+                return
+            puts = [self._row(key, record)
+                    for key, record in self._pending.items()
+                    if record is not None]
+            deletes = [(key,) for key, record in self._pending.items()
+                       if record is None]
+            with self._pool.connection() as connection:
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    connection.executemany(self._sql["delete"], deletes)
+                    connection.executemany(self._sql["put"], puts)
+                except sqlite3.Error:
+                    connection.execute("ROLLBACK")
+                    raise
+                connection.execute("COMMIT")
+            self._pending = {}
+            # El cambio propio no debe verse como una modificación ajena
+            self._known_version = self._data_version()
+
+    def refresh(self) -> None:
+        """
+        Las lecturas siempre van a la base, así que ven los cambios de
+        otros procesos sin hacer nada.
+        """
+
+    def reload(self) -> None:
+        """
+        Descarta los cambios pendientes.
+        """
+        with self._lock:
+            self._pending = {}
+            self._savepoints = [{} for _ in self._savepoints]
+            self._generation += 1
+
+    def close(self) -> None:
+        """
+        Las conexiones pertenecen al pool compartido; no hay nada que
+        cerrar por repositorio.
+        """
+
+
+BACKENDS["sqlite"] = SqliteRepository
+
+
+def migrate_json(path: str, name: Optional[str] = None) -> int:
+    """
+    Importa un archivo JSON de almacén ({id: registro}) a su base de
+    datos SQLite y devuelve cuántos registros se importaron.
+    """
+    if name is None:
+        name = STORE_NAMES.get(os.path.basename(path))
+    if name is None:
+        raise ValueError(f"No se reconoce el almacén de {path}")
+    with open(path, 'r', encoding='utf-8') as store_file:
+        records: Dict[str, dict] = json.load(store_file)
+    repo = SqliteRepository(name, path)
+    for key, record in records.items():
+        repo.put(key, record)
+    repo.flush()
+
+    # El contador continúa donde se quedó el del archivo JSON, para no
+    # reutilizar IDs de registros que ya se habían eliminado
+    last_id = max((int(key) for key in records if key.isdigit()),
+                  default=0)
+    if os.path.exists(f"{path}.seq"):
+        with open(f"{path}.seq", 'r', encoding='utf-8') as seq_file:
+            last_id = max(last_id, int(seq_file.read().strip() or 0))
+    repo.advance_sequence(last_id)
+    return len(records)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Herramienta de línea de comandos para migrar los archivos JSON.
+    """
+    args = sys.argv[1:] if argv is None else argv
+    if len(args) < 2 or args[0] != "migrate":
+        print("Uso: python sqlite_storage.py migrate "
+              "hotels.json [customers.json reservations.json]")
+        return
+    convert_stores(args[1:], migrate_json, database_path, "migrar")
+
+
+if __name__ == "__main__":
+    main()
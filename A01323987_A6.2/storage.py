@@ -0,0 +1,941 @@
+"""
+Capa de repositorio para el sistema de reservaciones.
+
+Cada almacén (hoteles, clientes, reservaciones) se carga una sola vez
+en memoria, las lecturas se sirven desde ahí y las modificaciones se
+marcan como pendientes. Una sesión (Session) agrupa los repositorios
+abiertos y decide cuándo escribir los cambios al disco: en cada
+operación, solo al hacer commit() o cada cierto intervalo.
+
+Los repositorios se comparten en todo el proceso: dos sesiones que
+abren el mismo archivo con el mismo backend usan la misma copia en
+memoria, por lo que nunca se pisan entre sí. Entre procesos, las
+operaciones de lectura-modificación-escritura se hacen dentro de
+Session.transaction(), que bloquea los archivos involucrados, relee
+lo que otro proceso haya cambiado y escribe antes de liberarlos.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+    msvcrt = None  # pylint: disable=invalid-name
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+class Savepoints:
+    """
+    Puntos de restauración anidados de un repositorio, uno por
+    transacción abierta. La subclase define _lock, la pila _savepoints
+    ({clave: estado previo} por punto) y rollback_savepoint(), que sabe
+    cómo restaurar ese estado.
+    """
+
+    _lock: threading.RLock
+    _savepoints: List[dict]
+
+    def savepoint(self) -> None:
+        """
+        Abre un punto de restauración: a partir de aquí se registra el
+        estado previo de los registros que se leen o modifican.
+        """
+        with self._lock:
+            self._savepoints.append({})
+
+    def release_savepoint(self) -> None:
+        """
+        Cierra el último punto de restauración conservando sus cambios;
+        si hay uno exterior, este hereda lo registrado para poder
+        deshacerlo.
+        """
+        with self._lock:
+            changes = self._savepoints.pop()
+            if self._savepoints:
+                outer = self._savepoints[-1]
+                for key, previous in changes.items():
+                    outer.setdefault(key, previous)
+
+
+# Estado del almacén en memoria, del archivo y de las transacciones
+class JsonRepository(Savepoints):  # pylint: disable=R0902
+    """
+    Repositorio respaldado por un archivo JSON con la forma
+    {id: registro}. El archivo se lee la primera vez que se usa y se
+    reescribe completo (de forma atómica) al hacer flush().
+
+    Atributos:
+        name (str): Nombre lógico del almacén ("hotels", ...).
+        path (str): Ruta del archivo JSON.
+        indexed_fields (tuple): Campos que el repositorio busca por sí
+                                mismo con lookup_keys(); este no tiene
+                                ninguno y se usan índices en memoria.
+    """
+
+    indexed_fields: Tuple[str, ...] = ()
+
+    def __init__(self, name: str, path: str):
+        self.name = name
+        self.path = path
+        self._records: Optional[Dict[str, dict]] = None
+        self._dirty: Set[str] = set()
+        self._disk_signature = None
+        self._generation = 0
+        self._listeners: List[Callable] = []
+        self._sequence: Optional[SequenceFile] = None
+        # Por cada transacción abierta, el estado previo de los registros
+        # que leyó o modificó: {clave: (copia o None, estaba pendiente)}
+        self._savepoints: List[Dict[str, Tuple[Optional[dict], bool]]] = []
+        self._lock = threading.RLock()
+
+    def _load(self) -> Dict[str, dict]:
+        """
+        Devuelve los registros en memoria, leyéndolos del disco
+        la primera vez.
+        """
+        if self._records is None:
+            with self._lock:
+                if self._records is None:
+                    self._disk_signature = self._signature()
+                    self._records = self._read()
+                    self._generation += 1
+        return self._records
+
+    @property
+    def generation(self) -> int:
+        """
+        Número que cambia cada vez que el contenido se vuelve a leer del
+        disco o se reemplaza completo, es decir, cuando cambió por algo
+        distinto de put() o delete() en este proceso. Los índices
+        derivados lo usan para saber cuándo reconstruirse.
+        """
+        self._load()
+        return self._generation
+
+    def _signature(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Identifica la versión del archivo en disco (fecha de
+        modificación, tamaño e inodo), o None si no existe.
+        """
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    def _read(self) -> Dict[str, dict]:
+        """
+        Lee el archivo completo; un archivo inexistente es un almacén
+        vacío.
+        """
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as store_file:
+            return json.load(store_file)
+
+    def _write(self, records: Dict[str, dict], changed: Set[str]) -> None:
+        """
+        Escribe los registros al disco. El archivo JSON no admite
+        escrituras parciales, así que se reescribe completo en un
+        archivo temporal que luego reemplaza al original.
+        """
+        del changed  # El formato JSON siempre se reescribe completo
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as store_file:
+            # dumps usa el codificador en C; dump() escribe por partes
+            # con el codificador en Python, varias veces más lento
+            store_file.write(json.dumps(records, separators=(",", ":")))
+            store_file.flush()
+            os.fsync(store_file.fileno())
+        os.replace(tmp_path, self.path)
+
+    def add_listener(self, callback: Callable) -> None:
+        """
+        Registra una función callback(key, old, new) que se llama en cada
+        put() o delete() con el registro anterior y el nuevo (None si no
+        existe). Los cambios que llegan del disco no se notifican; para
+        eso está generation.
+        """
+        self._listeners.append(callback)
+
+    def _notify(self, key: str, old: Optional[dict],
+                new: Optional[dict]) -> None:
+        for callback in self._listeners:
+            callback(key, old, new)
+
+    def _remember(self, key: str) -> None:
+        """
+        Guarda una copia del registro la primera vez que la transacción
+        en curso lo lee o lo modifica, para poder deshacer solo lo que
+        ella cambió. Se copia al leerlo porque quien lo lee puede
+        modificar el diccionario antes de llamar a put().
+        """
+        changes = self._savepoints[-1]
+        if key not in changes:
+            record = self._load().get(key)
+            changes[key] = (None if record is None else dict(record),
+                            key in self._dirty)
+
+    def rollback_savepoint(self) -> None:
+        """
+        Deshace los cambios hechos desde el último punto de
+        restauración y lo cierra. Los demás cambios pendientes se
+        conservan.
+        """
+        with self._lock:
+            changes = self._savepoints.pop()
+            records = self._load()
+            restored = False
+            for key, (previous, was_dirty) in changes.items():
+                if records.get(key) != previous:
+                    restored = True
+                if previous is None:
+                    records.pop(key, None)
+                else:
+                    records[key] = previous
+                if not was_dirty:
+                    self._dirty.discard(key)
+            if restored:
+                # Los índices derivados se reconstruyen
+                self._generation += 1
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Devuelve el registro con la clave dada, o None si no existe.
+        """
+        if self._savepoints:
+            with self._lock:
+                if self._savepoints:
+                    self._remember(key)
+        return self._load().get(key)
+
+    def put(self, key: str, record: dict) -> None:
+        """
+        Inserta o reemplaza un registro y lo marca como pendiente.
+        """
+        with self._lock:
+            if self._savepoints:
+                self._remember(key)
+            records = self._load()
+            old = records.get(key)
+            records[key] = record
+            self._dirty.add(key)
+            self._notify(key, old, record)
+
+    def delete(self, key: str) -> bool:
+        """
+        Elimina un registro. Devuelve False si no existía.
+        """
+        with self._lock:
+            if self._savepoints:
+                self._remember(key)
+            records = self._load()
+            if key not in records:
+                return False
+            old = records.pop(key)
+            self._dirty.add(key)
+            self._notify(key, old, None)
+            return True
+
+    def replace_all(self, data: Dict[str, dict]) -> None:
+        """
+        Reemplaza el contenido completo del almacén.
+        """
+        with self._lock:
+            records = self._load()
+            if self._savepoints:
+                for key in set(records) | set(data):
+                    self._remember(key)
+            self._dirty.update(records.keys())
+            self._dirty.update(data.keys())
+            self._records = dict(data)
+            self._generation += 1
+
+    def snapshot(self) -> Dict[str, dict]:
+        """
+        Devuelve una copia de todos los registros, que el llamador
+        puede modificar sin afectar al repositorio.
+        """
+        return {key: dict(record) for key, record in self._load().items()}
+
+    def keys(self) -> Iterator[str]:
+        """
+        Itera sobre las claves de los registros.
+        """
+        return iter(list(self._load().keys()))
+
+    def items(self) -> Iterator[Tuple[str, dict]]:
+        """
+        Itera sobre los pares (clave, registro).
+        """
+        return iter(list(self._load().items()))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._load()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def _max_id(self) -> int:
+        return max((int(key) for key in self._load() if key.isdigit()),
+                   default=0)
+
+    def next_id(self) -> int:
+        """
+        Entrega el siguiente ID numérico del almacén. Sale de un contador
+        persistente (<path>.seq) que solo avanza, así que el costo no
+        depende del tamaño del almacén y no se reutilizan los IDs de
+        registros eliminados. Toma el candado del almacén, por lo que
+        es seguro entre hilos y procesos.
+        """
+        with store_lock(self.path):
+            with self._lock:
+                if self._sequence is None:
+                    self._sequence = SequenceFile(f"{self.path}.seq")
+                return self._sequence.next_value(
+                    self._max_id, lambda value: str(value) in self)
+
+    def advance_sequence(self, value: int) -> None:
+        """
+        Garantiza que el contador de IDs sea al menos value.
+        """
+        with store_lock(self.path):
+            with self._lock:
+                if self._sequence is None:
+                    self._sequence = SequenceFile(f"{self.path}.seq")
+                self._sequence.advance(value, self._max_id)
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Indica si hay cambios que aún no se escriben al disco.
+        """
+        return bool(self._dirty)
+
+    def flush(self) -> None:
+        """
+        Escribe los cambios pendientes al disco.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+            self._write(self._load(), self._dirty)
+            self._dirty = set()
+            self._disk_signature = self._signature()
+
+    def refresh(self) -> None:
+        """
+        Vuelve a leer el disco si otro proceso lo modificó desde la
+        última lectura o escritura. No hace nada si hay cambios
+        pendientes, para no perderlos.
+        """
+        with self._lock:
+            if self._records is None or self._dirty:
+                return
+            if self._signature() != self._disk_signature:
+                self._records = None
+
+    def reload(self) -> None:
+        """
+        Descarta lo que hay en memoria (incluidos los cambios pendientes)
+        para volver a leer el disco en el siguiente acceso.
+        """
+        with self._lock:
+            self._records = None
+            self._dirty = set()
+            self._savepoints = [{} for _ in self._savepoints]
+
+    def close(self) -> None:
+        """
+        Libera los recursos abiertos por el repositorio.
+        """
+
+
+# Además del estado de JsonRepository, el de la bitácora abierta
+class WalRepository(JsonRepository):  # pylint: disable=R0902
+    """
+    Repositorio con bitácora de escritura anticipada (write-ahead log).
+    Cada cambio se agrega como una línea JSON al archivo <path>.wal en
+    lugar de reescribir el documento completo, por lo que una
+    modificación cuesta O(1) de E/S. Al cargar se lee la última
+    instantánea (el mismo archivo JSON de siempre) y se reaplica la
+    bitácora; una línea incompleta por una caída a mitad de escritura
+    se descarta. Cuando la bitácora crece más que compact_threshold se
+    compacta en una nueva instantánea.
+
+    Atributos:
+        log_path (str): Ruta de la bitácora.
+        compact_threshold (int): Cambios en la bitácora que disparan la
+                                 compactación.
+        sync_interval (float): Segundos mínimos entre dos fsync de la
+            bitácora; 0 sincroniza en cada flush(). Con un valor mayor,
+            lo escrito en ese lapso sobrevive a la caída del proceso
+            pero no necesariamente a un corte de energía.
+    """
+
+    def __init__(self, name: str, path: str, compact_threshold: int = 1000,
+                 sync_interval: float = 0.0):
+        super().__init__(name, path)
+        self.log_path = f"{path}.wal"
+        self.compact_threshold = compact_threshold
+        self.sync_interval = sync_interval
+        self._log_entries = 0
+        self._log_offset = 0
+        self._log_file = None
+        self._last_sync = 0.0
+
+    def _read(self) -> Dict[str, dict]:
+        """
+        Lee la instantánea y reaplica los cambios de la bitácora.
+        """
+        records = super()._read()
+        self._log_entries = 0
+        self._log_offset = 0
+        self._replay(records)
+        return records
+
+    def _replay(self, records: Dict[str, dict]) -> None:
+        """
+        Aplica las líneas completas de la bitácora a partir de la última
+        posición leída. Una línea incompleta (caída a mitad de escritura)
+        se ignora y se descarta en la siguiente escritura.
+        """
+        if not os.path.exists(self.log_path):
+            return
+        with open(self.log_path, 'rb') as log_file:
+            log_file.seek(self._log_offset)
+            for line in log_file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry["op"] == "put":
+                    records[entry["key"]] = entry["value"]
+                else:
+                    records.pop(entry["key"], None)
+                self._log_offset += len(line)
+                self._log_entries += 1
+
+    def refresh(self) -> None:
+        """
+        Aplica solo las líneas que otro proceso agregó a la bitácora; si
+        la instantánea cambió (compactación), vuelve a leer todo.
+        """
+        with self._lock:
+            if self._records is None or self._dirty:
+                return
+            try:
+                log_size = os.path.getsize(self.log_path)
+            except FileNotFoundError:
+                log_size = 0
+            if (self._signature() != self._disk_signature
+                    or log_size < self._log_offset):
+                self._records = None
+            elif log_size > self._log_offset:
+                self._replay(self._records)
+                self._generation += 1
+
+    def _write(self, records: Dict[str, dict], changed: Set[str]) -> None:
+        """
+        Agrega a la bitácora una línea por registro modificado.
+        """
+        if self._log_entries + len(changed) > self.compact_threshold:
+            self._compact(records)
+            return
+        lines = []
+        for key in changed:
+            record = records.get(key)
+            if record is None:
+                entry = {"op": "del", "key": key}
+            else:
+                entry = {"op": "put", "key": key, "value": record}
+            lines.append(json.dumps(entry, separators=(",", ":")) + "\n")
+        if self._log_file is None:
+            self._log_file = open(  # pylint: disable=consider-using-with
+                self.log_path, 'a', encoding='utf-8')
+        if os.path.getsize(self.log_path) > self._log_offset:
+            # Se descarta el final incompleto de una escritura anterior
+            self._log_file.truncate(self._log_offset)
+        self._log_file.write("".join(lines))
+        self._log_file.flush()
+        self._log_offset = self._log_file.tell()
+        self._log_entries += len(lines)
+        now = time.monotonic()
+        if now - self._last_sync >= self.sync_interval:
+            os.fsync(self._log_file.fileno())
+            self._last_sync = now
+
+    def _compact(self, records: Dict[str, dict]) -> None:
+        """
+        Escribe una instantánea con todos los registros y vacía la
+        bitácora. Si el proceso cae entre ambos pasos, reaplicar la
+        bitácora sobre la nueva instantánea da el mismo resultado.
+        """
+        super()._write(records, set())
+        self.close()
+        with open(self.log_path, 'w', encoding='utf-8'):
+            pass
+        self._log_entries = 0
+        self._log_offset = 0
+
+    def compact(self) -> None:
+        """
+        Compacta la bitácora en una instantánea.
+        """
+        with self._lock:
+            self._compact(self._load())
+            self._dirty = set()
+            self._disk_signature = self._signature()
+
+    def close(self) -> None:
+        """
+        Sincroniza y cierra la bitácora.
+        """
+        with self._lock:
+            if self._log_file is not None:
+                self._log_file.flush()
+                os.fsync(self._log_file.fileno())
+                self._log_file.close()
+                self._log_file = None
+
+
+# Backends disponibles por nombre
+BACKENDS = {
+    "json": JsonRepository,
+    "wal": WalRepository,
+}
+
+
+class StoreLock:
+    """
+    Candado exclusivo de un almacén, válido entre hilos del mismo
+    proceso y entre procesos (bloqueo del archivo <path>.lock). Es
+    reentrante para el hilo que lo tiene.
+    """
+
+    def __init__(self, path: str):
+        self.path = f"{path}.lock"
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def acquire(self) -> None:
+        """
+        Espera hasta obtener el candado.
+        """
+        self._thread_lock.acquire()  # pylint: disable=consider-using-with
+        self._depth += 1
+        if self._depth > 1:
+            return
+        try:
+            self._file = open(  # pylint: disable=consider-using-with
+                self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except OSError:
+            self._depth -= 1
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._thread_lock.release()
+            raise
+
+    def release(self) -> None:
+        """
+        Libera el candado.
+        """
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+    def __enter__(self) -> 'StoreLock':
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        self.release()
+
+
+_locks: Dict[str, StoreLock] = {}
+_locks_lock = threading.Lock()
+
+
+def store_lock(path: str) -> StoreLock:
+    """
+    Devuelve el candado compartido del proceso para un almacén.
+    """
+    with _locks_lock:
+        lock = _locks.get(path)
+        if lock is None:
+            lock = StoreLock(path)
+            _locks[path] = lock
+        return lock
+
+
+class SequenceFile:
+    """
+    Contador persistente guardado como texto en un archivo con el
+    último valor entregado. Debe usarse con el candado del almacén al
+    que pertenece; el valor se vuelve a leer solo si otro proceso
+    modificó el archivo.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._value: Optional[int] = None
+        self._signature = None
+
+    def _stat(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            info = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return info.st_mtime_ns, info.st_size, info.st_ino
+
+    def next_value(self, seed: Callable[[], int],
+                   in_use: Optional[Callable[[int], bool]] = None) -> int:
+        """
+        Avanza el contador y devuelve el nuevo valor. Si el archivo no
+        existe, el contador arranca en seed() (por ejemplo, el ID más
+        alto de un almacén creado antes de que existieran los
+        contadores). Los valores para los que in_use() es verdadero se
+        saltan, por si el almacén se reemplazó con IDs más altos.
+        """
+        value = self._current(seed) + 1
+        while in_use is not None and in_use(value):
+            value += 1
+        self._store(value)
+        return value
+
+    def advance(self, value: int, seed: Callable[[], int]) -> None:
+        """
+        Garantiza que el contador sea al menos value, por ejemplo
+        después de una carga masiva que asignó IDs en bloque.
+        """
+        if value > self._current(seed):
+            self._store(value)
+
+    def _current(self, seed: Callable[[], int]) -> int:
+        """
+        Último valor entregado; se relee solo si el archivo cambió.
+        """
+        signature = self._stat()
+        if self._value is None or signature != self._signature:
+            if signature is None:
+                self._value = seed()
+            else:
+                with open(self.path, 'r', encoding='utf-8') as seq_file:
+                    self._value = int(seq_file.read().strip() or 0)
+        return self._value
+
+    def _store(self, value: int) -> None:
+        """
+        Escribe el valor de forma atómica (temporal, fsync y rename).
+        """
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as seq_file:
+            seq_file.write(str(value))
+            seq_file.flush()
+            os.fsync(seq_file.fileno())
+        os.replace(tmp_path, self.path)
+        self._value = value
+        self._signature = self._stat()
+
+
+_registry: Dict[tuple, JsonRepository] = {}
+_registry_lock = threading.Lock()
+
+
+def open_repository(backend, name: str, path: str) -> JsonRepository:
+    """
+    Devuelve el repositorio compartido del proceso para (backend,
+    name, path), creándolo la primera vez.
+    """
+    key = (backend, name, path)
+    repo = _registry.get(key)
+    if repo is None:
+        with _registry_lock:
+            repo = _registry.get(key)
+            if repo is None:
+                repo = backend(name, path)
+                _registry[key] = repo
+    return repo
+
+
+def convert_stores(args: List[str],
+                   convert: Callable[[str, Optional[str]], int],
+                   target: Callable[[str], str], verb: str) -> None:
+    """
+    Pasa cada archivo JSON de almacén de args ('ruta' o
+    'almacén=ruta') por convert(ruta, almacén) e informa en pantalla
+    el archivo destino (target(ruta)) y cuántos registros se pasaron.
+    Las herramientas de migración de los backends la comparten.
+    """
+    for arg in args:
+        name, _, path = arg.rpartition("=")
+        if not os.path.exists(path):
+            print(f"El archivo no existe: {path}")
+            continue
+        try:
+            count = convert(path, name or None)
+        except (ValueError, json.JSONDecodeError) as error:
+            print(f"Error al {verb} {path}: {error}")
+            continue
+        print(f"{path} -> {target(path)}: {count} registros")
+
+
+class Session:
+    """
+    Agrupa los repositorios abiertos y controla cuándo se escriben.
+
+    Atributos:
+        backend: Clase (o fábrica) de repositorio que recibe
+                 (name, path).
+        flush_interval (float | None): 0 escribe después de cada
+            operación; None solo escribe con commit(); un valor
+            positivo escribe a más tardar esos segundos después del
+            primer cambio pendiente.
+    """
+
+    def __init__(self, backend=JsonRepository,
+                 flush_interval: Optional[float] = 0.0):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self._repositories: Dict[Tuple[str, str], JsonRepository] = {}
+        self._lock = threading.RLock()
+        self._timer: Optional[threading.Timer] = None
+        self._local = threading.local()
+
+    def repository(self, name: str, path: str) -> JsonRepository:
+        """
+        Devuelve el repositorio de un almacén, creándolo la primera vez.
+        """
+        key = (name, path)
+        repo = self._repositories.get(key)
+        if repo is None:
+            repo = open_repository(self.backend, name, path)
+            with self._lock:
+                self._repositories[key] = repo
+        return repo
+
+    @property
+    def write_through(self) -> bool:
+        """
+        Indica si la sesión escribe después de cada operación.
+        """
+        return self.flush_interval is not None and self.flush_interval <= 0
+
+    @contextmanager
+    def transaction(self, *repositories):
+        """
+        Ejecuta un bloque de forma atómica respecto de otros hilos y
+        procesos: bloquea los almacenes (siempre en el mismo orden para
+        evitar bloqueos mutuos), relee lo que otro proceso haya escrito
+        y, en una sesión de escritura inmediata, escribe los cambios
+        antes de liberar los candados. Si el bloque lanza una
+        excepción, se deshacen los cambios que hizo el bloque; los que
+        otras operaciones dejaron pendientes se conservan.
+
+        En sesiones diferidas (flush_interval None o positivo) los
+        cambios se escriben más tarde, por lo que la garantía entre
+        procesos supone un solo proceso escritor.
+        """
+        repositories = sorted(set(repositories), key=lambda r: r.path)
+        locks = [store_lock(repo.path) for repo in repositories]
+        acquired = []
+        depth = getattr(self._local, "depth", 0)
+        try:
+            for lock in locks:
+                lock.acquire()
+                acquired.append(lock)
+            for repo in repositories:
+                repo.refresh()
+            for repo in repositories:
+                repo.savepoint()
+            self._local.depth = depth + 1
+            try:
+                yield
+            except BaseException:
+                # Solo se deshace lo que hizo este bloque; los cambios
+                # pendientes de otras operaciones ya confirmadas se
+                # conservan
+                for repo in repositories:
+                    repo.rollback_savepoint()
+                raise
+            finally:
+                self._local.depth = depth
+            self._confirm(repositories, depth)
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def _confirm(self, repositories, depth: int) -> None:
+        """
+        Conserva los cambios de un bloque que terminó bien y, si no está
+        anidado en otra transacción, los escribe (o programa la
+        escritura) antes de que se liberen los candados.
+        """
+        for repo in repositories:
+            repo.release_savepoint()
+        if depth:
+            return
+        if self.write_through:
+            for repo in repositories:
+                repo.flush()
+        else:
+            self.touch()
+
+    def touch(self) -> None:
+        """
+        Avisa que hubo una modificación; escribe de inmediato o programa
+        la escritura según flush_interval. Dentro de una transacción la
+        escritura se deja para el final de la transacción.
+        """
+        if getattr(self._local, "depth", 0):
+            return
+        if self.flush_interval is None:
+            return
+        if self.flush_interval <= 0:
+            self.commit()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval,
+                                              self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_flush(self) -> None:
+        with self._lock:
+            self._timer = None
+        self.commit()
+
+    def commit(self) -> None:
+        """
+        Escribe al disco los cambios pendientes de todos los
+        repositorios. Toma los candados de los almacenes, en el mismo
+        orden que transaction(), para no escribir a la mitad de una
+        operación de otro hilo.
+        """
+        with self._lock:
+            repositories = sorted(
+                {repo for repo in self._repositories.values() if repo.dirty},
+                key=lambda r: r.path)
+        acquired = []
+        try:
+            for repo in repositories:
+                lock = store_lock(repo.path)
+                lock.acquire()
+                acquired.append(lock)
+            for repo in repositories:
+                repo.flush()
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def rollback(self) -> None:
+        """
+        Descarta los cambios pendientes de todos los repositorios.
+        """
+        with self._lock:
+            for repo in list(self._repositories.values()):
+                if repo.dirty:
+                    repo.reload()
+
+    def close(self) -> None:
+        """
+        Cancela la escritura programada y escribe lo pendiente.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        self.commit()
+        with self._lock:
+            for repo in list(self._repositories.values()):
+                repo.close()
+
+    def __enter__(self) -> 'Session':
+        return self
+
+    def __exit__(self, exc_type, exc, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.rollback()
+
+
+_current_session = Session()
+
+
+def _close_current_session() -> None:
+    """
+    Escribe lo pendiente de la sesión activa al terminar el proceso.
+    """
+    _current_session.close()
+
+
+atexit.register(_close_current_session)
+
+
+_thread_sessions = threading.local()
+
+
+def get_session() -> Session:
+    """
+    Devuelve la sesión activa que usan Hotel, Customer y Reservation:
+    la asociada al hilo actual con bind_session(), o la del proceso.
+    """
+    session = getattr(_thread_sessions, "session", None)
+    return _current_session if session is None else session
+
+
+def set_session(session: Session) -> Session:
+    """
+    Cambia la sesión activa y devuelve la anterior.
+    """
+    global _current_session  # pylint: disable=global-statement
+    previous = _current_session
+    _current_session = session
+    return previous
+
+
+def bind_session(session: Optional[Session]) -> None:
+    """
+    Hace que el hilo actual use la sesión dada en lugar de la sesión
+    del proceso; con None vuelve a usar la del proceso.
+    """
+    _thread_sessions.session = session
+
+
+@contextmanager
+def session_scope(**kwargs):
+    """
+    Abre una sesión nueva (con los argumentos de Session) como sesión
+    activa; hace commit al salir, o rollback si hubo una excepción.
+    """
+    session = Session(**kwargs)
+    previous = set_session(session)
+    try:
+        with session:
+            yield session
+    finally:
+        set_session(previous)
@@ -3,15 +3,69 @@ Este módulo contiene las pruebas unitarias para las clases Hotel, Customer y
 Reservation. Utiliza unittest para realizar las verificaciones y crea archivos
 JSON temporales para garantizar un entorno limpio en cada prueba.
 """
+# El paquete tiene un solo archivo de pruebas para todos sus módulos
+# pylint: disable=too-many-lines
 
 import unittest
+import asyncio
 import tempfile
 import os
+import shutil
+import io
 import json
+import logging
+import time
+import multiprocessing
+import threading
+import http.client
+from contextlib import redirect_stderr, redirect_stdout
+from unittest import mock
 from datetime import datetime
 
 
-from A01323987_A6_2 import Hotel, Customer, Reservation
+from A01323987_A6_2 import Hotel, Customer, Reservation, Waitlist
+from cache import RecordCache, cache_stats, record_cache
+from diagnostics import configure_logging
+from storage import BACKENDS, Session, WalRepository, get_session, \
+    session_scope, set_session, store_lock
+from sqlite_storage import SqliteRepository, migrate_json
+from indexes import RepositoryIndex, secondary_index
+from codec import SCHEMAS, BinaryRepository, RecordCodec
+from archive import archive_reservations, history, partitions, \
+    read_partition
+from analytics import daily, monthly, rebuild, summary
+from analytics import main as analytics_main
+from bulkload import export_snapshot, import_snapshot, load
+from async_api import AsyncBooking
+from benchmark import format_report, run_case, stress
+from server import create_server
+
+
+def remove_store_files(path):
+    """
+    Elimina el archivo de un almacén junto con los archivos auxiliares
+    que crea la capa de almacenamiento (candado, bitácora, temporal,
+    contador de IDs, contadores de ocupación, particiones archivadas).
+    """
+    for store in (path, path + ".stats"):
+        for suffix in ("", ".lock", ".wal", ".tmp", ".seq"):
+            if os.path.exists(store + suffix):
+                os.remove(store + suffix)
+    if os.path.isdir(path + ".archive"):
+        shutil.rmtree(path + ".archive")
+
+
+def remove_lock_files(*paths):
+    """
+    Elimina los candados que una prueba creó para almacenes que no
+    redirige (por ejemplo, reservaciones al reservar una habitación),
+    incluido el de sus contadores de ocupación, sin tocar los archivos
+    de datos.
+    """
+    for path in paths:
+        for lock in (path + ".lock", path + ".stats.lock"):
+            if os.path.exists(lock):
+                os.remove(lock)
 
 
 class TestHotel(unittest.TestCase):
@@ -26,6 +80,8 @@ class TestHotel(unittest.TestCase):
         reemplaza la ruta Hotel.FILE_PATH
         para usarlo y así aislar cada prueba.
         """
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
         self.temp_hotel_file = tempfile.NamedTemporaryFile(
             delete=False,
             suffix=".json"
@@ -45,7 +101,9 @@ class TestHotel(unittest.TestCase):
         Elimina el archivo temporal creado en setUp
         y restablece la ruta original.
         """
-        os.remove(self.temp_hotel_file.name)
+        remove_store_files(self.temp_hotel_file.name)
+        remove_lock_files(Customer.FILE_PATH, Reservation.FILE_PATH,
+                          Waitlist.FILE_PATH)
         Hotel.FILE_PATH = self.old_hotel_file
 
     def test_create_hotel(self):
@@ -127,6 +185,59 @@ class TestHotel(unittest.TestCase):
             "El hotel ya no debe existir."
         )
 
+    def test_ids_not_reused_after_delete(self):
+        """
+        Prueba que al eliminar el hotel con el ID más alto su ID no se
+        vuelva a asignar.
+        """
+        Hotel.create_hotel("Hotel Uno", "Ciudad", 1)
+        second = Hotel.create_hotel("Hotel Dos", "Ciudad", 1)
+        Hotel.delete_hotel(second.hotel_id)
+        third = Hotel.create_hotel("Hotel Tres", "Ciudad", 1)
+        self.assertEqual(third.hotel_id, second.hotel_id + 1)
+
+    def test_lookup_cache(self):
+        """
+        Prueba que las búsquedas por ID se resuelven desde la caché y
+        que esta se invalida al modificar o eliminar en este proceso y
+        cuando otro proceso cambia el archivo.
+        """
+        hotel = Hotel.create_hotel("Hotel Caché", "Ciudad", 3)
+        cache = record_cache(Hotel.repository(), Hotel)
+        Hotel.get_hotel(hotel.hotel_id)
+        # Cada búsqueda recibe su propia instancia
+        found = Hotel.get_hotel(hotel.hotel_id)
+        found.name = "Cambio local"
+        self.assertEqual(Hotel.get_hotel(hotel.hotel_id).name,
+                         "Hotel Caché")
+        self.assertEqual((cache.misses, cache.hits), (1, 2))
+
+        Hotel.modify_hotel_information(hotel.hotel_id, name="Renovado")
+        self.assertEqual(Hotel.get_hotel(hotel.hotel_id).name, "Renovado")
+
+        # Otro proceso modifica el archivo
+        time.sleep(0.01)
+        with open(Hotel.FILE_PATH, encoding="utf-8") as file_obj:
+            data = json.load(file_obj)
+        data[str(hotel.hotel_id)]["location"] = "Otra Ciudad"
+        with open(Hotel.FILE_PATH, "w", encoding="utf-8") as file_obj:
+            json.dump(data, file_obj)
+        self.assertEqual(Hotel.get_hotel(hotel.hotel_id).location,
+                         "Otra Ciudad")
+
+        Hotel.delete_hotel(hotel.hotel_id)
+        self.assertIsNone(Hotel.get_hotel(hotel.hotel_id))
+        self.assertEqual(cache.stats()["size"], 0)
+        self.assertIn("hotels", cache_stats())
+
+        small = RecordCache(Hotel.repository(), Hotel, maxsize=2)
+        ids = [Hotel.create_hotel(f"Hotel {number}", "Ciudad",
+                                  1).hotel_id for number in range(3)]
+        for hotel_id in ids + [ids[0]]:
+            small.get(str(hotel_id))
+        self.assertEqual(small.stats()["size"], 2)
+        self.assertEqual(small.misses, 4)
+
     def test_reserve_room(self):
         """
         Prueba la acción de reservar habitaciones
@@ -189,6 +300,8 @@ class TestCustomer(unittest.TestCase):
         y reemplaza Customer.FILE_PATH
         para aislar cada prueba.
         """
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
         self.temp_customer_file = tempfile.NamedTemporaryFile(
             delete=False,
             suffix=".json"
@@ -206,7 +319,9 @@ class TestCustomer(unittest.TestCase):
         Elimina el archivo temporal y restablece la ruta original del archivo
         de clientes.
         """
-        os.remove(self.temp_customer_file.name)
+        remove_store_files(self.temp_customer_file.name)
+        remove_lock_files(Hotel.FILE_PATH, Reservation.FILE_PATH,
+                          Waitlist.FILE_PATH)
         Customer.FILE_PATH = self.old_customer_file
 
     def test_create_customer(self):
@@ -268,8 +383,36 @@ class TestCustomer(unittest.TestCase):
             "El cliente no debe existir más."
         )
 
+    def test_find_by_email_unique(self):
+        """
+        Prueba la búsqueda por correo y que no se permita repetirlo al
+        crear o modificar clientes.
+        """
+        print(
+            "::: Se espera un mensaje de error a continuación, "
+            "por un correo repetido :::"
+        )
+        ana = Customer.create_customer("Ana", "ana@correo.com")
+        beto = Customer.create_customer("Beto", "beto@correo.com")
+        self.assertEqual(
+            Customer.find_by_email("ANA@correo.com").customer_id,
+            ana.customer_id)
+        self.assertIsNone(Customer.create_customer("Otra Ana",
+                                                   "ana@correo.com"))
+        self.assertFalse(Customer.modify_customer_information(
+            beto.customer_id, email="ana@correo.com"))
 
-class TestReservation(unittest.TestCase):
+        Customer.modify_customer_information(ana.customer_id,
+                                             email="ana@nuevo.com")
+        self.assertIsNone(Customer.find_by_email("ana@correo.com"))
+        self.assertEqual(Customer.find_by_email("ana@nuevo.com").name,
+                         "Ana")
+        Customer.delete_customer(beto.customer_id)
+        self.assertIsNone(Customer.find_by_email("beto@correo.com"))
+
+
+# Una prueba por caso de reservar, cancelar y modificar
+class TestReservation(unittest.TestCase):  # pylint: disable=R0904
     """
     Contiene pruebas unitarias para la clase Reservation: crea y cancela
     reservaciones, validando la disponibilidad en el hotel y la asociación con
@@ -282,6 +425,8 @@ class TestReservation(unittest.TestCase):
         luego modifica las rutas de cada clase (FILE_PATH)
         para aislar cada prueba.
         """
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
         self.temp_hotel_file = tempfile.NamedTemporaryFile(
             delete=False,
             suffix=".json"
@@ -291,6 +436,8 @@ class TestReservation(unittest.TestCase):
                   'w', encoding='utf-8') as file_obj:
             json.dump({}, file_obj)
 
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
         self.temp_customer_file = tempfile.NamedTemporaryFile(
             delete=False,
             suffix=".json"
@@ -300,6 +447,8 @@ class TestReservation(unittest.TestCase):
                   'w', encoding='utf-8') as file_obj:
             json.dump({}, file_obj)
 
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
         self.temp_reservation_file = tempfile.NamedTemporaryFile(
             delete=False,
             suffix=".json"
@@ -318,18 +467,23 @@ class TestReservation(unittest.TestCase):
         self.old_reservation_file = Reservation.FILE_PATH
         Reservation.FILE_PATH = self.temp_reservation_file.name
 
+        self.old_waitlist_file = Waitlist.FILE_PATH
+        Waitlist.FILE_PATH = self.temp_reservation_file.name + ".waitlist"
+
     def tearDown(self):
         """
         Elimina los archivos temporales y restablece los paths originales de
-        Hotel, Customer y Reservation.
+        Hotel, Customer, Reservation y Waitlist.
         """
-        os.remove(self.temp_hotel_file.name)
-        os.remove(self.temp_customer_file.name)
-        os.remove(self.temp_reservation_file.name)
+        remove_store_files(self.temp_hotel_file.name)
+        remove_store_files(self.temp_customer_file.name)
+        remove_store_files(self.temp_reservation_file.name)
+        remove_store_files(Waitlist.FILE_PATH)
 
         Hotel.FILE_PATH = self.old_hotel_file
         Customer.FILE_PATH = self.old_customer_file
         Reservation.FILE_PATH = self.old_reservation_file
+        Waitlist.FILE_PATH = self.old_waitlist_file
 
     def test_create_reservation(self):
         """
@@ -428,11 +582,11 @@ class TestReservation(unittest.TestCase):
             "La primera reservación debe realizarse con éxito."
         )
 
-        # Segunda reservación debe fallar
+        # Segunda reservación en una noche ya ocupada debe fallar
         res2 = Reservation.create_reservation(
             customer_id=customer.customer_id,
             hotel_id=hotel.hotel_id,
-            check_in=datetime(2025, 3, 2),
+            check_in=datetime(2025, 2, 28),
             check_out=datetime(2025, 3, 3)
         )
         self.assertIsNone(
@@ -440,6 +594,90 @@ class TestReservation(unittest.TestCase):
             "No hay habitaciones disponibles para una segunda reservación."
         )
 
+    def test_booking_is_silent_and_logs_rejections(self):
+        """
+        Prueba que reservar no escribe en la consola y que los rechazos
+        se reportan por logging con campos estructurados.
+        """
+        hotel = Hotel.create_hotel("Hotel Callado", "Mérida", 1)
+        customer = Customer.create_customer("Callado", "quiet@example.com")
+        stdout = io.StringIO()
+        with redirect_stdout(stdout), \
+                self.assertLogs("reservations", "INFO") as logs:
+            reservation = Reservation.create_reservation(
+                customer.customer_id, hotel.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 2))
+            rejected = Reservation.create_reservation(
+                customer.customer_id, hotel.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 2))
+        self.assertIsNotNone(reservation)
+        self.assertIsNone(rejected)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertEqual([(record.levelname, record.event)
+                          for record in logs.records],
+                         [("INFO", "reservation_created"),
+                          ("WARNING", "reservation_rejected")])
+        self.assertEqual(logs.records[1].reason, "no_rooms")
+
+        stream = io.StringIO()
+        configure_logging(stream=stream)
+        try:
+            Reservation.create_reservation(9999, hotel.hotel_id,
+                                           datetime(2025, 4, 1),
+                                           datetime(2025, 4, 2))
+        finally:
+            logger = logging.getLogger("reservations")
+            logger.handlers.clear()
+            logger.setLevel(logging.NOTSET)
+            logger.propagate = True
+        entry = json.loads(stream.getvalue())
+        self.assertEqual((entry["level"], entry["event"], entry["reason"],
+                          entry["customer_id"]),
+                         ("WARNING", "reservation_rejected",
+                          "invalid_owner", 9999))
+
+    def test_reservation_other_dates_available(self):
+        """
+        Prueba que una habitación ocupada en marzo sigue disponible en
+        junio, y que la salida de una reservación libera esa noche para
+        la siguiente entrada.
+        """
+        hotel = Hotel.create_hotel("Hotel Fechas", "Ciudad Fechas",
+                                   total_rooms=1)
+        customer = Customer.create_customer("Usuario Fechas",
+                                            "fechas@example.com")
+        stays = [(datetime(2025, 3, 1), datetime(2025, 3, 5)),
+                 (datetime(2025, 6, 1), datetime(2025, 6, 3)),
+                 (datetime(2025, 3, 5), datetime(2025, 3, 6))]
+        for check_in, check_out in stays:
+            self.assertIsNotNone(
+                Reservation.create_reservation(
+                    customer.customer_id, hotel.hotel_id,
+                    check_in, check_out),
+                "Las noches no se traslapan."
+            )
+
+    def test_cancel_frees_only_its_dates(self):
+        """
+        Prueba que cancelar una reservación libera exactamente sus noches.
+        """
+        hotel = Hotel.create_hotel("Hotel Liberar", "Ciudad", total_rooms=1)
+        customer = Customer.create_customer("Usuario Liberar",
+                                            "liberar@example.com")
+        march = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 1), datetime(2025, 3, 5))
+        Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 10), datetime(2025, 3, 12))
+        self.assertTrue(Reservation.cancel_reservation(march.reservation_id))
+        self.assertIsNotNone(Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 2), datetime(2025, 3, 4)))
+        self.assertIsNone(Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 11), datetime(2025, 3, 13)))
+
     def test_cancel_reservation(self):
         """
         Prueba la cancelación de una reservación activa,
@@ -479,6 +717,1117 @@ class TestReservation(unittest.TestCase):
         updated_hotel = Hotel.display_hotel_info(hotel.hotel_id)
         self.assertEqual(updated_hotel.booked_rooms, 0)
 
+    def test_search_by_location_and_dates(self):
+        """
+        Prueba que la búsqueda filtre por ubicación sin importar
+        mayúsculas, descarte los hoteles sin capacidad en las fechas
+        pedidas y ordene por habitaciones libres.
+        """
+        small = Hotel.create_hotel("Hotel Chico", "Monterrey", 2)
+        large = Hotel.create_hotel("Hotel Grande", "monterrey ", 5)
+        Hotel.create_hotel("Hotel Lejano", "Cancún", 10)
+        customer = Customer.create_customer("Usuario Buscar",
+                                            "buscar@example.com")
+        for _ in range(2):
+            Reservation.create_reservation(
+                customer.customer_id, small.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 5))
+
+        found = Hotel.search("MONTERREY", rooms=1,
+                             check_in=datetime(2025, 3, 4),
+                             check_out=datetime(2025, 3, 6))
+        self.assertEqual([hotel.hotel_id for hotel in found],
+                         [large.hotel_id])
+
+        found = Hotel.search("Monterrey", rooms=2,
+                             check_in=datetime(2025, 3, 5),
+                             check_out=datetime(2025, 3, 6))
+        self.assertEqual([hotel.hotel_id for hotel in found],
+                         [large.hotel_id, small.hotel_id])
+
+        Hotel.modify_hotel_information(large.hotel_id, location="Saltillo")
+        self.assertEqual([hotel.hotel_id for hotel in
+                          Hotel.search("monterrey", rooms=3)], [])
+        self.assertEqual(len(Hotel.search(rooms=5)), 2)
+
+    def test_create_reservations_batch(self):
+        """
+        Prueba que un lote atómico con una solicitud imposible no cree
+        nada y que el mismo lote sin atomicidad cree las posibles.
+        """
+        print(
+            "::: Se esperan mensajes de error a continuación, "
+            "por falta de habitaciones :::"
+        )
+        hotel = Hotel.create_hotel("Hotel Lote", "Ciudad Lote", 2)
+        customer = Customer.create_customer("Usuario Lote",
+                                            "lote@example.com")
+        stay = (datetime(2025, 5, 1), datetime(2025, 5, 3))
+        requests = [(customer.customer_id, hotel.hotel_id) + stay] * 3
+
+        results = Reservation.create_reservations(requests)
+        self.assertEqual(results, [None, None, None])
+        self.assertEqual(Reservation.load_reservations(), {})
+        self.assertEqual(Hotel.display_hotel_info(hotel.hotel_id)
+                         .booked_rooms, 0)
+
+        results = Reservation.create_reservations(requests, atomic=False)
+        self.assertIsNone(results[2])
+        # Los IDs que tomó el lote rechazado no se reutilizan
+        self.assertEqual(
+            sorted(int(key) for key in Reservation.load_reservations()),
+            [res.reservation_id for res in results[:2]])
+        self.assertEqual(Hotel.display_hotel_info(hotel.hotel_id)
+                         .booked_rooms, 2)
+        self.assertIsNone(Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id, *stay))
+
+    def test_reservations_for_customer_and_hotel(self):
+        """
+        Prueba las consultas de reservaciones por cliente y por hotel.
+        """
+        first = Hotel.create_hotel("Hotel Uno", "Ciudad", 3)
+        second = Hotel.create_hotel("Hotel Dos", "Ciudad", 3)
+        ana = Customer.create_customer("Ana", "ana@indice.com")
+        beto = Customer.create_customer("Beto", "beto@indice.com")
+        stay = (datetime(2025, 7, 1), datetime(2025, 7, 4))
+        res1 = Reservation.create_reservation(ana.customer_id,
+                                              first.hotel_id, *stay)
+        res2 = Reservation.create_reservation(ana.customer_id,
+                                              second.hotel_id, *stay)
+        res3 = Reservation.create_reservation(beto.customer_id,
+                                              first.hotel_id, *stay)
+        Reservation.cancel_reservation(res1.reservation_id)
+
+        self.assertEqual(
+            [res.reservation_id for res in
+             Reservation.for_customer(ana.customer_id)],
+            [res1.reservation_id, res2.reservation_id])
+        self.assertEqual(
+            [res.reservation_id for res in
+             Reservation.for_hotel(first.hotel_id, active_only=True)],
+            [res3.reservation_id])
+        self.assertEqual(Reservation.for_customer(9999), [])
+
+    def test_archive_and_history(self):
+        """
+        Prueba que el archivo mueve las reservaciones canceladas y
+        terminadas a particiones frías por mes, libera sus habitaciones
+        y que el historial las sigue encontrando.
+        """
+        hotel = Hotel.create_hotel("Hotel Histórico", "Oaxaca", 1)
+        customer = Customer.create_customer("Histórico", "old@example.com")
+        past = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 1, 10), datetime(2025, 1, 12))
+        canceled = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 2, 1), datetime(2025, 2, 3))
+        Reservation.cancel_reservation(canceled.reservation_id)
+        future = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 7, 1), datetime(2025, 7, 5))
+
+        archived = archive_reservations(datetime(2025, 6, 1).date())
+        self.assertEqual(archived, {"2025-01": 1, "2025-02": 1})
+        self.assertEqual(partitions(), ["2025-01", "2025-02"])
+        self.assertEqual(list(Reservation.repository().keys()),
+                         [str(future.reservation_id)])
+        self.assertEqual(Hotel.get_hotel(hotel.hotel_id).booked_rooms, 1)
+        self.assertEqual(archive_reservations(datetime(2025, 6, 1).date()),
+                         {})
+        # La estancia terminada se archiva desactivada
+        finished = read_partition("2025-01")[str(past.reservation_id)]
+        self.assertEqual((finished["is_active"], finished["completed"]),
+                         (False, True))
+
+        self.assertEqual(
+            [reservation.reservation_id for reservation
+             in history(customer_id=customer.customer_id)],
+            [past.reservation_id, canceled.reservation_id,
+             future.reservation_id])
+        february = history(hotel_id=hotel.hotel_id, start_month="2025-02",
+                           end_month="2025-02")
+        self.assertEqual([(reservation.reservation_id, reservation.is_active)
+                          for reservation in february],
+                         [(canceled.reservation_id, False)])
+
+        later = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 8, 1), datetime(2025, 8, 2))
+        self.assertEqual(later.reservation_id, future.reservation_id + 1)
+
+    def test_occupancy_analytics(self):
+        """
+        Prueba que los contadores de ocupación y cancelación se
+        actualizan al crear y cancelar, sobreviven al archivo y
+        coinciden con una reconstrucción completa.
+        """
+        hotel = Hotel.create_hotel("Hotel Tablero", "León", 2)
+        customer = Customer.create_customer("Tablero", "board@example.com")
+        Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 1), datetime(2025, 3, 3))
+        self.assertEqual(monthly(hotel.hotel_id, "2025-03")["nights_booked"],
+                         2)
+        Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 2), datetime(2025, 3, 4))
+        canceled = Reservation.create_reservation(
+            customer.customer_id, hotel.hotel_id,
+            datetime(2025, 3, 10), datetime(2025, 3, 11))
+        Reservation.cancel_reservation(canceled.reservation_id)
+
+        self.assertEqual(daily(hotel.hotel_id,
+                               datetime(2025, 3, 2).date())["occupancy_rate"],
+                         1.0)
+        march = monthly(hotel.hotel_id, "2025-03")
+        self.assertEqual((march["reservations"], march["cancellations"],
+                          march["nights_booked"]), (3, 1, 4))
+        self.assertAlmostEqual(march["occupancy_rate"], 4 / (2 * 31))
+        before = summary(hotel.hotel_id)
+        self.assertAlmostEqual(before["cancellation_rate"], 1 / 3)
+
+        # Los contadores están en su almacén, no solo en este proceso
+        with open(Reservation.FILE_PATH + ".stats", 'r',
+                  encoding='utf-8') as file_obj:
+            self.assertEqual(json.load(file_obj)[f"{hotel.hotel_id}:total"],
+                             {"counter": f"{hotel.hotel_id}:total",
+                              "created": 3, "cancelled": 1, "nights": 4})
+
+        archive_reservations(datetime(2025, 6, 1).date())
+        self.assertEqual(summary(hotel.hotel_id), before)
+        with redirect_stdout(io.StringIO()):
+            analytics_main(["rebuild"])
+        self.assertEqual(summary(hotel.hotel_id), before)
+        self.assertEqual(monthly(hotel.hotel_id, "2025-03"), march)
+        self.assertGreater(rebuild(), 0)
+        self.assertEqual(summary(hotel.hotel_id), before)
+
+        with redirect_stdout(io.StringIO()), \
+                redirect_stderr(io.StringIO()) as errors:
+            with self.assertRaises(SystemExit):
+                analytics_main(["report", str(hotel.hotel_id),
+                                "--month", "2025-13"])
+        self.assertIn("mes inválido", errors.getvalue())
+
+    def test_bulk_load_and_snapshot(self):
+        """
+        Prueba la carga masiva desde CSV y JSONL con validación y
+        asignación de IDs, y que un respaldo exportado se vuelve a
+        importar igual.
+        """
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        hotels_csv = os.path.join(directory, "hoteles.csv")
+        with open(hotels_csv, "w", encoding="utf-8") as file_obj:
+            file_obj.write("name,location,total_rooms\n"
+                           "Hotel Uno,Colima,1\n"
+                           "Hotel Malo,Colima,muchas\n"
+                           "Hotel Dos,Tepic,3\n")
+        customers_jsonl = os.path.join(directory, "clientes.jsonl")
+        with open(customers_jsonl, "w", encoding="utf-8") as file_obj:
+            file_obj.write('{"name": "Ana", "email": "ana@example.com"}\n'
+                           '{"name": "Otra", "email": "ANA@example.com"}\n'
+                           '{"name": "Beto", "email": \n'
+                           '{"name": "Beto", "email": "beto@example.com"}\n')
+        reservations_csv = os.path.join(directory, "reservas.csv")
+        with open(reservations_csv, "w", encoding="utf-8") as file_obj:
+            file_obj.write("customer_id,hotel_id,check_in,check_out\n"
+                           "1,1,2025-05-01,2025-05-03\n"
+                           "2,1,2025-05-02,2025-05-04\n"
+                           "2,9,2025-05-02,2025-05-04\n"
+                           "2,2,2025-05-02,2025-05-04\n")
+
+        with self.assertLogs("reservations.bulkload", "WARNING") as logs:
+            self.assertEqual(load("hotels", hotels_csv),
+                             {"loaded": 2, "rejected": 1})
+            self.assertEqual(load("customers", customers_jsonl),
+                             {"loaded": 2, "rejected": 2})
+            self.assertEqual(load("reservations", reservations_csv),
+                             {"loaded": 2, "rejected": 2})
+        self.assertEqual([record.row for record in logs.records],
+                         [2, 2, 3, 2, 3])
+        self.assertEqual(sorted(Hotel.load_hotels()), ["1", "2"])
+        self.assertEqual(Hotel.get_hotel(1).booked_rooms, 1)
+        self.assertEqual(Hotel.create_hotel("Hotel Tres", "Colima",
+                                            1).hotel_id, 3)
+        with self.assertRaises(ValueError):
+            load("hotels", hotels_csv, strict=True)
+        self.assertEqual(len(Hotel.load_hotels()), 3)
+
+        before = (Hotel.load_hotels(), Customer.load_customers(),
+                  Reservation.load_reservations())
+        self.assertEqual(export_snapshot(directory),
+                         {"hotels": 3, "customers": 2, "reservations": 2})
+        Hotel.save_hotels({})
+        Customer.save_customers({})
+        Reservation.save_reservations({})
+        import_snapshot(directory)
+        self.assertEqual((Hotel.load_hotels(), Customer.load_customers(),
+                          Reservation.load_reservations()), before)
+
+    def test_waitlist_promotion(self):
+        """
+        Una solicitud sin lugar queda en espera y, al cancelarse una
+        reservación, se atiende primero la de mayor prioridad y después
+        la más antigua; las que no caben en las fechas conservan su lugar.
+        """
+        hotel = Hotel.create_hotel("Full Hotel", "City", 1)
+        customers = [Customer.create_customer(f"Guest {number}",
+                                              f"guest{number}@example.com")
+                     for number in range(4)]
+        check_in, check_out = datetime(2025, 3, 1), datetime(2025, 3, 5)
+
+        first = Waitlist.reserve_or_join(customers[0].customer_id,
+                                         hotel.hotel_id, check_in, check_out)
+        self.assertIsInstance(first, Reservation)
+        waiting = Waitlist.reserve_or_join(customers[1].customer_id,
+                                           hotel.hotel_id, check_in,
+                                           check_out)
+        self.assertIsInstance(waiting, Waitlist)
+        # No cabe aunque se libere la habitación: otra estancia más larga
+        longer = Waitlist.join(customers[2].customer_id, hotel.hotel_id,
+                               check_in, datetime(2025, 3, 9), priority=5)
+        vip = Waitlist.join(customers[3].customer_id, hotel.hotel_id,
+                            check_in, check_out, priority=1)
+        self.assertEqual(
+            [entry.waitlist_id for entry in Waitlist.pending(hotel.hotel_id)],
+            [longer.waitlist_id, vip.waitlist_id, waiting.waitlist_id])
+        self.assertFalse(Waitlist.withdraw(999))
+
+        # Se libera la habitación, pero la estancia larga sigue sin caber
+        self.assertIsNotNone(Reservation.create_reservation(
+            customers[0].customer_id, hotel.hotel_id, datetime(2025, 3, 5),
+            datetime(2025, 3, 9)))
+        self.assertTrue(Reservation.cancel_reservation(first.reservation_id))
+        pending = Waitlist.pending(hotel.hotel_id)
+        self.assertEqual([entry.waitlist_id for entry in pending],
+                         [longer.waitlist_id, waiting.waitlist_id])
+        promoted = Waitlist.repository().get(str(vip.waitlist_id))
+        self.assertEqual(promoted["status"], "promoted")
+        self.assertEqual(
+            Reservation.repository().get(str(promoted["reservation_id"]))
+            ["customer_id"], customers[3].customer_id)
+
+        # Sin prioridad gana la más antigua
+        self.assertTrue(Reservation.cancel_reservation(
+            promoted["reservation_id"]))
+        self.assertEqual(Waitlist.repository().get(
+            str(waiting.waitlist_id))["status"], "promoted")
+        self.assertTrue(Waitlist.withdraw(longer.waitlist_id))
+        self.assertEqual(Waitlist.pending(hotel.hotel_id), [])
+
+    def test_cascade_delete_promotes_waitlist(self):
+        """
+        Prueba que la habitación liberada al eliminar en cascada a un
+        cliente pase a la siguiente solicitud en espera del hotel.
+        """
+        hotel = Hotel.create_hotel("Cascade Hotel", "City", 1)
+        leaving = Customer.create_customer("Leaving", "leaving@example.com")
+        staying = Customer.create_customer("Staying", "staying@example.com")
+        stay = (datetime(2025, 4, 1), datetime(2025, 4, 3))
+        self.assertIsInstance(Waitlist.reserve_or_join(
+            leaving.customer_id, hotel.hotel_id, *stay), Reservation)
+        waiting = Waitlist.reserve_or_join(staying.customer_id,
+                                           hotel.hotel_id, *stay)
+        self.assertIsInstance(waiting, Waitlist)
+
+        self.assertTrue(Customer.delete_customer(leaving.customer_id,
+                                                 on_delete="cascade"))
+        promoted = Waitlist.repository().get(str(waiting.waitlist_id))
+        self.assertEqual(promoted["status"], "promoted")
+        self.assertEqual(
+            [reservation.customer_id for reservation
+             in Reservation.for_hotel(hotel.hotel_id, active_only=True)],
+            [staying.customer_id])
+
+    def test_failed_promotion_keeps_place(self):
+        """
+        Prueba que una solicitud revisada durante una promoción que
+        falla regresa a la cola y se atiende en la siguiente.
+        """
+        hotel = Hotel.create_hotel("Retry Hotel", "City", 1)
+        guest = Customer.create_customer("Retry", "retry@example.com")
+        waiting = Waitlist.join(guest.customer_id, hotel.hotel_id,
+                                datetime(2025, 5, 1), datetime(2025, 5, 3))
+        with mock.patch.object(Reservation, "create_reservation",
+                               side_effect=RuntimeError("falla")):
+            with self.assertRaises(RuntimeError):
+                Waitlist.promote(hotel.hotel_id)
+        self.assertEqual(Waitlist.repository().get(
+            str(waiting.waitlist_id))["status"], "waiting")
+
+        promoted = Waitlist.promote(hotel.hotel_id)
+        self.assertEqual([reservation.customer_id for reservation
+                          in promoted], [guest.customer_id])
+
+    def test_reservation_waits_for_owner_delete(self):
+        """
+        Prueba que una reservación que llega mientras otro hilo elimina
+        a su cliente espera los candados y se rechaza, en lugar de
+        quedar activa sin dueño.
+        """
+        hotel = Hotel.create_hotel("Locked Hotel", "City", 1)
+        guest = Customer.create_customer("Locked", "locked@example.com")
+        results = []
+        worker = threading.Thread(target=lambda: results.append(
+            Reservation.create_reservation(
+                guest.customer_id, hotel.hotel_id, datetime(2025, 6, 1),
+                datetime(2025, 6, 3))))
+        # Toma los mismos almacenes que la eliminación para no invertir
+        # el orden de los candados respecto del otro hilo
+        with get_session().transaction(Customer.repository(),
+                                       Hotel.repository(),
+                                       Reservation.repository(),
+                                       Waitlist.repository()):
+            worker.start()
+            worker.join(0.2)
+            self.assertTrue(worker.is_alive())
+            self.assertTrue(Customer.delete_customer(guest.customer_id))
+        worker.join(5)
+        self.assertEqual(results, [None])
+        self.assertEqual(Reservation.for_hotel(hotel.hotel_id), [])
+
+    def test_delete_with_active_reservations(self):
+        """
+        Prueba que por defecto no se pueda eliminar un hotel o cliente con
+        reservaciones activas y que en cascada se cancelen.
+        """
+        print(
+            "::: Se esperan mensajes de error a continuación, "
+            "por reservaciones activas :::"
+        )
+        hotel = Hotel.create_hotel("Hotel Integridad", "Ciudad", 3)
+        other = Hotel.create_hotel("Hotel Otro", "Ciudad", 3)
+        customer = Customer.create_customer("Usuario Integridad",
+                                            "integridad@example.com")
+        stay = (datetime(2025, 8, 1), datetime(2025, 8, 3))
+        Reservation.create_reservation(customer.customer_id,
+                                       hotel.hotel_id, *stay)
+        kept = Reservation.create_reservation(customer.customer_id,
+                                              other.hotel_id, *stay)
+
+        self.assertFalse(Hotel.delete_hotel(hotel.hotel_id))
+        self.assertFalse(Customer.delete_customer(customer.customer_id))
+
+        self.assertTrue(Hotel.delete_hotel(hotel.hotel_id,
+                                           on_delete="cascade"))
+        self.assertEqual(Reservation.for_hotel(hotel.hotel_id,
+                                               active_only=True), [])
+        self.assertEqual(
+            [res.reservation_id for res in
+             Reservation.for_customer(customer.customer_id,
+                                      active_only=True)],
+            [kept.reservation_id])
+
+        self.assertTrue(Customer.delete_customer(customer.customer_id,
+                                                 on_delete="cascade"))
+        self.assertEqual(Hotel.display_hotel_info(other.hotel_id)
+                         .booked_rooms, 0)
+        with self.assertRaises(ValueError):
+            Hotel.delete_hotel(other.hotel_id, on_delete="ignore")
+
+
+class TestSession(unittest.TestCase):
+    """
+    Contiene pruebas unitarias para la capa de repositorio: escritura
+    diferida hasta el commit, rollback e intervalo de escritura.
+    """
+
+    def setUp(self):
+        """
+        Crea un archivo JSON temporal para hoteles y reemplaza
+        Hotel.FILE_PATH para aislar cada prueba.
+        """
+        # Se cierra enseguida; tearDown borra el archivo
+        # pylint: disable-next=R1732
+        self.temp_hotel_file = tempfile.NamedTemporaryFile(
+            delete=False,
+            suffix=".json"
+        )
+        self.temp_hotel_file.close()
+        with open(self.temp_hotel_file.name,
+                  'w', encoding='utf-8') as file_obj:
+            json.dump({}, file_obj)
+
+        self.old_hotel_file = Hotel.FILE_PATH
+        Hotel.FILE_PATH = self.temp_hotel_file.name
+
+    def tearDown(self):
+        """
+        Elimina el archivo temporal y restablece la ruta original.
+        """
+        remove_store_files(self.temp_hotel_file.name)
+        remove_lock_files(Customer.FILE_PATH, Reservation.FILE_PATH,
+                          Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = self.old_hotel_file
+
+    def _hotels_on_disk(self):
+        """
+        Lee directamente el archivo de hoteles.
+        """
+        with open(self.temp_hotel_file.name, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_commit_writes_once(self):
+        """
+        Prueba que dentro de una sesión sin intervalo los cambios se
+        sirven desde memoria y solo se escriben al hacer commit.
+        """
+        with session_scope(flush_interval=None):
+            hotel = Hotel.create_hotel("Hotel Sesión", "Ciudad", 3)
+            Hotel.reserve_room(hotel.hotel_id)
+            self.assertEqual(
+                Hotel.display_hotel_info(hotel.hotel_id).booked_rooms, 1)
+            self.assertEqual(self._hotels_on_disk(), {},
+                             "No se debe escribir antes del commit.")
+        self.assertEqual(
+            self._hotels_on_disk()[str(hotel.hotel_id)]["booked_rooms"], 1)
+
+    def test_rollback_on_error(self):
+        """
+        Prueba que una excepción dentro de la sesión descarta los cambios.
+        """
+        with self.assertRaises(RuntimeError):
+            with session_scope(flush_interval=None):
+                Hotel.create_hotel("Hotel Descartado", "Ciudad", 1)
+                raise RuntimeError("fallo simulado")
+        self.assertEqual(self._hotels_on_disk(), {})
+        self.assertEqual(Hotel.load_hotels(), {})
+
+    def test_flush_interval(self):
+        """
+        Prueba que los cambios se escriben solos al cumplirse el intervalo.
+        """
+        with session_scope(flush_interval=0.05):
+            Hotel.create_hotel("Hotel Intervalo", "Ciudad", 1)
+            time.sleep(0.3)
+            self.assertEqual(len(self._hotels_on_disk()), 1)
+
+    def test_failed_operation_keeps_acknowledged_changes(self):
+        """
+        Prueba que, en una sesión con intervalo, una operación que falla
+        solo deshace sus propios cambios: lo que ya se confirmó al
+        llamador sigue pendiente y llega al disco.
+        """
+        with session_scope(flush_interval=60.0) as session:
+            hotel = Hotel.create_hotel("Hotel Confirmado", "Ciudad", 2)
+            with self.assertRaises(TypeError):
+                Hotel.modify_hotel_information(hotel.hotel_id, name="Otro",
+                                               total_rooms="many")
+            repo = Hotel.repository()
+            with self.assertRaises(RuntimeError):
+                with session.transaction(repo):
+                    repo.put("99", {"hotel_id": 99})
+                    # Cambio directo sobre el registro leído
+                    repo.get(str(hotel.hotel_id))["name"] = "Mutado"
+                    raise RuntimeError("fallo simulado")
+            self.assertIsNone(repo.get("99"))
+            self.assertEqual(Hotel.get_hotel(hotel.hotel_id).name,
+                             "Hotel Confirmado")
+            self.assertEqual(self._hotels_on_disk(), {})
+        on_disk = self._hotels_on_disk()
+        self.assertEqual(list(on_disk), [str(hotel.hotel_id)])
+        self.assertEqual(on_disk[str(hotel.hotel_id)]["name"],
+                         "Hotel Confirmado")
+
+    def test_commit_waits_for_store_lock(self):
+        """
+        Prueba que commit() no escribe mientras otro hilo tiene el
+        candado del almacén a mitad de una operación.
+        """
+        with session_scope(flush_interval=None) as session:
+            Hotel.create_hotel("Hotel Pendiente", "Ciudad", 2)
+            lock = store_lock(Hotel.repository().path)
+            held = threading.Event()
+            release = threading.Event()
+
+            def hold_lock():
+                lock.acquire()
+                held.set()
+                release.wait()
+                lock.release()
+
+            holder = threading.Thread(target=hold_lock)
+            holder.start()
+            held.wait()
+            committer = threading.Thread(target=session.commit)
+            committer.start()
+            committer.join(0.2)
+            self.assertTrue(committer.is_alive())
+            self.assertEqual(self._hotels_on_disk(), {})
+            release.set()
+            committer.join()
+            holder.join()
+            self.assertEqual(len(self._hotels_on_disk()), 1)
+
+
+class TestWalRepository(unittest.TestCase):
+    """
+    Contiene pruebas unitarias para el backend con bitácora: escritura
+    incremental, recuperación tras una caída y compactación.
+    """
+
+    def setUp(self):
+        """
+        Crea un directorio temporal con el archivo de hoteles y reemplaza
+        Hotel.FILE_PATH para aislar cada prueba.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_hotel_file = Hotel.FILE_PATH
+        Hotel.FILE_PATH = os.path.join(self.temp_dir.name, "hotels.json")
+
+    def tearDown(self):
+        """
+        Elimina el directorio temporal y restablece la ruta original.
+        """
+        self.temp_dir.cleanup()
+        remove_lock_files(Customer.FILE_PATH, Reservation.FILE_PATH,
+                          Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = self.old_hotel_file
+
+    def test_changes_survive_restart(self):
+        """
+        Prueba que los cambios van a la bitácora y que un repositorio
+        nuevo (como tras reiniciar el proceso) los recupera.
+        """
+        with session_scope(backend=WalRepository):
+            hotel = Hotel.create_hotel("Hotel Bitácora", "Ciudad", 2)
+            Hotel.reserve_room(hotel.hotel_id)
+        self.assertFalse(os.path.exists(Hotel.FILE_PATH),
+                         "Solo se debe escribir la bitácora.")
+        restored = WalRepository("hotels", Hotel.FILE_PATH)
+        self.assertEqual(
+            restored.get(str(hotel.hotel_id))["booked_rooms"], 1)
+
+    def test_incomplete_entry_is_discarded(self):
+        """
+        Prueba que una línea incompleta al final de la bitácora (caída a
+        mitad de escritura) se ignora sin perder lo anterior.
+        """
+        with session_scope(backend=WalRepository):
+            hotel = Hotel.create_hotel("Hotel Caída", "Ciudad", 2)
+        with open(Hotel.FILE_PATH + ".wal", 'a', encoding='utf-8') as log:
+            log.write('{"op":"put","key":"9","val')
+        restored = WalRepository("hotels", Hotel.FILE_PATH)
+        self.assertEqual(list(restored.keys()), [str(hotel.hotel_id)])
+        restored.put("2", {"hotel_id": 2})
+        restored.flush()
+        restored.close()
+        self.assertEqual(
+            len(WalRepository("hotels", Hotel.FILE_PATH)), 2)
+
+    def test_compaction(self):
+        """
+        Prueba que al superar el umbral la bitácora se compacta en una
+        instantánea.
+        """
+        repo = WalRepository("hotels", Hotel.FILE_PATH, compact_threshold=3)
+        for key in range(1, 6):
+            repo.put(str(key), {"hotel_id": key})
+            repo.flush()
+        repo.close()
+        with open(Hotel.FILE_PATH, 'r', encoding='utf-8') as snapshot:
+            self.assertEqual(len(json.load(snapshot)), 4)
+        self.assertEqual(len(WalRepository("hotels", Hotel.FILE_PATH)), 5)
+
+
+class TestSqliteRepository(unittest.TestCase):
+    """
+    Contiene pruebas unitarias para el backend de SQLite: operaciones
+    de las clases sobre la base, búsquedas indexadas y migración.
+    """
+
+    def setUp(self):
+        """
+        Crea un directorio temporal y apunta ahí los archivos de hoteles,
+        clientes y reservaciones.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_paths = (Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH, Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = os.path.join(self.temp_dir.name, "hotels.json")
+        Customer.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "customers.json")
+        Reservation.FILE_PATH = os.path.join(self.temp_dir.name,
+                                             "reservations.json")
+        Waitlist.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "waitlist.json")
+
+    def tearDown(self):
+        """
+        Elimina el directorio temporal y restablece las rutas originales.
+        """
+        self.temp_dir.cleanup()
+        (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+         Waitlist.FILE_PATH) = self.old_paths
+
+    def test_reservation_flow(self):
+        """
+        Prueba crear y cancelar una reservación con el backend de SQLite.
+        """
+        with session_scope(backend=SqliteRepository):
+            hotel = Hotel.create_hotel("Hotel SQL", "Ciudad SQL", 1)
+            customer = Customer.create_customer("SQL User", "sql@x.com")
+            reservation = Reservation.create_reservation(
+                customer.customer_id, hotel.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 3))
+            self.assertIsNotNone(reservation)
+            self.assertTrue(
+                Reservation.cancel_reservation(reservation.reservation_id))
+        repo = SqliteRepository("reservations", Reservation.FILE_PATH)
+        found = repo.find("hotel_id", hotel.hotel_id)
+        self.assertEqual(len(found), 1)
+        self.assertFalse(found[0]["is_active"])
+        self.assertFalse(os.path.exists(Reservation.FILE_PATH),
+                         "No se deben escribir archivos JSON.")
+
+    def test_lookups_use_sql_indexes(self):
+        """
+        Prueba que las búsquedas por ubicación, correo y hotel se
+        resuelvan con los índices de la base, sin importar mayúsculas y
+        con los cambios pendientes y los de otras conexiones.
+        """
+        with session_scope(backend=SqliteRepository,
+                           flush_interval=None) as session:
+            hotel = Hotel.create_hotel("Hotel Índice", "Monterrey", 2)
+            customer = Customer.create_customer("Index", "Index@X.com")
+            self.assertIsInstance(
+                secondary_index(Hotel.repository(), "location"),
+                RepositoryIndex)
+            self.assertEqual([found.hotel_id for found
+                              in Hotel.search(" monterrey ")],
+                             [hotel.hotel_id])
+            self.assertEqual(Customer.find_by_email("index@x.com")
+                             .customer_id, customer.customer_id)
+            session.commit()
+            # Otra conexión agrega un hotel en la misma ciudad
+            other = SqliteRepository("hotels", Hotel.FILE_PATH)
+            other.put("9", {"hotel_id": 9, "name": "Otro",
+                            "location": "MONTERREY", "total_rooms": 1,
+                            "booked_rooms": 0})
+            other.flush()
+            self.assertEqual(
+                sorted(found.hotel_id for found in Hotel.search("Monterrey")),
+                [hotel.hotel_id, 9])
+            Reservation.create_reservation(
+                customer.customer_id, hotel.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 3))
+            self.assertEqual(len(Reservation.for_hotel(hotel.hotel_id)), 1)
+
+    def test_migrate_json(self):
+        """
+        Prueba importar un archivo JSON existente a SQLite.
+        """
+        Hotel.create_hotel("Hotel JSON", "Ciudad", 4)
+        Hotel.create_hotel("Otro Hotel JSON", "Ciudad", 2)
+        self.assertEqual(migrate_json(Hotel.FILE_PATH), 2)
+        repo = SqliteRepository("hotels", Hotel.FILE_PATH)
+        self.assertEqual(len(repo), 2)
+        self.assertEqual(repo.get("2")["name"], "Otro Hotel JSON")
+
+    def test_ids_continue_after_migration(self):
+        """
+        Prueba que el contador de SQLite arranque después del ID más alto
+        migrado y no reutilice el ID de un registro eliminado.
+        """
+        Hotel.create_hotel("Hotel JSON", "Ciudad", 4)
+        Hotel.create_hotel("Otro Hotel JSON", "Ciudad", 2)
+        migrate_json(Hotel.FILE_PATH)
+        with session_scope(backend=SqliteRepository):
+            self.assertTrue(Hotel.delete_hotel(2))
+            self.assertEqual(Hotel.create_hotel("Nuevo", "Ciudad",
+                                                1).hotel_id, 3)
+
+
+class TestBinaryRepository(unittest.TestCase):
+    """
+    Contiene pruebas unitarias para el formato binario compacto y su
+    backend.
+    """
+
+    def setUp(self):
+        """
+        Crea un directorio temporal y apunta ahí los archivos de hoteles,
+        clientes y reservaciones.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_paths = (Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH, Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = os.path.join(self.temp_dir.name, "hotels.json")
+        Customer.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "customers.json")
+        Reservation.FILE_PATH = os.path.join(self.temp_dir.name,
+                                             "reservations.json")
+        Waitlist.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "waitlist.json")
+
+    def tearDown(self):
+        """
+        Elimina el directorio temporal y restablece las rutas originales.
+        """
+        self.temp_dir.cleanup()
+        (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+         Waitlist.FILE_PATH) = self.old_paths
+
+    def test_codec_round_trip(self):
+        """
+        Prueba que los registros válidos e inválidos sobrevivan la
+        codificación sin cambios.
+        """
+        codec = RecordCodec(SCHEMAS["hotels"])
+        records = {
+            "1": {"hotel_id": 1, "name": "Hotel Ñandú", "location": "",
+                  "total_rooms": 3, "booked_rooms": 1},
+            "2": {"hotel_id": 2, "name": "Sin campos"},
+            "x": {"hotel_id": "x", "name": "ID inválido", "location": "y",
+                  "total_rooms": True, "booked_rooms": None},
+        }
+        self.assertEqual(codec.decode(codec.encode(records)), records)
+
+    def test_reservation_flow(self):
+        """
+        Prueba crear y cancelar una reservación con el backend binario y
+        que las entidades no tengan __dict__.
+        """
+        with session_scope(backend=BinaryRepository):
+            hotel = Hotel.create_hotel("Hotel Bin", "Ciudad Bin", 1)
+            customer = Customer.create_customer("Bin User", "bin@x.com")
+            reservation = Reservation.create_reservation(
+                customer.customer_id, hotel.hotel_id,
+                datetime(2025, 3, 1), datetime(2025, 3, 3))
+            self.assertIsNotNone(reservation)
+            self.assertFalse(hasattr(reservation, "__dict__"))
+        self.assertFalse(os.path.exists(Reservation.FILE_PATH),
+                         "No se deben escribir archivos JSON.")
+        repo = BinaryRepository("reservations", Reservation.FILE_PATH)
+        self.assertEqual(repo.get(str(reservation.reservation_id)),
+                         {"reservation_id": reservation.reservation_id,
+                          "customer_id": customer.customer_id,
+                          "hotel_id": hotel.hotel_id,
+                          "check_in": "2025-03-01",
+                          "check_out": "2025-03-03",
+                          "is_active": True})
+
+
+class TestAsyncBooking(unittest.TestCase):
+    """
+    Contiene pruebas unitarias para la fachada asíncrona: reservaciones
+    concurrentes sin sobreventa y escrituras agrupadas.
+    """
+
+    def setUp(self):
+        """
+        Crea un directorio temporal y apunta ahí los archivos de hoteles,
+        clientes y reservaciones.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_paths = (Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH, Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = os.path.join(self.temp_dir.name, "hotels.json")
+        Customer.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "customers.json")
+        Reservation.FILE_PATH = os.path.join(self.temp_dir.name,
+                                             "reservations.json")
+        Waitlist.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "waitlist.json")
+
+    def tearDown(self):
+        """
+        Elimina el directorio temporal y restablece las rutas originales.
+        """
+        self.temp_dir.cleanup()
+        (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+         Waitlist.FILE_PATH) = self.old_paths
+
+    def test_concurrent_bookings_share_flushes(self):
+        """
+        Prueba que varias reservaciones concurrentes no sobrevendan el
+        hotel, compartan escrituras y queden en disco al terminar.
+        """
+        hotel = Hotel.create_hotel("Hotel Async", "Ciudad Async", 3)
+        customer = Customer.create_customer("Async User", "async@x.com")
+        stay = (datetime(2025, 3, 1), datetime(2025, 3, 3))
+
+        async def book_all():
+            async with AsyncBooking(flush_delay=0.01) as booking:
+                # La sesión diferida es solo de los hilos de la fachada
+                self.assertIsNot(get_session(), booking.session)
+                results = await asyncio.gather(*[
+                    booking.create_reservation(customer.customer_id,
+                                               hotel.hotel_id, *stay)
+                    for _ in range(8)])
+                found = await booking.search("ciudad async", 1, *stay)
+                return results, found, booking.flushes
+
+        with redirect_stdout(io.StringIO()):
+            results, found, flushes = asyncio.run(book_all())
+        booked = [res for res in results if res is not None]
+        self.assertEqual(len(booked), 3)
+        self.assertEqual(found, [])
+        self.assertLess(flushes, len(booked))
+        with open(Reservation.FILE_PATH, 'r', encoding='utf-8') as file_obj:
+            self.assertEqual(len(json.load(file_obj)), 3)
+
+
+class TestServer(unittest.TestCase):
+    """
+    Contiene pruebas del servidor HTTP: rutas de alta y reservación
+    sobre una conexión persistente y métricas por ruta.
+    """
+
+    def setUp(self):
+        """
+        Apunta los almacenes a un directorio temporal e inicia el
+        servidor en un puerto libre.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_paths = (Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH, Waitlist.FILE_PATH)
+        Hotel.FILE_PATH = os.path.join(self.temp_dir.name, "hotels.json")
+        Customer.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "customers.json")
+        Reservation.FILE_PATH = os.path.join(self.temp_dir.name,
+                                             "reservations.json")
+        Waitlist.FILE_PATH = os.path.join(self.temp_dir.name,
+                                          "waitlist.json")
+        self.server = create_server(port=0, workers=2)
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+
+    def tearDown(self):
+        """
+        Detiene el servidor y elimina el directorio temporal.
+        """
+        self.server.shutdown()
+        self.server.server_close()
+        self.temp_dir.cleanup()
+        (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+         Waitlist.FILE_PATH) = self.old_paths
+
+    def _request(self, connection, method, path, body=None):
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        connection.request(method, path, body=data)
+        response = connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_booking_over_keep_alive(self):
+        """
+        Prueba crear hotel, cliente y reservación por la misma conexión
+        y que las métricas agrupen por ruta.
+        """
+        connection = http.client.HTTPConnection(
+            "127.0.0.1", self.server.server_address[1])
+        status, hotel = self._request(connection, "POST", "/hotels", {
+            "name": "Hotel HTTP", "location": "Ciudad", "total_rooms": 1})
+        self.assertEqual(status, 201)
+        _, customer = self._request(connection, "POST", "/customers", {
+            "name": "HTTP User", "email": "http@x.com"})
+        booking = {"customer_id": customer["customer_id"],
+                   "hotel_id": hotel["hotel_id"],
+                   "check_in": "2025-03-01", "check_out": "2025-03-03"}
+        with redirect_stdout(io.StringIO()):
+            status, _ = self._request(connection, "POST", "/reservations",
+                                      booking)
+            self.assertEqual(status, 201)
+            status, _ = self._request(connection, "POST", "/reservations",
+                                      booking)
+            self.assertEqual(status, 409)
+        status, _ = self._request(connection, "GET", "/hotels/999")
+        self.assertEqual(status, 404)
+        status, _ = self._request(connection, "POST", "/hotels", {})
+        self.assertEqual(status, 400)
+
+        _, metrics = self._request(connection, "GET", "/metrics")
+        self.assertEqual(metrics["POST /reservations"]["requests"], 2)
+        self.assertIn("GET /hotels/{id}", metrics)
+        self.assertIn("p99_ms", metrics["POST /hotels"])
+        connection.close()
+
+    def test_failed_patch_keeps_acknowledged_create(self):
+        """
+        Prueba que, con escrituras por intervalo (--flush-interval), un
+        PATCH inválido no descarta el alta que otro cliente ya recibió
+        con 201 y que esta llega al disco.
+        """
+        with session_scope(flush_interval=60.0):
+            first = http.client.HTTPConnection(
+                "127.0.0.1", self.server.server_address[1])
+            second = http.client.HTTPConnection(
+                "127.0.0.1", self.server.server_address[1])
+            status, hotel = self._request(first, "POST", "/hotels", {
+                "name": "Hotel Intervalo", "location": "Ciudad",
+                "total_rooms": 2})
+            self.assertEqual(status, 201)
+            path = f"/hotels/{hotel['hotel_id']}"
+            status, _ = self._request(second, "PATCH", path,
+                                      {"total_rooms": "many"})
+            self.assertEqual(status, 400)
+            status, found = self._request(first, "GET", path)
+            self.assertEqual((status, found["total_rooms"]), (200, 2))
+            first.close()
+            second.close()
+        with open(Hotel.FILE_PATH, 'r', encoding='utf-8') as file_obj:
+            self.assertEqual(list(json.load(file_obj)),
+                             [str(hotel["hotel_id"])])
+
+    def test_invalid_length_and_internal_error(self):
+        """
+        Prueba que un Content-Length negativo o no numérico responde 400
+        y cierra la conexión sin bloquear el hilo, y que un error
+        inesperado responde 500 y queda en las métricas.
+        """
+        port = self.server.server_address[1]
+        for length in ("-1", "abc"):
+            connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                    timeout=5)
+            connection.putrequest("POST", "/hotels")
+            connection.putheader("Content-Length", length)
+            connection.endheaders()
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            self.assertEqual(response.getheader("Connection"), "close")
+            response.read()
+            connection.close()
+
+        connection = http.client.HTTPConnection("127.0.0.1", port,
+                                                timeout=5)
+        with mock.patch.object(Hotel, "search",
+                               side_effect=RuntimeError("falla")):
+            status, body = self._request(connection, "GET", "/hotels")
+        self.assertEqual(status, 500)
+        self.assertIn("falla", body["error"])
+        _, metrics = self._request(connection, "GET", "/metrics")
+        self.assertEqual(metrics["GET /hotels"]["requests"], 1)
+        connection.close()
+
+
+def _book_rooms(paths, backend, attempts, results):
+    """
+    Proceso trabajador de la prueba de concurrencia: intenta reservar
+    varias veces la misma habitación y reporta cuántas lo logró.
+    """
+    Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH = paths
+    set_session(Session(backend=BACKENDS[backend]))
+    booked = 0
+    with redirect_stdout(io.StringIO()):
+        for _ in range(attempts):
+            if Reservation.create_reservation(1, 1, datetime(2025, 3, 1),
+                                              datetime(2025, 3, 3)):
+                booked += 1
+    results.put(booked)
+
+
+class TestConcurrentReservations(unittest.TestCase):
+    """
+    Prueba de estrés: varios procesos reservan el mismo hotel al mismo
+    tiempo y no debe haber sobreventa ni reservaciones perdidas.
+    """
+
+    ROOMS = 15
+    WORKERS = 4
+    ATTEMPTS = 10
+
+    def setUp(self):
+        """
+        Crea un directorio temporal con un hotel y un cliente.
+        """
+        # Se cierra en tearDown, no cabe en un bloque with
+        self.temp_dir = tempfile.TemporaryDirectory()  # pylint: disable=R1732
+        self.old_paths = (Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH)
+        self.paths = tuple(os.path.join(self.temp_dir.name, name)
+                           for name in ("hotels.json", "customers.json",
+                                        "reservations.json"))
+        Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH = \
+            self.paths
+
+    def tearDown(self):
+        """
+        Elimina el directorio temporal y restablece las rutas originales.
+        """
+        self.temp_dir.cleanup()
+        (Hotel.FILE_PATH, Customer.FILE_PATH,
+         Reservation.FILE_PATH) = self.old_paths
+
+    def _run_workers(self, backend):
+        """
+        Lanza los procesos y devuelve el total de reservas logradas.
+        """
+        with session_scope(backend=BACKENDS[backend]):
+            Hotel.create_hotel("Hotel Concurrido", "Ciudad", self.ROOMS)
+            Customer.create_customer("Cliente Concurrente", "c@x.com")
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(
+            target=_book_rooms,
+            args=(self.paths, backend, self.ATTEMPTS, results))
+            for _ in range(self.WORKERS)]
+        for worker in workers:
+            worker.start()
+        booked = sum(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join()
+        return booked
+
+    def _assert_no_overbooking(self, backend):
+        booked = self._run_workers(backend)
+        self.assertEqual(booked, self.ROOMS)
+        hotels = BACKENDS[backend]("hotels", Hotel.FILE_PATH)
+        self.assertEqual(hotels.get("1")["booked_rooms"], self.ROOMS,
+                         "No debe haber sobreventa.")
+        reservations = BACKENDS[backend]("reservations",
+                                         Reservation.FILE_PATH)
+        self.assertEqual(len(reservations), self.ROOMS,
+                         "No se deben perder reservaciones.")
+
+    def test_json_backend(self):
+        """
+        Prueba la ausencia de sobreventa con archivos JSON.
+        """
+        self._assert_no_overbooking("json")
+
+    def test_wal_backend(self):
+        """
+        Prueba la ausencia de sobreventa con el backend de bitácora.
+        """
+        self._assert_no_overbooking("wal")
+
+
+class TestBenchmark(unittest.TestCase):
+    """
+    Prueba en pequeño el benchmark de los backends.
+    """
+
+    def test_run_case_and_stress(self):
+        """
+        Un almacén pequeño se llena y se mide en cada operación; la
+        prueba de estrés no encuentra sobreventa ni actualizaciones
+        perdidas, y ambos resultados aparecen en la tabla.
+        """
+        paths = (Hotel.FILE_PATH, Customer.FILE_PATH, Reservation.FILE_PATH,
+                 Waitlist.FILE_PATH)
+        case = run_case("json", 50, ops=5, seconds=5)
+        self.assertEqual(case["load"]["ops"], 101)
+        for operation in ("create", "lookup", "reserve", "cancel"):
+            self.assertEqual(case[operation]["ops"], 5)
+            self.assertIsNotNone(case[operation]["p99_ms"])
+        result = stress("json", workers=2, attempts=5, rooms=3)
+        self.assertFalse(result["overbooked"])
+        self.assertEqual(result["lost_updates"], 0)
+        self.assertLessEqual(result["active"], 3)
+        self.assertEqual((Hotel.FILE_PATH, Customer.FILE_PATH,
+                          Reservation.FILE_PATH, Waitlist.FILE_PATH), paths)
+        report = format_report([case], [result])
+        self.assertIn("reserve", report)
+        self.assertIn("sobreventa", report)
+
 
 def main():
     """
@@ -0,0 +1,114 @@
+"""
+Cola de prioridad de la lista de espera por hotel.
+
+Las solicitudes de la lista de espera se guardan en su propio almacén
+(waitlist.json). Para no recorrerlas todas cuando se libera una
+habitación, cada hotel tiene un heap con las solicitudes en espera
+ordenadas por prioridad (mayor primero) y, a igual prioridad, por
+orden de llegada (el ID, que solo crece). Sacar la siguiente solicitud
+cuesta O(log n).
+
+El heap se construye una vez con el contenido del almacén, recibe las
+solicitudes nuevas por medio de un listener y se reconstruye cuando la
+generación del almacén cambia (otro proceso escribió). Las solicitudes
+que dejan de estar en espera no se buscan dentro del heap: se descartan
+cuando llegan al frente (eliminación perezosa).
+"""
+import heapq
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from indexes import RepositoryMirror
+
+WAITING = "waiting"
+
+
+def _entry(key: str, record: dict) -> Tuple[int, int, str]:
+    """
+    Elemento del heap: primero la prioridad más alta, luego la más
+    antigua.
+    """
+    return -record.get("priority", 0), int(key), key
+
+
+class WaitlistQueue(RepositoryMirror):
+    """
+    Heaps de solicitudes en espera por hotel.
+
+    Atributos:
+        generation (int): Generación del almacén de la lista de espera
+                          a partir de la cual se construyó.
+    """
+
+    def __init__(self, generation: Optional[int] = None):
+        super().__init__(generation)
+        self._heaps: Dict[int, List[Tuple[int, int, str]]] = defaultdict(
+            list)
+
+    def build(self, items: Iterable[Tuple[str, dict]],
+              generation: int) -> None:
+        """
+        Reconstruye los heaps con las solicitudes en espera.
+        """
+        heaps = defaultdict(list)
+        for key, record in items:
+            if record.get("status") == WAITING:
+                heaps[record["hotel_id"]].append(_entry(key, record))
+        for heap in heaps.values():
+            heapq.heapify(heap)
+        with self._lock:
+            self._heaps = heaps
+            self.generation = generation
+
+    def update(self, key: str, old: Optional[dict],
+               new: Optional[dict]) -> None:
+        """
+        Agrega las solicitudes que entran en espera. Se registra como
+        listener del almacén.
+        """
+        if new is None or new.get("status") != WAITING:
+            return
+        if old is not None and old.get("status") == WAITING:
+            return
+        self.push(key, new)
+
+    def push(self, key: str, record: dict) -> None:
+        """
+        Agrega (o devuelve) una solicitud al heap de su hotel.
+        """
+        with self._lock:
+            heapq.heappush(self._heaps[record["hotel_id"]],
+                           _entry(key, record))
+
+    def pop(self, hotel_id: int) -> Optional[str]:
+        """
+        Saca la clave de la siguiente solicitud del hotel, o None si no
+        hay. Puede ser una que ya no está en espera; quien llama lo
+        revisa contra el almacén.
+        """
+        with self._lock:
+            heap = self._heaps.get(hotel_id)
+            if not heap:
+                return None
+            return heapq.heappop(heap)[2]
+
+
+_queues = weakref.WeakKeyDictionary()
+_queues_lock = threading.Lock()
+
+
+def waitlist_queue(repository) -> WaitlistQueue:
+    """
+    Devuelve la cola del almacén de la lista de espera, creándola la
+    primera vez y reconstruyéndola si la generación cambió.
+    """
+    with _queues_lock:
+        queue = _queues.get(repository)
+        if queue is None:
+            queue = WaitlistQueue()
+            _queues[repository] = queue
+            repository.add_listener(queue.update)
+    queue.sync(repository)
+    return queue